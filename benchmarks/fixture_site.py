@@ -0,0 +1,143 @@
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+SECTION_NAMES = ['Login', 'Shipping address', 'Billing address', 'Payment', 'Preferences', 'Newsletter',
+                 'Gift options', 'Delivery', 'Coupons', 'Reviews', 'Account settings', 'Support']
+FIELD_WORDS = ['email', 'password', 'first name', 'last name', 'street', 'city', 'zip code', 'phone',
+               'card number', 'expiry', 'company', 'quantity', 'comment', 'country', 'state']
+BUTTON_WORDS = ['Save', 'Continue', 'Apply', 'Remove', 'Edit', 'Add to cart', 'Subscribe', 'Next', 'Back']
+
+NAV = ('<div id="nav-belt"><form action="/app/results"><input id="search" name="q" placeholder="Search">'
+       '<button id="search-submit" type="submit">Search</button></form></div>'
+       '<div id="nav-main"><a id="nav-home" href="/app/home">Home</a><a id="nav-cart" href="/app/cart">Cart</a></div>')
+
+
+def _widget(rng, section, index):
+    """One interactive element, wrapped a few levels deep like real component markup."""
+    uid = f"s{section}-{index}"
+    kind = rng.random()
+    word = rng.choice(FIELD_WORDS)
+    if kind < 0.45:
+        element = f'<label>{word.title()}</label><input name="{word.replace(" ", "_")}_{uid}" placeholder="{word.title()}">'
+    elif kind < 0.7:
+        element = f'<button id="btn-{uid}" type="button">{rng.choice(BUTTON_WORDS)}</button>'
+    elif kind < 0.9:
+        element = f'<a href="#{uid}" class="link">{word.title()} details {index}</a>'
+    elif kind < 0.95:
+        element = f'<select name="sel_{uid}"><option>One</option><option>Two</option></select>'
+    else:
+        element = f'<textarea name="note_{uid}" placeholder="Notes"></textarea>'
+    depth = rng.randint(1, 6)
+    return '<div class="wrap">' * depth + element + '</div>' * depth
+
+
+def synthetic_page(element_count, seed=0, title="Synthetic page"):
+    """
+    A page with about `element_count` interactive elements, grouped into
+    headed sections and nested like component-framework markup. Identical
+    arguments always give identical HTML.
+    """
+    rng = random.Random(seed)
+    sections = max(1, min(len(SECTION_NAMES) * 20, element_count // 50))
+    per_section = max(1, element_count // sections)
+    body = []
+    made = 0
+    for section in range(sections):
+        name = SECTION_NAMES[section % len(SECTION_NAMES)]
+        if section >= len(SECTION_NAMES):
+            name = f"{name} {section // len(SECTION_NAMES)}"
+        widgets = ''.join(_widget(rng, section, i) for i in range(per_section))
+        made += per_section
+        body.append(f'<section class="panel"><h2>{name}</h2><form>{widgets}</form></section>')
+    return (f'<!DOCTYPE html><html><head><title>{title}</title></head><body>{NAV}'
+            f'<main>{"".join(body)}</main></body></html>')
+
+
+def _app_page(path, query, filler):
+    """A tiny shop: login -> home -> search results, padded with `filler` extra elements."""
+    pad = synthetic_page(filler, seed=len(path)).split('<main>', 1)[1].rsplit('</main>', 1)[0] if filler else ''
+    if path in ('/app', '/app/', '/app/login'):
+        content = ('<section><h2>Sign in</h2><form action="/app/home">'
+                   '<input id="email" name="email" placeholder="Email">'
+                   '<input id="password" name="password" type="password" placeholder="Password">'
+                   '<button id="sign-in" type="submit">Sign In</button></form></section>')
+    elif path == '/app/home':
+        content = f'<h1>Welcome {query.get("email", ["guest"])[0]}</h1>'
+    elif path == '/app/results':
+        term = query.get('q', [''])[0]
+        items = ''.join(f'<div class="item"><a href="/app/item/{i}">{term} model {i}</a>'
+                        f'<button id="add-{i}" type="button">Add to cart</button></div>' for i in range(20))
+        content = f'<h1>Results for {term}</h1>{items}'
+    elif path == '/app/cart':
+        content = '<h1>Your cart</h1>'
+    else:
+        return None
+    return f'<!DOCTYPE html><html><head><title>Shop</title></head><body>{NAV}<main>{content}{pad}</main></body></html>'
+
+
+class FixtureSite:
+    """
+    Serves synthetic pages from a local HTTP server on a background thread:
+      /elements/<n>  a page with about n interactive elements
+      /app/...       a small login/search flow for end-to-end scenarios
+      /slow/<ms>     a plain-text response sent after ms milliseconds, like a long poll
+    """
+
+    def __init__(self, app_filler=200):
+        self.app_filler = app_filler
+        self._pages = {}
+        site = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                parsed = urlparse(self.path)
+                if parsed.path.startswith('/slow/'):
+                    time.sleep(int(parsed.path.rsplit('/', 1)[1]) / 1000.0)
+                    self.send_response(200)
+                    self.send_header('Content-Type', 'text/plain')
+                    self.send_header('Content-Length', '2')
+                    self.end_headers()
+                    self.wfile.write(b'ok')
+                    return
+                html = site.render(parsed.path, parse_qs(parsed.query))
+                if html is None:
+                    self.send_error(404)
+                    return
+                data = html.encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/html; charset=utf-8')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def render(self, path, query):
+        if path.startswith('/elements/'):
+            try:
+                count = int(path.rsplit('/', 1)[1])
+            except ValueError:
+                return None
+            if count not in self._pages:
+                self._pages[count] = synthetic_page(count, seed=count)
+            return self._pages[count]
+        return _app_page(path, query, self.app_filler)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
@@ -0,0 +1,301 @@
+"""
+Offline benchmarks of the framework's own overhead: no real website and no
+model key needed. Synthetic pages are served from a local HTTP server and a
+deterministic stub stands in for the LLM.
+
+    python benchmarks/run_benchmarks.py --output bench.json
+    python benchmarks/run_benchmarks.py --quick --compare bench.json
+
+Results are printed (and optionally written) as JSON; --compare prints the
+change in p50 against an earlier results file.
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from autotester.core import feature_parser
+from autotester.core.agent import collect_candidates, extract_interactive_elements, get_ui_summary, iter_interactive_elements
+from autotester.core.page_snapshot import HTML_PARSER, PageSnapshot
+from autotester.core.prompt_compactor import compact_ui_summary
+from autotester.utils.tracing import percentile
+from autotester.utils.workflow_memory import WorkflowMemory
+from autotester.utils.workflow_replay import edge_cover_walks, shortest_path
+from fixture_site import FixtureSite, synthetic_page
+from stub_llm import StubLLMClient
+
+PAGE_SIZES = [100, 1000, 5000, 10000, 20000]
+QUICK_PAGE_SIZES = [100, 1000, 5000]
+
+SCENARIO_FEATURE = '''Feature: Bench shop
+  Scenario: Log in and search
+    Given I am under the "Sign in" section
+    When I enter email as "bench@example.com"
+    And I enter password as "secret"
+    And I click on "Sign In" button
+    Then I see "Welcome"
+    When I enter search as "keyboard"
+    And I click on "Search" button
+    Then I see "Results for keyboard"
+'''
+
+
+class FakePage:
+    """Just enough of a Playwright page for the HTML-based code paths."""
+
+    def __init__(self, html, url):
+        self.html = html
+        self.url = url
+
+    def content(self):
+        return self.html
+
+
+class Bench:
+    def __init__(self, repeat):
+        self.repeat = repeat
+        self.results = []
+
+    def measure(self, name, fn, setup=None, repeat=None, **params):
+        """Times fn(setup()) `repeat` times; setup runs outside the timed region."""
+        timings = []
+        for _ in range(repeat or self.repeat):
+            arg = setup() if setup else None
+            started = time.perf_counter()
+            fn(arg) if setup else fn()
+            timings.append((time.perf_counter() - started) * 1000)
+        self.record(name, timings, **params)
+
+    def record(self, name, timings, **params):
+        result = {
+            'name': name,
+            'params': params,
+            'runs': len(timings),
+            'min_ms': round(min(timings), 3),
+            'mean_ms': round(statistics.mean(timings), 3),
+            'p50_ms': round(percentile(timings, 50), 3),
+            'p95_ms': round(percentile(timings, 95), 3),
+        }
+        self.results.append(result)
+        print(f"  {name:<24} {json.dumps(params):<42} p50 {result['p50_ms']:>10.1f} ms", file=sys.stderr)
+
+    def skip(self, name, reason):
+        self.results.append({'name': name, 'skipped': reason})
+        print(f"  {name:<24} skipped: {reason}", file=sys.stderr)
+
+
+# --- Benchmarks ---
+
+def bench_page_processing(bench, logger, sizes):
+    for size in sizes:
+        html = synthetic_page(size, seed=size)
+        bench.measure('html_parse', lambda _: PageSnapshot(html, 'http://bench/').soup,
+                      setup=lambda: None, elements=size)
+        snapshot = PageSnapshot(html, 'http://bench/')
+        snapshot.soup
+        bench.measure('ui_summary', lambda: get_ui_summary(snapshot, logger), elements=size)
+        bench.measure('ui_summary_section', lambda: get_ui_summary(snapshot, logger, 'Payment'), elements=size)
+
+        elements = extract_interactive_elements(snapshot, logger)
+        step = {'action': 'fill', 'target_name': 'card number', 'value': '4111', 'section': 'Payment'}
+        bench.measure('compact_ui_summary', lambda: compact_ui_summary(elements, step, logger), elements=size)
+        bench.measure('candidate_stream', lambda: collect_candidates(iter_interactive_elements(snapshot, logger, 'Payment'),
+                                                                     [step], 200), elements=size)
+
+        memory = WorkflowMemory('bench_pages', save_interval=3600)
+        bench.measure('state_hash', lambda page: memory.get_state_hash(page),
+                      setup=lambda: FakePage(html, f'http://bench/{size}'), elements=size)
+
+
+def bench_feature_parsing(bench, workdir, scenarios):
+    lines = ['Feature: Generated', '  Background:', '    Given I am under the "Login" section']
+    for i in range(scenarios):
+        lines += [f'  @tag{i % 7}', f'  Scenario: Generated scenario {i}',
+                  f'    When I enter username as "user{i}"',
+                  '    And I click on "Sign In" button',
+                  '    Then I see "Welcome"']
+    path = os.path.join(workdir, 'generated.feature')
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('\n'.join(lines) + '\n')
+
+    bench.measure('feature_compile_cold', lambda _: feature_parser.compile_feature_file(path),
+                  setup=feature_parser._compiled_cache.clear, scenarios=scenarios)
+    name = f'Generated scenario {scenarios - 1}'
+    bench.measure('feature_steps_warm', lambda: feature_parser.parse_feature_file_to_steps(path, name),
+                  scenarios=scenarios)
+
+
+def bench_workflow_graph(bench, edges):
+    def learn(_):
+        memory = WorkflowMemory('bench_graph', save_interval=3600)
+        # A chain with a side branch every 10 states
+        for i in range(edges):
+            source = 'START' if i == 0 else f'state{i - 1}'
+            memory.add_edge(source, f'state{i}', {'action': 'click', 'selector': f'#next{i}'})
+            if i % 10 == 0:
+                memory.add_edge(f'state{i}', f'side{i}', {'action': 'click', 'selector': f'#side{i}'})
+        memory.flush()
+        return memory
+
+    def clean():
+        for name in os.listdir('workflows'):
+            if name.startswith('bench_graph'):
+                path = os.path.join('workflows', name)
+                if os.path.isfile(path):
+                    os.remove(path)
+
+    bench.measure('workflow_learn', learn, setup=clean, edges=edges)
+    bench.measure('workflow_load', lambda: WorkflowMemory('bench_graph'), edges=edges)
+    memory = WorkflowMemory('bench_graph')
+    bench.measure('edge_cover_plan', lambda: edge_cover_walks(memory), edges=edges)
+    bench.measure('shortest_path', lambda: shortest_path(memory, 'START', f'state{edges - 1}'), edges=edges)
+
+
+def bench_end_to_end(bench, logger, workdir, app_filler):
+    from playwright.sync_api import sync_playwright
+    playwright = sync_playwright().start()
+    try:
+        browser = playwright.chromium.launch(headless=True)
+    except Exception as e:
+        playwright.stop()
+        bench.skip('scenario_e2e', f"browser unavailable: {str(e).splitlines()[0]}")
+        return
+
+    from autotester.core.step_runner import run_steps
+    from autotester.utils.page_settle import watch_page_activity
+    from autotester.utils.workflow_replay import ReplayEngine
+
+    path = os.path.join(workdir, 'bench_shop.feature')
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(SCENARIO_FEATURE)
+    steps = feature_parser.parse_feature_file_to_steps(path, 'Log in and search')
+
+    try:
+        with FixtureSite(app_filler=app_filler) as site:
+            start_url = f"{site.base_url}/app/login"
+
+            def fresh_page():
+                context = browser.new_context()
+                page = context.new_page()
+                watch_page_activity(page)
+                page.goto(start_url)
+                return page
+
+            client = StubLLMClient()
+            timings = []
+            for _ in range(bench.repeat):
+                page = fresh_page()
+                started = time.perf_counter()
+                run_steps(page, client, [dict(s) for s in steps], logger)
+                timings.append((time.perf_counter() - started) * 1000)
+                page.context.close()
+            bench.record('scenario_e2e', timings, steps=len(steps), app_filler=app_filler, llm_calls=client.calls)
+
+            # Learning: run_steps recording a workflow edge per action, as the learning test does
+            memory = WorkflowMemory('bench_app', save_interval=3600)
+            page = fresh_page()
+            started = time.perf_counter()
+            memory.remember_state_and_action(page, "START", {"action": "initial_load"}, logger)
+            run_steps(page, client, [dict(s) for s in steps], logger,
+                      before_action=memory.get_state_hash,
+                      after_action=lambda from_state, action: memory.remember_state_and_action(page, from_state, action, logger))
+            memory.flush()
+            bench.record('workflow_learn_e2e', [(time.perf_counter() - started) * 1000], edges=len(memory.graph['edges']))
+            page.context.close()
+
+            # Validation: replay every learned edge without the model
+            timings = []
+            for _ in range(bench.repeat):
+                page = fresh_page()
+                engine = ReplayEngine(memory, page, logger)
+                started = time.perf_counter()
+                engine.validate_all_edges()
+                timings.append((time.perf_counter() - started) * 1000)
+                page.context.close()
+            bench.record('workflow_validate_e2e', timings, edges=len(memory.graph['edges']))
+    finally:
+        browser.close()
+        playwright.stop()
+
+
+# --- Reporting ---
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], text=True,
+                                       cwd=os.path.dirname(os.path.abspath(__file__))).strip()
+    except Exception:
+        return None
+
+
+def compare(current, baseline_path):
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+
+    def key(result):
+        return result['name'], json.dumps(result.get('params', {}), sort_keys=True)
+
+    previous = {key(r): r for r in baseline.get('results', []) if 'p50_ms' in r}
+    print(f"\nChange in p50 vs {baseline.get('commit') or baseline_path}:", file=sys.stderr)
+    for result in current['results']:
+        old = previous.get(key(result))
+        if old and 'p50_ms' in result and old['p50_ms']:
+            change = (result['p50_ms'] - old['p50_ms']) / old['p50_ms'] * 100
+            print(f"  {result['name']:<24} {json.dumps(result['params']):<42} {old['p50_ms']:>9.1f} -> {result['p50_ms']:>9.1f} ms ({change:+.1f}%)",
+                  file=sys.stderr)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--quick', action='store_true', help='Smaller pages and graphs, fewer runs')
+    parser.add_argument('--repeat', type=int, default=None, help='Runs per measurement (default 5, quick 2)')
+    parser.add_argument('--output', help='Also write the JSON results to this file')
+    parser.add_argument('--compare', help='Earlier results file to compare against')
+    parser.add_argument('--no-browser', action='store_true', help='Skip the end-to-end browser benchmarks')
+    args = parser.parse_args(argv)
+
+    bench = Bench(args.repeat or (2 if args.quick else 5))
+    logger = logging.getLogger('benchmark')
+    logger.addHandler(logging.NullHandler())
+    logger.propagate = False
+
+    original_cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as workdir:
+        # WorkflowMemory and the selector cache write relative to the working directory
+        os.chdir(workdir)
+        try:
+            bench_page_processing(bench, logger, QUICK_PAGE_SIZES if args.quick else PAGE_SIZES)
+            bench_feature_parsing(bench, workdir, 50 if args.quick else 500)
+            bench_workflow_graph(bench, 1000 if args.quick else 5000)
+            if args.no_browser:
+                bench.skip('scenario_e2e', 'disabled with --no-browser')
+            else:
+                bench_end_to_end(bench, logger, workdir, app_filler=200 if args.quick else 2000)
+        finally:
+            os.chdir(original_cwd)
+
+    report = {
+        'commit': git_commit(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'html_parser': HTML_PARSER,
+        'results': bench.results,
+    }
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        compare(report, args.compare)
+
+
+if __name__ == '__main__':
+    main()
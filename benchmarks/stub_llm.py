@@ -0,0 +1,50 @@
+import json
+import re
+import time
+from autotester.core.local_matcher import FILLABLE_TAGS, relevance
+from autotester.core.prompt_compactor import parse_row
+
+GOAL_PATTERN = re.compile(r"Your goal is to (fill|click) the .*? described as '(.*?)'(?: with the value '(.*?)')?")
+TABLE_PATTERN = re.compile(r"```\n(.*?)\n```", re.DOTALL)
+
+
+class StubLLMClient:
+    """
+    A deterministic stand-in for LLMClient. It reads the goals and candidate
+    table out of the agent's prompt and answers with the best-matching
+    element, after an optional fixed delay that simulates model latency.
+    """
+
+    def __init__(self, latency_ms=0):
+        self.latency_ms = latency_ms
+        self.calls = 0
+        self.prompt_chars = 0
+
+    def _candidates(self, prompt):
+        match = TABLE_PATTERN.search(prompt)
+        if not match:
+            return []
+        rows = match.group(1).splitlines()[1:]
+        return [parse_row(row) for row in rows]
+
+    def _answer(self, kind, target, value, candidates):
+        if kind == 'fill':
+            candidates = [c for c in candidates if c.get('tag') in FILLABLE_TAGS] or candidates
+        if not candidates:
+            return {"action": kind, "selector": "body"}
+        best = max(candidates, key=lambda c: relevance(c, target))
+        action = {"action": kind, "selector": best['selector']}
+        if kind == 'fill':
+            action['value'] = value or ''
+        return action
+
+    def complete(self, prompt):
+        self.calls += 1
+        self.prompt_chars += len(prompt)
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000.0)
+        candidates = self._candidates(prompt)
+        actions = [self._answer(kind, target, value, candidates) for kind, target, value in GOAL_PATTERN.findall(prompt)]
+        if 'A JSON array' in prompt:
+            return f"```json\n{json.dumps(actions)}\n```"
+        return f"```json\n{json.dumps(actions[0] if actions else {})}\n```"
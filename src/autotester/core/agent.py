@@ -1,81 +1,263 @@
 import json
-from bs4 import BeautifulSoup
+import hashlib
 import re
+from urllib.parse import urlparse
+from bs4 import Tag
+from autotester.core.local_matcher import find_exact_match, find_fuzzy_match, normalize_text, relevance
+from autotester.core.feature_parser import STEP_SOURCE_KEYS
+from autotester.core.dom_extractor import (PAGE_TIER, SECTION_TIER, extract_interactive_elements_in_page,
+                                           preflight_selectors, stream_interactive_elements_in_page)
+from autotester.core.llm_client import LLMError, OpenAIProvider
+from autotester.core.model_router import ModelRouter
+from autotester.core.page_snapshot import PageSnapshot, as_soup
+from autotester.core.section_index import TextIndex
+from autotester.core.prompt_compactor import compact_ui_summary, dedupe_elements, estimate_tokens, rank_elements
+from autotester.utils.ai_memory import memory_singleton
+from autotester.utils.env_loader import (load_candidate_streaming, load_extraction_engine, load_llm_settings,
+                                        load_preflight_settings, load_prompt_budget)
+from autotester.utils.tracing import span
 
-def get_ui_summary(html, logger, section_context=None):
+# Minimum fuzzy-match score needed to skip the LLM for a step.
+LOCAL_MATCH_THRESHOLD = 0.9
+
+INTERACTIVE_TAGS = ['input', 'button', 'a', 'select', 'textarea']
+
+# How often (in candidates) a stream is checked for a confident local match, besides at tier changes.
+STREAM_CHECK_INTERVAL = 50
+
+# Keys the agent adds to an action for bookkeeping; they are not part of what gets replayed.
+ACTION_METADATA_KEYS = ('resolved_by', 'cache_key', 'model') + STEP_SOURCE_KEYS
+
+# With a ModelRouter, an answer naming a listed candidate that scores below this
+# against the step target counts as low confidence and is escalated.
+MIN_INTENT_RELEVANCE = 0.25
+
+# A step's cache key covers at most this many candidates scoring at least
+# CACHE_KEY_MIN_RELEVANCE against its target.
+CACHE_KEY_CANDIDATES = 5
+CACHE_KEY_MIN_RELEVANCE = 0.5
+
+# Steps whose click targets the first of possibly several matches (page.click picks the first).
+FIRST_MATCH_STEPS = ('click_first_in_list',)
+
+
+def _section_area(html, soup, section_context, logger):
+    """The container to search for a section, or None (after logging why) to search the whole page."""
+    # Find the deepest element *containing* the section text, and the closest
+    # parent container (div, form, fieldset, or section) around it.
+    # This ensures we search *around* the text, not just *inside* it.
+    if isinstance(html, PageSnapshot):
+        text_tag, container = html.section_container(section_context)
+    else:
+        text_tag, container = TextIndex(soup).section_container(section_context)
+
+    if text_tag:
+        if container:
+            logger.info(f"Narrowed search to section: '{section_context}'")
+            return container
+        logger.warning(f"Could not find a parent container for section '{section_context}'. Searching whole page.")
+    else:
+        logger.warning(f"Could not find section text '{section_context}'. Searching whole page.")
+    return None
+
+
+def element_text(element):
+    """An element's text with whitespace collapsed, as the in-browser extractor and Playwright's text= see it."""
+    return ' '.join(element.get_text().split())
+
+
+def _element_details(element):
     """
-    Parses HTML to extract a structured summary of interactive elements.
+    The summary entry for one element, or None if it is a hidden input, is
+    disabled or cannot be reliably selected (matching the in-browser extractor).
+    """
+    if element.name == 'input' and (element.get('type') or '').lower() == 'hidden':
+        return None
+    if element.name != 'a' and element.has_attr('disabled'):
+        return None
+
+    selector = ''
+    text = element_text(element)
+
+    # Prioritize selectors for stability
+    if element.get('id'):
+        selector = f"#{element.get('id')}"
+    elif element.get('automation_id'):
+        selector = f"[automation_id='{element.get('automation_id')}']"
+    elif element.get('name'):
+        selector = f"[name='{element.get('name')}']"
+
+    # --- NEW FALLBACK ---
+    # If no other selector is found, use the text
+    elif text:
+        # Create a Playwright-style text selector
+        # We must escape quotes inside the text
+        selector = f"text={json.dumps(text)}"
+    # --- END OF NEW FALLBACK ---
+
+    else:
+        # Skip elements that cannot be reliably selected at all
+        return None
+
+    return {
+        "tag": element.name,
+        "selector": selector,
+        "text": text,
+        "placeholder": element.get('placeholder', ''),
+        "value": element.get('value', '')
+    }
+
+
+def extract_interactive_elements(html, logger, section_context=None):
+    """
+    Parses HTML (or a PageSnapshot) and returns a list of interactive element details.
     If section_context is provided, it narrows the search to that part of the page.
     """
-    soup = BeautifulSoup(html, 'html.parser')
+    soup = as_soup(html)
     search_area = soup
 
     # --- THIS IS THE FIX ---
     if section_context:
-        # Find the element *containing* the section text
-        text_tag = soup.find(lambda tag: tag.name not in ['script', 'style'] and section_context in tag.get_text(strip=True))
-
-        if text_tag:
-            # Now, find the closest parent container (div, form, fieldset, or section)
-            # This ensures we search *around* the text, not just *inside* it.
-            container = text_tag.find_parent(['div', 'form', 'fieldset', 'section'])
-            if container:
-                search_area = container  # Success! We will now *only* search inside this container.
-                logger.info(f"Narrowed search to section: '{section_context}'")
-            else:
-                logger.warning(f"Could not find a parent container for section '{section_context}'. Searching whole page.")
-        else:
-            logger.warning(f"Could not find section text '{section_context}'. Searching whole page.")
+        # Success! We will now *only* search inside this container.
+        search_area = _section_area(html, soup, section_context, logger) or soup
     # --- END OF FIX ---
 
     interactive_elements = []
 
     # Find all potentially interactive elements *within the search_area*
-    for element in search_area.find_all(['input', 'button', 'a', 'select', 'textarea']):
-        selector = ''
-        text = element.get_text(strip=True)
-
-        # Prioritize selectors for stability
-        if element.get('id'):
-            selector = f"#{element.get('id')}"
-        elif element.get('automation_id'):
-            selector = f"[automation_id='{element.get('automation_id')}']"
-        elif element.get('name'):
-            selector = f"[name='{element.get('name')}']"
-
-        # --- NEW FALLBACK ---
-        # If no other selector is found, use the text
-        elif text:
-            # Create a Playwright-style text selector
-            # We must escape quotes inside the text
-            selector = f"text={json.dumps(text)}"
-        # --- END OF NEW FALLBACK ---
+    for element in search_area.find_all(INTERACTIVE_TAGS):
+        element_details = _element_details(element)
+        if element_details:
+            interactive_elements.append(element_details)
 
-        else:
-            # Skip elements that cannot be reliably selected at all
+    return interactive_elements
+
+
+def iter_interactive_elements(html, logger, section_context=None):
+    """
+    Lazily yields the same element details as extract_interactive_elements,
+    section first and then the rest of the page, each tagged with its 'tier'.
+    Without a layout there is no viewport, so only SECTION_TIER and PAGE_TIER occur.
+    """
+    soup = as_soup(html)
+    container = _section_area(html, soup, section_context, logger) if section_context else None
+
+    def walk(area):
+        for element in area.descendants:
+            if isinstance(element, Tag) and element.name in INTERACTIVE_TAGS:
+                yield element
+
+    seen = set()
+    if container is not None:
+        for element in walk(container):
+            seen.add(id(element))
+            details = _element_details(element)
+            if details:
+                details['tier'] = SECTION_TIER
+                yield details
+
+    for element in walk(soup):
+        if id(element) in seen:
             continue
+        details = _element_details(element)
+        if details:
+            details['tier'] = PAGE_TIER
+            yield details
 
-        element_details = {
-            "selector": selector,
-            "text": text,
-            "placeholder": element.get('placeholder', ''),
-            "value": element.get('value', '')
-        }
-        interactive_elements.append(element_details)
 
-    return json.dumps(interactive_elements, indent=2)
+def get_ui_summary(html, logger, section_context=None):
+    """
+    Parses HTML to extract a structured summary of interactive elements.
+    If section_context is provided, it narrows the search to that part of the page.
+    """
+    return json.dumps(extract_interactive_elements(html, logger, section_context), indent=2)
 
 
-def build_prompt_for_step(ui_summary, current_step, last_error):
+def extract_elements_for_page(page, logger, section_context=None, engine=None):
     """
-    Builds a focused prompt for the agent to execute a single, specific step.
+    Extracts interactive elements from a live page.
+    The in-browser engine is tried first; the BeautifulSoup path is the fallback.
     """
-    error_context = f'CRITICAL: YOUR LAST ATTEMPT FAILED! Error: "{last_error}". You MUST choose a different action or selector.' if last_error else ""
-    action = current_step['action']
+    engine = engine or load_extraction_engine()
+    with span("extract_elements", engine=engine) as attrs:
+        elements = None
+        if engine == 'browser':
+            try:
+                elements = extract_interactive_elements_in_page(page, logger, section_context)
+            except Exception as e:
+                logger.warning(f"In-browser extraction failed, falling back to HTML parsing: {e}")
+                attrs['engine'] = 'soup'
+        if elements is None:
+            elements = extract_interactive_elements(PageSnapshot.for_page(page), logger, section_context)
+        attrs['elements'] = len(elements)
+        return elements
 
-    section_instruction = ""
-    if current_step.get("section"):
-        section_instruction = f"You are working inside the '{current_step['section']}' section of the page."
+
+def stream_elements_for_page(page, logger, section_context=None, engine=None):
+    """
+    Lazily yields a live page's interactive elements in priority order
+    (see dom_extractor.CANDIDATE_TIERS). Like extract_elements_for_page, the
+    in-browser engine is tried first and HTML parsing is the fallback.
+    """
+    engine = engine or load_extraction_engine()
+    if engine == 'browser':
+        stream = stream_interactive_elements_in_page(page, logger, section_context)
+        try:
+            first = next(stream, None)
+        except Exception as e:
+            logger.warning(f"In-browser extraction failed, falling back to HTML parsing: {e}")
+        else:
+            if first is not None:
+                yield first
+                yield from stream
+            return
+    yield from iter_interactive_elements(PageSnapshot.for_page(page), logger, section_context)
+
+
+def collect_candidates(stream, steps, max_candidates, local_threshold=LOCAL_MATCH_THRESHOLD):
+    """
+    Pulls elements from a stream until `max_candidates` are collected, or
+    until every step has a confident local match. Matches are checked when the
+    tier changes and every STREAM_CHECK_INTERVAL elements, so a target near the
+    top of the priority order stops the stream without reading the rest of the page.
+    """
+    elements = []
+    try:
+        for element in stream:
+            if elements and (element.get('tier') != elements[-1].get('tier') or len(elements) % STREAM_CHECK_INTERVAL == 0):
+                if all(resolve_step_locally(elements, step, local_threshold)[0] for step in steps):
+                    break
+            elements.append(element)
+            if len(elements) >= max_candidates:
+                break
+    finally:
+        stream.close()
+    return elements
+
+
+def candidates_for_steps(page, steps, logger, local_threshold=LOCAL_MATCH_THRESHOLD):
+    """
+    The elements a group of steps is resolved against: all of them, or with
+    CANDIDATE_STREAMING on, the highest-priority ones up to STREAM_MAX_CANDIDATES.
+    """
+    section_context = steps[0].get("section")
+    streaming, max_candidates = load_candidate_streaming()
+    if not streaming:
+        return extract_elements_for_page(page, logger, section_context=section_context)
+
+    with span("extract_elements", engine=load_extraction_engine(), streaming=True) as attrs:
+        elements = collect_candidates(stream_elements_for_page(page, logger, section_context),
+                                      steps, max_candidates, local_threshold)
+        attrs['elements'] = len(elements)
+        return elements
+
+
+def describe_step_task(current_step):
+    """
+    Returns the goal sentence for a single step, or None if the step is not
+    something the AI resolves (like 'wait').
+    """
+    action = current_step['action']
 
     if action == 'fill':
         # --- FIX for KeyError ---
@@ -83,16 +265,30 @@ def build_prompt_for_step(ui_summary, current_step, last_error):
         field_name = current_step['target_name']
         # --- END OF FIX ---
         value = current_step['value']
-        task_instructions = f"Your goal is to fill the field best described as '{field_name}' with the value '{value}'. Find the correct input element in the Current View and provide the 'fill' action."
+        return f"Your goal is to fill the field best described as '{field_name}' with the value '{value}'. Find the correct input element in the Current View and provide the 'fill' action."
     elif action == 'click':
         target_name = current_step['target_name']
-        task_instructions = f"Your goal is to click the button or link best described as '{target_name}'. Find the correct element in the Current View and provide the 'click' action."
+        return f"Your goal is to click the button or link best described as '{target_name}'. Find the correct element in the Current View and provide the 'click' action."
     elif action == 'click_first_in_list':
         list_name = current_step['list_name']
-        task_instructions = f"Your goal is to click the FIRST clickable item (like a link or button) inside the list or container described as '{list_name}'. Find the correct element in the Current View and provide the 'click' action for it."
-    else:
-        # If the action is unknown (like 'wait'), return None.
-        # This is handled by the test script, not the AI.
+        return f"Your goal is to click the FIRST clickable item (like a link or button) inside the list or container described as '{list_name}'. Find the correct element in the Current View and provide the 'click' action for it."
+    # If the action is unknown (like 'wait'), return None.
+    # This is handled by the test script, not the AI.
+    return None
+
+
+def build_prompt_for_step(ui_summary, current_step, last_error):
+    """
+    Builds a focused prompt for the agent to execute a single, specific step.
+    """
+    error_context = f'CRITICAL: YOUR LAST ATTEMPT FAILED! Error: "{last_error}". You MUST choose a different action or selector.' if last_error else ""
+
+    section_instruction = ""
+    if current_step.get("section"):
+        section_instruction = f"You are working inside the '{current_step['section']}' section of the page."
+
+    task_instructions = describe_step_task(current_step)
+    if task_instructions is None:
         return None
 
     return f"""
@@ -100,8 +296,8 @@ You are a meticulous test automation agent. Your task is to perform ONE specific
 {section_instruction}
 {error_context}
 **Current Goal:** {task_instructions}
-**Current View (Visible Interactive Elements):**
-```json
+**Current View (Visible Interactive Elements, in page order, one per line; the last column is the exact selector to use):**
+```
 {ui_summary}
 ```
 **MANDATORY RESPONSE FORMAT:**
@@ -110,48 +306,451 @@ For a fill action: {{"action": "fill", "selector": "<css_selector>", "value": "<
 For a click action: {{"action": "click", "selector": "<css_selector>"}}
 """
 
-def get_next_action_for_step(client, page, current_step, logger, last_error=""):
+
+def build_prompt_for_steps(ui_summary, steps):
     """
-    Gets the next single action from the AI for a specific, isolated step.
+    Builds one prompt that resolves several consecutive steps on the same view.
     """
-    html = page.content()
-    # --- THIS IS THE FIX ---
-    # Pass the logger object to get_ui_summary so it can log warnings
-    ui_summary = get_ui_summary(html, logger, section_context=current_step.get("section"))
-    # --- END OF FIX ---
+    tasks = []
+    for number, step in enumerate(steps, start=1):
+        task = describe_step_task(step)
+        if task is None:
+            return None
+        tasks.append(f"{number}. {task}")
+    tasks_text = '\n'.join(tasks)
+
+    section_instruction = ""
+    if steps[0].get("section"):
+        section_instruction = f"You are working inside the '{steps[0]['section']}' section of the page."
 
-    prompt = build_prompt_for_step(ui_summary, current_step, last_error)
+    return f"""
+You are a meticulous test automation agent. Your task is to plan {len(steps)} actions, in order, on the current view.
+{section_instruction}
+**Goals (one action per goal):**
+{tasks_text}
+**Current View (Visible Interactive Elements, in page order, one per line; the last column is the exact selector to use):**
+```
+{ui_summary}
+```
+**MANDATORY RESPONSE FORMAT:**
+A JSON array with exactly {len(steps)} objects, in the same order as the goals.
+For a fill action: {{"action": "fill", "selector": "<css_selector>", "value": "<value>"}}
+For a click action: {{"action": "click", "selector": "<css_selector>"}}
+"""
+
+
+def resolve_step_locally(elements, current_step, threshold=LOCAL_MATCH_THRESHOLD):
+    """
+    Tries to resolve a step without the LLM.
+    Returns (action, tier) where tier is 'exact' or 'fuzzy', or (None, None).
+    """
+    action_type = current_step.get('action')
+    if action_type not in ('fill', 'click'):
+        return None, None
+
+    target_name = current_step.get('target_name')
+
+    element = find_exact_match(elements, target_name, action_type)
+    tier = 'exact'
+    if element is None:
+        element, _ = find_fuzzy_match(elements, target_name, action_type, threshold)
+        tier = 'fuzzy'
+    if element is None:
+        return None, None
+
+    action = {"action": action_type, "selector": element['selector']}
+    if action_type == 'fill':
+        action['value'] = current_step.get('value', '')
+    return action, tier
+
+
+def replayable_action(action):
+    """Returns the action without the agent's bookkeeping keys."""
+    return {k: v for k, v in action.items() if k not in ACTION_METADATA_KEYS}
+
+
+def step_cache_key(page_url, current_step, elements):
+    """
+    Builds the selector-cache key for a step: the page URL (without fragment),
+    the normalized step, and a fingerprint of the (at most CACHE_KEY_CANDIDATES)
+    elements that match the step target well. Elements unrelated to the step
+    (ads, recommendations, counters) don't change the key.
+    """
+    page_url = page_url.split('#', 1)[0]
+    target = current_step.get('target_name') or current_step.get('list_name') or ''
+    step_name = f"{current_step.get('action')}:{normalize_text(target)}"
+    if current_step.get('section'):
+        step_name += f"@{normalize_text(current_step['section'])}"
+    scored = [(relevance(el, target), el) for el in dedupe_elements(elements)]
+    matching = [el for score, el in sorted(scored, key=lambda pair: pair[0], reverse=True)
+                if score >= CACHE_KEY_MIN_RELEVANCE]
+    selectors = sorted({el['selector'] for el in matching[:CACHE_KEY_CANDIDATES]})
+    fingerprint = hashlib.md5('\n'.join(selectors).encode('utf-8')).hexdigest()
+    return [page_url, step_name, fingerprint]
+
+
+def selector_is_live(page, selector):
+    """Checks that a selector still points at a visible element on the page."""
+    try:
+        result = preflight_selectors(page, [selector])[0]
+    except Exception:
+        return False
+    return result['count'] > 0 and result.get('visible', False)
+
+
+def preflight_problem(action, result, current_step=None):
+    """
+    Why a preflight result rules out an action, or None if it can be executed.
+    Clicks for FIRST_MATCH_STEPS may match several elements; the checks then
+    apply to the first one, which is what gets clicked.
+    """
+    selector = action['selector']
+    if result.get('error'):
+        return f"selector '{selector}' is invalid: {result['error']}"
+    first_match = action.get('action') == 'click' and (current_step or {}).get('action') in FIRST_MATCH_STEPS
+    if result['count'] == 0 or (result['count'] > 1 and not first_match):
+        return f"selector '{selector}' matches {result['count']} elements"
+    if not result['visible']:
+        return f"selector '{selector}' is not visible"
+    if not result['enabled']:
+        return f"selector '{selector}' is disabled"
+    if action.get('action') == 'fill' and not result['editable']:
+        return f"selector '{selector}' cannot be filled"
+    return None
+
+
+def preflight_actions(page, actions, steps=None):
+    """
+    Checks every action's selector in one preflight (see preflight_selectors)
+    and returns a problem description, or None, per action. Each selector must
+    match exactly one visible, enabled element, editable for fill actions.
+    `steps`, aligned with `actions`, lets list clicks match several elements.
+    """
+    with span("preflight", selectors=len(actions)) as attrs:
+        try:
+            results = preflight_selectors(page, [action['selector'] for action in actions])
+        except Exception as e:
+            results = [{"count": 0, "error": str(e).splitlines()[0]}] * len(actions)
+        steps = steps or [None] * len(actions)
+        problems = [preflight_problem(action, result, step) for action, result, step in zip(actions, results, steps)]
+        attrs['failed'] = sum(problem is not None for problem in problems)
+        return problems
+
+
+def alternative_actions(elements, current_step, limit):
+    """The step's action on its `limit` most relevant candidates, to check alongside a model's answer."""
+    action_type = 'fill' if current_step.get('action') == 'fill' else 'click'
+    ranked = rank_elements(dedupe_elements(elements), [current_step])[:limit]
+    return [{"action": action_type, "selector": el['selector']} for el in ranked]
+
+
+def remember_successful_action(action, memory=None):
+    """Writes an LLM-resolved selector back to the cache once it has executed successfully."""
+    if action.get('resolved_by') != 'llm' or not action.get('cache_key'):
+        return
+    memory = memory or memory_singleton
+    memory.remember(*action['cache_key'][:2], action['selector'], fingerprint=action['cache_key'][2])
+
+
+def forget_failed_action(action, memory=None):
+    """Invalidates a cached selector that failed to execute."""
+    if action.get('resolved_by') != 'cache' or not action.get('cache_key'):
+        return
+    memory = memory or memory_singleton
+    memory.forget(*action['cache_key'][:2], fingerprint=action['cache_key'][2])
+
+
+def get_llm_response_text(client, prompt):
+    """Sends a prompt to the model and returns the raw response text."""
+    with span("llm_call", prompt_tokens=estimate_tokens(prompt)) as attrs:
+        # LLMClient (rate limited, with retries and deadlines)
+        if hasattr(client, 'complete'):
+            text = client.complete(prompt)
+        elif hasattr(client, 'generate_content'):
+            text = client.generate_content(prompt).text
+        else:
+            # Fallback for OpenAI-like client, using the configured OpenAI model
+            settings = load_llm_settings()
+            model = next((name for provider, name in settings['models'] if provider == 'openai'), None)
+            if model is None:
+                raise LLMError("No OpenAI model configured; set LLM_PROVIDER=openai and LLM_MODEL, or list one in LLM_MODELS.")
+            text = OpenAIProvider(model, client=client).generate(prompt, settings['deadline'])
+        attrs['response_tokens'] = estimate_tokens(text or '')
+        return text
+
+
+def parse_json_response(response_text, logger):
+    """Extracts and parses the JSON payload of a model response."""
+    match = re.search(r'```json\s*([\s\S]*?)\s*```', response_text)
+    json_str = match.group(1) if match else response_text
+
+    if not json_str.strip():
+        logger.warning("AI returned an empty response.")
+        return None
+
+    return json.loads(json_str)
+
+
+def is_valid_action(action):
+    return isinstance(action, dict) and "action" in action and "selector" in action
+
+
+def app_key(page_url):
+    """The app a page belongs to, for per-app model statistics."""
+    return urlparse(page_url).netloc
+
+
+def intent_problem(action, current_step, elements):
+    """Flags an action on a listed candidate that looks nothing like the step's target."""
+    selector = action['selector']
+    target = current_step.get('target_name')
+    listed = [el for el in elements if el['selector'] == selector]
+    if target and listed and max(relevance(el, target) for el in listed) < MIN_INTENT_RELEVANCE:
+        return f"'{selector}' does not look like '{target}'"
+    return None
+
+
+def step_mismatch(action, current_step):
+    """Why a planned action doesn't carry out its step (wrong action type or fill value), or None."""
+    expected = 'fill' if current_step.get('action') == 'fill' else 'click'
+    if action['action'] != expected:
+        return f"a '{action['action']}' action was planned for a '{current_step.get('action')}' step"
+    if expected == 'fill' and str(action.get('value', '')) != str(current_step.get('value', '')):
+        return f"the planned value '{action.get('value', '')}' is not the step's '{current_step.get('value', '')}'"
+    return None
+
+
+def check_action_on_page(page, action, current_step, elements, preflighted=None):
+    """
+    Returns why a model's action can't be trusted, or None: it must pass the
+    preflight, and if its element is a listed candidate it must plausibly be
+    the step's target. If `preflighted` is given, (action, preflight problem)
+    is appended to it so the result can be reused.
+    """
+    problem = preflight_actions(page, [action], [current_step])[0]
+    if preflighted is not None:
+        preflighted.append((action, problem))
+    return problem or intent_problem(action, current_step, elements)
+
+
+def _ask_for_action(client, prompt, logger):
+    action = parse_json_response(get_llm_response_text(client, prompt), logger)
+
+    # --- Add validation for the AI's response ---
+    if action is not None and not is_valid_action(action):
+        logger.warning(f"AI returned invalid JSON: {action}")
+        return None
+
+    return action
+
+
+def get_action_from_llm(client, prompt, logger, validate=None, app=''):
+    """
+    Sends a prompt to the model and parses the returned JSON action.
+    With a ModelRouter, each answer is checked with validate(action) and
+    escalated to the next model if it fails; action['model'] records which model answered.
+    """
+    if isinstance(client, ModelRouter):
+        action, model = client.route(lambda c: _ask_for_action(c, prompt, logger), validate or (lambda a: None), logger, app)
+        if action:
+            action['model'] = model
+        return action
+    return _ask_for_action(client, prompt, logger)
+
+
+def resolve_without_llm(page, elements, current_step, cache_key, logger, memory, local_threshold=LOCAL_MATCH_THRESHOLD):
+    """
+    Runs the cheap resolution tiers: the selector cache, then the local matcher.
+    Returns the action, or None when the step needs the LLM.
+    """
+    with span("resolve_local", elements=len(elements)) as attrs:
+        action = _resolve_without_llm(page, elements, current_step, cache_key, logger, memory, local_threshold)
+        attrs['resolved_by'] = action['resolved_by'] if action else None
+        return action
+
+
+def _resolve_without_llm(page, elements, current_step, cache_key, logger, memory, local_threshold):
+    cached_selector = memory.recall(*cache_key[:2], fingerprint=cache_key[2])
+    if cached_selector:
+        if selector_is_live(page, cached_selector):
+            logger.info(f"Step resolved from selector cache: {cached_selector}")
+            action_type = 'fill' if current_step['action'] == 'fill' else 'click'
+            action = {"action": action_type, "selector": cached_selector,
+                      "resolved_by": "cache", "cache_key": cache_key}
+            if action_type == 'fill':
+                action['value'] = current_step.get('value', '')
+            return action
+        logger.warning(f"Cached selector '{cached_selector}' is no longer on the page. Invalidating it.")
+        memory.forget(*cache_key[:2], fingerprint=cache_key[2])
+
+    action, tier = resolve_step_locally(elements, current_step, local_threshold)
+    if action:
+        logger.info(f"Step resolved locally ({tier}): {action['selector']}")
+        action['resolved_by'] = tier
+        return action
+    return None
+
+
+def get_next_action_for_step(client, page, current_step, logger, last_error="", local_threshold=LOCAL_MATCH_THRESHOLD, memory=None):
+    """
+    Gets the next single action for a specific, isolated step.
+    Resolution is tiered: the selector cache, an exact local match, a fuzzy
+    local match, and only then the LLM. The winning tier is stored in
+    action['resolved_by'].
+    """
+    memory = memory or memory_singleton
+    elements = candidates_for_steps(page, [current_step], logger, local_threshold)
+    cache_key = step_cache_key(page.url, current_step, elements)
+
+    # --- TIERED RESOLUTION ---
+    # A retry means the previous answer was wrong, so go straight to the model.
+    if not last_error:
+        action = resolve_without_llm(page, elements, current_step, cache_key, logger, memory, local_threshold)
+        if action:
+            return action
+
+    with span("build_prompt", elements=len(elements)) as attrs:
+        token_budget, max_candidates = load_prompt_budget()
+        ui_summary = compact_ui_summary(elements, current_step, logger, token_budget, max_candidates)
+        prompt = build_prompt_for_step(ui_summary, current_step, last_error)
+        attrs['prompt_tokens'] = estimate_tokens(prompt or '')
 
     if prompt is None:
         logger.warning(f"Could not build a prompt for the step action: {current_step.get('action')}")
         return None
 
-    logger.info(f"Getting AI action for step: {current_step}")
-    try:
-        if hasattr(client, 'generate_content'):
-            response = client.generate_content(prompt)
-            response_text = response.text
+    # --- PREFLIGHT ---
+    # A bad selector is caught here in one page evaluation and sent back to the
+    # model, instead of blocking page.click/page.fill until they time out.
+    retries, alternative_count = load_preflight_settings()
+    alternatives = alternative_actions(elements, current_step, alternative_count)
+    for attempt in range(retries + 1):
+        if attempt:
+            prompt = build_prompt_for_step(ui_summary, current_step, last_error)
+
+        logger.info(f"Getting AI action for step: {current_step}")
+        preflighted = []  # (action, problem) for every answer a ModelRouter validated
+        try:
+            action = get_action_from_llm(client, prompt, logger, app=app_key(page.url),
+                                         validate=lambda a: check_action_on_page(page, a, current_step, elements, preflighted))
+        except Exception as e:
+            logger.error(f"Failed to get or parse AI action for step {current_step}: {e}")
+            return None
+        if not action:
+            return action
+
+        # The router already preflighted its answer; otherwise check it along with the alternatives
+        checked = [problem for answer, problem in preflighted if answer is action]
+        if checked:
+            problem = checked[-1]
+            alternative_problems = preflight_actions(page, alternatives, [current_step] * len(alternatives)) if problem else []
         else:
-            # Fallback for OpenAI-like client
-            response = client.chat.completions.create(model="gpt-4-turbo", messages=[{"role": "user", "content": prompt}])
-            response_text = response.choices[0].message.content
+            problem, *alternative_problems = preflight_actions(page, [action] + alternatives,
+                                                               [current_step] * (len(alternatives) + 1))
+        if problem is None:
+            model = f" ({action['model']})" if action.get('model') else ""
+            logger.info(f"Step resolved by LLM{model}: {action['selector']}")
+            action['resolved_by'] = 'llm'
+            action['cache_key'] = cache_key
+            return action
 
-        match = re.search(r'```json\s*([\s\S]*?)\s*```', response_text)
-        json_str = match.group(1) if match else response_text
+        passing = [alt['selector'] for alt, alt_problem in zip(alternatives, alternative_problems)
+                   if alt_problem is None and alt['selector'] != action['selector']]
+        last_error = problem + (f". These selectors do match one usable element: {', '.join(passing)}" if passing else "")
+        logger.warning(f"Preflight rejected the AI action ({problem}). Retries left: {retries - attempt}.")
 
-        if not json_str.strip():
-            logger.warning("AI returned an empty response.")
-            return None
+    logger.error(f"No AI action for step {current_step} passed the preflight.")
+    return None
 
-        action = json.loads(json_str)
 
-        # --- Add validation for the AI's response ---
-        if not isinstance(action, dict) or "action" not in action or "selector" not in action:
-            logger.warning(f"AI returned invalid JSON: {json_str}")
-            return None
+def get_actions_for_steps(client, page, steps, logger, local_threshold=LOCAL_MATCH_THRESHOLD, memory=None):
+    """
+    Resolves a group of consecutive steps that act on the same view.
+    Steps the cache or local matcher can't answer are sent to the model in ONE
+    prompt. Returns a list aligned with `steps`; entries are None when a step
+    could not be planned and should be resolved on its own.
+    """
+    memory = memory or memory_singleton
+    elements = candidates_for_steps(page, steps, logger, local_threshold)
 
-        return action
+    actions = []
+    pending = []
+    for index, step in enumerate(steps):
+        cache_key = step_cache_key(page.url, step, elements)
+        action = resolve_without_llm(page, elements, step, cache_key, logger, memory, local_threshold)
+        actions.append(action)
+        if action is None:
+            pending.append((index, step, cache_key))
+
+    # A single unresolved step gains nothing from batching
+    if len(pending) < 2:
+        return actions
+
+    pending_steps = [step for _, step, _ in pending]
+    with span("build_prompt", elements=len(elements), steps=len(pending_steps)) as attrs:
+        token_budget, max_candidates = load_prompt_budget()
+        ui_summary = compact_ui_summary(elements, pending_steps, logger, token_budget, max_candidates)
+        prompt = build_prompt_for_steps(ui_summary, pending_steps)
+        attrs['prompt_tokens'] = estimate_tokens(prompt or '')
+    if prompt is None:
+        return actions
+
+    def ask(model_client):
+        return parse_json_response(get_llm_response_text(model_client, prompt), logger)
+
+    def is_valid_plan(planned):
+        return isinstance(planned, list) and len(planned) == len(pending) and all(is_valid_action(a) for a in planned)
+
+    def plan_mismatch(planned):
+        return next(filter(None, map(step_mismatch, planned, pending_steps)), None)
+
+    preflighted = []  # (plan, preflight problems) for every plan the router validated
+
+    def check_plan(planned):
+        if not is_valid_plan(planned):
+            return "invalid batch plan"
+        mismatch = plan_mismatch(planned)
+        if mismatch:
+            return mismatch
+        problems = preflight_actions(page, planned, pending_steps)
+        preflighted.append((planned, problems))
+        problems = problems + [intent_problem(action, step, elements) for (_, step, _), action in zip(pending, planned)]
+        return next((problem for problem in problems if problem), None)
 
+    logger.info(f"Getting AI actions for {len(pending_steps)} steps in one call")
+    model = None
+    try:
+        if isinstance(client, ModelRouter):
+            planned, model = client.route(ask, check_plan, logger, app_key(page.url))
+        else:
+            planned = ask(client)
     except Exception as e:
-        logger.error(f"Failed to get or parse AI action for step {current_step}: {e}")
-        return None
\ No newline at end of file
+        logger.error(f"Failed to get or parse batched AI actions: {e}")
+        return actions
+
+    if not is_valid_plan(planned):
+        logger.warning(f"AI returned an invalid batch plan: {planned}")
+        return actions
+
+    # A plan that misreads any step (say, values shifted between fields) can't be trusted at all
+    mismatch = plan_mismatch(planned)
+    if mismatch:
+        logger.warning(f"AI batch plan doesn't match its steps ({mismatch}); resolving them one by one.")
+        return actions
+
+    # One preflight for the whole plan (reusing the router's); rejected steps are resolved on their own,
+    # as are low-confidence ones when a router can escalate them
+    checked = [problems for plan, problems in preflighted if plan is planned]
+    problems = checked[-1] if checked else preflight_actions(page, planned, pending_steps)
+    for (index, step, cache_key), action, problem in zip(pending, planned, problems):
+        if not problem and isinstance(client, ModelRouter):
+            problem = intent_problem(action, step, elements)
+        if problem:
+            logger.warning(f"Rejected the planned action for step {step} ({problem}).")
+            continue
+        action['resolved_by'] = 'llm'
+        action['cache_key'] = cache_key
+        if model:
+            action['model'] = model
+        actions[index] = action
+    return actions
@@ -0,0 +1,307 @@
+# Helpers shared by the in-page scripts below; spliced into each function body.
+_HELPERS_JS = r"""
+    const CONTAINER_TAGS = new Set(['DIV', 'FORM', 'FIELDSET', 'SECTION']);
+    const INTERACTIVE = 'input, button, a, select, textarea';
+    const cleanText = (el) => (el.textContent || '').replace(/\s+/g, ' ').trim();
+
+    const isVisible = (el, rect) => {
+        if (rect.width <= 0 || rect.height <= 0) return false;
+        const style = window.getComputedStyle(el);
+        return style.visibility !== 'hidden' && style.display !== 'none' && parseFloat(style.opacity || '1') > 0;
+    };
+
+    // --- Section scoping: the same algorithm as section_index.TextIndex ---
+    // All text joined once (each string trimmed, no separator), with each
+    // offset mapped back to its text node; a match's element is the deepest
+    // one covering it, and a match inside a heading wins over earlier ones.
+    const SKIPPED_TEXT_PARENTS = new Set(['SCRIPT', 'STYLE', 'TEMPLATE']);
+    const HEADING_TAGS = new Set(['H1', 'H2', 'H3', 'H4', 'H5', 'H6', 'LEGEND', 'CAPTION']);
+
+    const findSectionText = (sectionContext) => {
+        const starts = [], nodes = [], parts = [];
+        let length = 0;
+        const walker = document.createTreeWalker(document.documentElement, NodeFilter.SHOW_TEXT);
+        for (let node = walker.nextNode(); node; node = walker.nextNode()) {
+            const parent = node.parentElement;
+            if (!parent || SKIPPED_TEXT_PARENTS.has(parent.tagName)) continue;
+            const part = node.data.trim();
+            if (!part) continue;
+            starts.push(length);
+            nodes.push(node);
+            parts.push(part);
+            length += part.length;
+        }
+        const text = parts.join('');
+
+        const elementAt = (offset) => {
+            let low = 0, high = starts.length - 1;
+            while (low < high) {
+                const mid = (low + high + 1) >> 1;
+                if (starts[mid] <= offset) low = mid; else high = mid - 1;
+            }
+            return nodes[low].parentElement;
+        };
+        const elementContaining = (start, end) => {
+            const first = elementAt(start);
+            for (let el = elementAt(end - 1); el; el = el.parentElement) {
+                if (el.contains(first)) return el;
+            }
+            return null;
+        };
+
+        let firstMatch = null;
+        for (let start = text.indexOf(sectionContext); start !== -1; start = text.indexOf(sectionContext, start + 1)) {
+            const element = elementContaining(start, start + sectionContext.length);
+            if (element && HEADING_TAGS.has(element.tagName)) return element;
+            if (firstMatch === null) firstMatch = element;
+        }
+        return firstMatch;
+    };
+
+    const findSectionRoot = (sectionContext) => {
+        if (!sectionContext) return null;
+        const textTag = findSectionText(sectionContext);
+        let container = textTag ? textTag.parentElement : null;
+        while (container && !CONTAINER_TAGS.has(container.tagName)) container = container.parentElement;
+        return container;
+    };
+
+    // Details of one candidate, or null if it is hidden, disabled or has no usable selector
+    const describe = (el) => {
+        if (el.tagName === 'INPUT' && (el.type || '').toLowerCase() === 'hidden') return null;
+        if (el.disabled) return null;
+
+        const rect = el.getBoundingClientRect();
+        if (!isVisible(el, rect)) return null;
+
+        const text = cleanText(el);
+        let selector = '';
+        if (el.id) selector = '#' + el.id;
+        else if (el.getAttribute('automation_id')) selector = "[automation_id='" + el.getAttribute('automation_id') + "']";
+        else if (el.getAttribute('name')) selector = "[name='" + el.getAttribute('name') + "']";
+        else if (text) selector = 'text=' + JSON.stringify(text);
+        else return null;
+
+        return {
+            tag: el.tagName.toLowerCase(),
+            selector: selector,
+            text: text,
+            placeholder: el.getAttribute('placeholder') || '',
+            value: el.getAttribute('value') || '',
+            visible: true,
+            box: {x: Math.round(rect.x), y: Math.round(rect.y), width: Math.round(rect.width), height: Math.round(rect.height)},
+        };
+    };
+"""
+
+# Runs as a single page.evaluate() so only visible, enabled candidates leave the browser.
+EXTRACT_INTERACTIVE_ELEMENTS_JS = "(sectionContext) => {" + _HELPERS_JS + r"""
+    const container = findSectionRoot(sectionContext);
+    const root = container || document;
+
+    const elements = [];
+    for (const el of root.querySelectorAll(INTERACTIVE)) {
+        const details = describe(el);
+        if (details) elements.push(details);
+    }
+    return {scoped: container !== null, elements: elements};
+}
+"""
+
+# Returns the next chunk of candidates in priority order (see CANDIDATE_TIERS).
+# The ordering is worked out on the first call (start == 0) and kept on window,
+# so later chunks only describe the elements they return.
+STREAM_INTERACTIVE_ELEMENTS_JS = "({sectionContext, start, limit}) => {" + _HELPERS_JS + r"""
+    let state = window.__autotesterCandidateStream;
+    if (start === 0 || !state) {
+        const container = findSectionRoot(sectionContext);
+        const width = window.innerWidth, height = window.innerHeight;
+        const tiers = [[], [], [], []];
+        for (const el of document.querySelectorAll(INTERACTIVE)) {
+            const rect = el.getBoundingClientRect();
+            const inViewport = rect.bottom > 0 && rect.right > 0 && rect.top < height && rect.left < width;
+            const inSection = container !== null && container.contains(el);
+            tiers[(inSection ? 0 : 2) + (inViewport ? 0 : 1)].push(el);
+        }
+        state = window.__autotesterCandidateStream = {
+            scoped: container !== null,
+            nodes: [].concat(...tiers),
+            tierOf: [].concat(...tiers.map((nodes, tier) => nodes.map(() => tier))),
+        };
+    }
+
+    const elements = [];
+    let i = start;
+    for (; i < state.nodes.length && elements.length < limit; i++) {
+        if (!state.nodes[i].isConnected) continue;
+        const details = describe(state.nodes[i]);
+        if (details) {
+            details.tier = state.tierOf[i];
+            elements.push(details);
+        }
+    }
+    return {scoped: state.scoped, elements: elements, next: i, done: i >= state.nodes.length};
+}
+"""
+
+# Checks a list of selectors in one page.evaluate(). CSS, XPath and quoted text=
+# selectors are resolved in the page; anything else (Playwright-only engines or
+# CSS extensions like :has-text) is flagged `unsupported` for a locator check.
+PREFLIGHT_SELECTORS_JS = r"""
+(selectors) => {
+    const SKIPPED_TAGS = new Set(['SCRIPT', 'STYLE', 'NOSCRIPT', 'TEMPLATE', 'HEAD']);
+    const UNFILLABLE_INPUTS = new Set(['checkbox', 'radio', 'file', 'button', 'submit', 'reset', 'image', 'hidden']);
+    const norm = (s) => (s || '').replace(/\s+/g, ' ').trim();
+
+    // Like Playwright's strict text matching: the deepest elements whose whole text equals `target`
+    const byText = (target) => {
+        const found = new Set();
+        const walker = document.createTreeWalker(document.body || document.documentElement, NodeFilter.SHOW_TEXT);
+        for (let node = walker.nextNode(); node; node = walker.nextNode()) {
+            const data = norm(node.data);
+            if (!data || !target.includes(data)) continue;
+            for (let el = node.parentElement; el && !SKIPPED_TAGS.has(el.tagName); el = el.parentElement) {
+                const text = norm(el.textContent);
+                if (text === target) {
+                    found.add(el);
+                    break;
+                }
+                if (text.length > target.length) break;
+            }
+        }
+        for (const el of document.querySelectorAll('input[type=button], input[type=submit], input[type=reset]')) {
+            if (norm(el.value) === target) found.add(el);
+        }
+        const matches = [...found];
+        return matches.filter((el) => !matches.some((other) => other !== el && el.contains(other)));
+    };
+
+    const resolve = (selector) => {
+        const engine = selector.match(/^([a-zA-Z_-]+)=/);
+        if (engine && engine[1] === 'text') {
+            const body = selector.slice(5).trim();
+            if (body.length > 1 && body.startsWith('"') && body.endsWith('"')) return byText(norm(JSON.parse(body)));
+            if (body.length > 1 && body.startsWith("'") && body.endsWith("'")) return byText(norm(body.slice(1, -1)));
+            return null;
+        }
+        if ((engine && engine[1] === 'xpath') || selector.startsWith('//') || selector.startsWith('..')) {
+            const expression = engine ? selector.slice(6) : selector;
+            const snapshot = document.evaluate(expression, document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+            const nodes = [];
+            for (let i = 0; i < snapshot.snapshotLength; i++) nodes.push(snapshot.snapshotItem(i));
+            return nodes.filter((node) => node.nodeType === Node.ELEMENT_NODE);
+        }
+        if (engine && engine[1] !== 'css') return null;
+        if (selector.includes('>>')) return null;
+        try {
+            return [...document.querySelectorAll(engine ? selector.slice(4) : selector)];
+        } catch (e) {
+            return null;  // Possibly a Playwright CSS extension
+        }
+    };
+
+    const isVisible = (el) => {
+        const rect = el.getBoundingClientRect();
+        return rect.width > 0 && rect.height > 0 && window.getComputedStyle(el).visibility !== 'hidden';
+    };
+
+    return selectors.map((selector) => {
+        let matches;
+        try {
+            matches = resolve(selector);
+        } catch (e) {
+            return {count: 0, error: String(e.message || e)};
+        }
+        if (matches === null) return {unsupported: true};
+        if (!matches.length) return {count: 0, visible: false, enabled: false, editable: false};
+
+        const el = matches[0];
+        const enabled = !el.matches(':disabled') && el.getAttribute('aria-disabled') !== 'true';
+        const tag = el.tagName;
+        const fillable = el.isContentEditable || tag === 'TEXTAREA'
+            || (tag === 'INPUT' && !UNFILLABLE_INPUTS.has((el.type || '').toLowerCase()));
+        return {
+            count: matches.length,
+            visible: isVisible(el),
+            enabled: enabled,
+            editable: enabled && fillable && !el.readOnly,
+        };
+    });
+}
+"""
+
+# Streaming priority order. The HTML path has no layout, so it only uses SECTION and PAGE.
+CANDIDATE_TIERS = {0: 'section, in viewport', 1: 'section', 2: 'viewport', 3: 'page'}
+SECTION_TIER, PAGE_TIER = 1, 3
+
+STREAM_CHUNK_SIZE = 50
+
+
+def _log_scoping(logger, section_context, scoped):
+    if section_context:
+        if scoped:
+            logger.info(f"Narrowed search to section: '{section_context}'")
+        else:
+            logger.warning(f"Could not find section '{section_context}' in the page. Searching whole page.")
+
+
+def extract_interactive_elements_in_page(page, logger, section_context=None):
+    """
+    Extracts visible, enabled interactive elements inside the browser.
+    Uses the same selector priority as the BeautifulSoup extractor
+    (id -> automation_id -> name -> text) and adds bounding boxes.
+    """
+    result = page.evaluate(EXTRACT_INTERACTIVE_ELEMENTS_JS, section_context)
+    _log_scoping(logger, section_context, result['scoped'])
+    return result['elements']
+
+
+def _preflight_with_locator(page, selector):
+    """The same checks as PREFLIGHT_SELECTORS_JS, through Playwright's own selector engines."""
+    try:
+        locator = page.locator(selector)
+        count = locator.count()
+        if count == 0:
+            return {"count": 0, "visible": False, "enabled": False, "editable": False}
+        first = locator.first
+        enabled = first.is_enabled(timeout=1000)
+        return {"count": count, "visible": first.is_visible(), "enabled": enabled,
+                "editable": enabled and first.is_editable(timeout=1000)}
+    except Exception as e:
+        return {"count": 0, "error": str(e).splitlines()[0]}
+
+
+def preflight_selectors(page, selectors):
+    """
+    Checks several selectors at once without waiting on any of them. For each
+    one returns {'count', 'visible', 'enabled', 'editable'} (the last three
+    about the first match), or {'count': 0, 'error'} if it can't be evaluated.
+    One page.evaluate() covers CSS, XPath and quoted text selectors; others
+    fall back to a locator check each.
+    """
+    selectors = list(selectors)
+    results = page.evaluate(PREFLIGHT_SELECTORS_JS, selectors) if selectors else []
+    for selector, result in zip(selectors, results):
+        if result.pop('unsupported', False):
+            result.update(_preflight_with_locator(page, selector))
+    return results
+
+
+def stream_interactive_elements_in_page(page, logger, section_context=None, chunk_size=STREAM_CHUNK_SIZE):
+    """
+    Yields visible, enabled interactive elements in priority order: the
+    section's elements in the viewport, the rest of the section, the rest of
+    the viewport, then everything else. Each element carries its 'tier'.
+    Elements are fetched `chunk_size` at a time, so stopping early skips
+    describing and transferring the rest of the page.
+    """
+    start = 0
+    while True:
+        result = page.evaluate(STREAM_INTERACTIVE_ELEMENTS_JS,
+                               {"sectionContext": section_context, "start": start, "limit": chunk_size})
+        if start == 0:
+            _log_scoping(logger, section_context, result['scoped'])
+        yield from result['elements']
+        if result['done']:
+            return
+        start = result['next']
@@ -1,112 +1,333 @@
+import os
 import re
+import threading
 
-def parse_feature_file_to_steps(feature_path, target_scenario):
+# --- REGEX PATTERNS ---
+# Compiled once. Each is matched against the step text *after* its keyword,
+# and only the group for the step's verb is tried.
+
+# --- NEW: Steps that provide their own selector ---
+fill_by_selector_pattern = re.compile(r'I\s+enter\s+"(.*?)"\s+into\s+field\s+with\s+selector\s+"(.*?)"', re.IGNORECASE)
+click_by_selector_pattern = re.compile(r'I\s+click\s+element\s+with\s+selector\s+"(.*?)"', re.IGNORECASE)
+
+# --- Standard AI-driven steps ---
+fill_pattern_1 = re.compile(r'I\s+enter\s+(.+?)\s+as\s+"(.*?)"', re.IGNORECASE)
+fill_pattern_2 = re.compile(r'I\s+enter\s+"(.*?)"\s+as\s+(.*)', re.IGNORECASE)
+click_pattern_quoted = re.compile(r'I\s+click\s+on\s+"(.*?)"(?: \s+button)?', re.IGNORECASE)
+click_pattern_unquoted = re.compile(r'I\s+click\s+on\s+([^\"]*)', re.IGNORECASE)
+
+# --- Context and Wait steps ---
+wait_pattern = re.compile(r'I\s+(?:should be on the|see the|see|wait for)\s+"(.*?)"(?: \s+page)?', re.IGNORECASE)
+section_pattern = re.compile(r'I\s+am\s+under\s+the\s+"(.*?)"\s+section', re.IGNORECASE)
+
+# --- Session preconditions ---
+logged_in_pattern = re.compile(r'the\s+user\s+is\s+logged\s+in(?:\s+as\s+"(.*?)")?\s*$', re.IGNORECASE)
+
+STEP_KEYWORDS = {'given', 'when', 'then', 'and', 'but', '*'}
+ACTION_KEYWORDS = {'when', 'and', 'then', 'but', '*'}
+SECTION_KEYWORDS = {'given', 'and', 'when', 'but', '*'}
+
+SCENARIO_HEADERS = ('Scenario Outline:', 'Scenario Template:', 'Scenario:', 'Example:')
+EXAMPLES_HEADERS = ('Examples:', 'Scenarios:')
+DOC_STRING_DELIMITERS = ('"""', '```')
+
+# Keys that describe where a step came from rather than what it does.
+STEP_SOURCE_KEYS = ('line', 'doc_string', 'data_table')
+
+# Scenarios tagged @login (or @login:<profile>) produce the session for that profile.
+LOGIN_TAG = '@login'
+DEFAULT_SESSION_PROFILE = 'default'
+
+OUTLINE_PARAMETER = re.compile(r'<([^<>]+)>')
+
+_compiled_cache = {}
+_compiled_cache_lock = threading.Lock()
+
+
+def _split_keyword(line):
+    keyword, _, rest = line.partition(' ')
+    return keyword.lower(), rest.strip()
+
+
+def parse_step_line(line, current_section):
     """
-    Parses a .feature file for a specific scenario and extracts Gherkin steps,
-    including section context and direct selector steps.
+    Turns one Gherkin step line into a step dict.
+    Returns (step, new_section); step is None for lines that are not actions
+    (skipped 'Given' preconditions, section markers, unrecognized text).
     """
+    keyword, text = _split_keyword(line)
+
+    if keyword in SECTION_KEYWORDS and text.lower().startswith('i am'):
+        section_match = section_pattern.match(text)
+        if section_match:
+            return None, section_match.group(1).strip()
+
+    # Skip any "Given" step that isn't a section step
+    if keyword not in ACTION_KEYWORDS:
+        return None, current_section
+
+    lowered = text.lower()
+
+    if lowered.startswith('i enter'):
+        # Check for "By Selector" steps FIRST
+        match = fill_by_selector_pattern.match(text)
+        if match:
+            return {'action': 'fill', 'selector': match.group(2).strip(), 'value': match.group(1).strip()}, current_section
+        match = fill_pattern_1.match(text)
+        if match:
+            return {'action': 'fill', 'target_name': match.group(1).strip(), 'value': match.group(2).strip(), 'section': current_section}, current_section
+        match = fill_pattern_2.match(text)
+        if match:
+            return {'action': 'fill', 'target_name': match.group(2).strip(), 'value': match.group(1).strip(), 'section': current_section}, current_section
+        return None, current_section
+
+    if lowered.startswith('i click'):
+        match = click_by_selector_pattern.match(text)
+        if match:
+            return {'action': 'click', 'selector': match.group(1).strip()}, current_section
+        match = click_pattern_quoted.match(text)
+        if match:
+            return {'action': 'click', 'target_name': match.group(1).strip(), 'section': current_section}, current_section
+        match = click_pattern_unquoted.match(text)
+        if match:
+            target_name = match.group(1).strip().replace('button', '').strip()
+            if target_name:
+                return {'action': 'click', 'target_name': target_name, 'section': current_section}, current_section
+        return None, current_section
+
+    match = wait_pattern.match(text)
+    if match:
+        # Reset section after a wait
+        return {'action': 'wait', 'target_name': match.group(1).strip()}, None
+
+    return None, current_section
+
+
+def _parse_table_row(line):
+    return [cell.strip() for cell in line.strip().strip('|').split('|')]
+
+
+def _substitute(text, row):
+    return OUTLINE_PARAMETER.sub(lambda m: row.get(m.group(1), m.group(0)), text)
+
+
+def login_profile_for(tags):
+    """The session profile a scenario logs in as, from its @login tag, or None."""
+    for tag in tags:
+        if tag == LOGIN_TAG:
+            return DEFAULT_SESSION_PROFILE
+        if tag.startswith(f"{LOGIN_TAG}:"):
+            return tag.split(':', 1)[1] or DEFAULT_SESSION_PROFILE
+    return None
+
+
+def _session_precondition(raw_steps):
+    """The profile named by a 'Given the user is logged in [as "<profile>"]' step, or None."""
+    for _, text, _, _ in raw_steps:
+        keyword, rest = _split_keyword(text)
+        if keyword in STEP_KEYWORDS:
+            match = logged_in_pattern.match(rest)
+            if match:
+                return match.group(1) or DEFAULT_SESSION_PROFILE
+    return None
+
+
+def _build_steps(raw_steps):
+    """Parses raw (line_no, text, doc_string, data_table) tuples into step dicts."""
     steps = []
-    in_scenario = False
     current_section = None
+    for line_no, text, doc_string, data_table in raw_steps:
+        step, current_section = parse_step_line(text, current_section)
+        if step is None:
+            continue
+        step['line'] = line_no
+        if doc_string is not None:
+            step['doc_string'] = doc_string
+        if data_table:
+            step['data_table'] = data_table
+        steps.append(step)
+    return steps
+
+
+def _finish_scenario(feature, scenario, background):
+    """Expands a raw scenario (or outline) into compiled scenarios on the feature."""
+    raw_steps = background + scenario['raw_steps']
+
+    if not scenario['is_outline']:
+        tags = feature['tags'] + scenario['tags']
+        feature['scenarios'].append({
+            'name': scenario['name'],
+            'tags': tags,
+            'line': scenario['line'],
+            'outline': None,
+            'example': None,
+            'session': _session_precondition(raw_steps),
+            'login_profile': login_profile_for(tags),
+            'steps': _build_steps(raw_steps),
+        })
+        return
+
+    # --- Scenario Outline: one scenario per Examples row ---
+    for examples in scenario['examples']:
+        header = examples['header']
+        for row_line, cells in examples['rows']:
+            row = dict(zip(header, cells))
+            substituted = [
+                (line_no, _substitute(text, row),
+                 _substitute(doc, row) if doc is not None else None,
+                 [[_substitute(cell, row) for cell in r] for r in table] if table else table)
+                for line_no, text, doc, table in raw_steps
+            ]
+            name = _substitute(scenario['name'], row)
+            if name == scenario['name']:
+                name = f"{name} [{' | '.join(cells)}]"
+            tags = feature['tags'] + scenario['tags'] + examples['tags']
+            feature['scenarios'].append({
+                'name': name,
+                'tags': tags,
+                'line': row_line,
+                'outline': scenario['name'],
+                'example': row,
+                'session': _session_precondition(substituted),
+                'login_profile': login_profile_for(tags),
+                'steps': _build_steps(substituted),
+            })
+
+
+def compile_feature_text(text, path=''):
+    """
+    Compiles a whole .feature file in a single pass.
+    Returns {'name', 'path', 'tags', 'scenarios': [...]}; every scenario has
+    its name, tags, source line, parsed steps, the login profile it needs
+    ('session') and the one it provides ('login_profile'). Background steps are
+    prepended to each scenario, and Scenario Outlines are expanded once per
+    Examples row.
+    """
+    feature = {'name': '', 'path': path, 'tags': [], 'scenarios': []}
+    background = []
+    scenario = None
+    target_steps = None   # list the next step lines go into
+    pending_tags = []
+    in_examples = None
+    doc_string = None     # (delimiter, lines) while inside a doc string
+
+    for line_no, line in enumerate(text.splitlines(), start=1):
+        stripped = line.strip()
+
+        if doc_string is not None:
+            if stripped.startswith(doc_string[0]):
+                # Attach to the step the doc string follows
+                if target_steps:
+                    number, step_text, _, table = target_steps[-1]
+                    target_steps[-1] = (number, step_text, '\n'.join(doc_string[1]), table)
+                doc_string = None
+            else:
+                doc_string[1].append(stripped)
+            continue
+
+        if not stripped or stripped.startswith('#'):
+            continue
+
+        if stripped.startswith(DOC_STRING_DELIMITERS):
+            doc_string = (stripped[:3], [])
+            continue
+
+        if stripped.startswith('@'):
+            pending_tags.extend(tag for tag in stripped.split() if tag.startswith('@'))
+            continue
+
+        if stripped.startswith('Feature:'):
+            feature['name'] = stripped[len('Feature:'):].strip()
+            feature['tags'] = pending_tags
+            pending_tags = []
+            continue
 
-    # --- REGEX PATTERNS ---
+        if stripped.startswith('Background:'):
+            target_steps = background
+            in_examples = None
+            continue
 
-    # --- NEW: Steps that provide their own selector ---
-    fill_by_selector_pattern = re.compile(
-        r'(?:When|And|Then)\s+I\s+enter\s+"(.*?)"\s+into\s+field\s+with\s+selector\s+"(.*?)"',
-        re.IGNORECASE
-    )
-    click_by_selector_pattern = re.compile(
-        r'(?:When|And|Then)\s+I\s+click\s+element\s+with\s+selector\s+"(.*?)"',
-        re.IGNORECASE
-    )
+        header = next((h for h in SCENARIO_HEADERS if stripped.startswith(h)), None)
+        if header:
+            if scenario:
+                _finish_scenario(feature, scenario, background)
+            scenario = {
+                'name': stripped[len(header):].strip(),
+                'tags': pending_tags,
+                'line': line_no,
+                'is_outline': header in ('Scenario Outline:', 'Scenario Template:'),
+                'raw_steps': [],
+                'examples': [],
+            }
+            pending_tags = []
+            target_steps = scenario['raw_steps']
+            in_examples = None
+            continue
 
-    # --- Standard AI-driven steps ---
-    fill_pattern_1 = re.compile(r'(?:When|And|Then)\s+I\s+enter\s+(.+?)\s+as\s+"(.*?)"', re.IGNORECASE)
-    fill_pattern_2 = re.compile(r'(?:When|And|Then)\s+I\s+enter\s+"(.*?)"\s+as\s+(.*)', re.IGNORECASE)
-    click_pattern_quoted = re.compile(r'(?:When|And|Then)\s+I\s+click\s+on\s+"(.*?)"(?: \s+button)?', re.IGNORECASE)
-    click_pattern_unquoted = re.compile(r'(?:When|And|Then)\s+I\s+click\s+on\s+([^\"]*)', re.IGNORECASE)
+        if stripped.startswith(EXAMPLES_HEADERS) and scenario:
+            in_examples = {'tags': pending_tags, 'header': None, 'rows': []}
+            scenario['examples'].append(in_examples)
+            pending_tags = []
+            continue
 
-    # --- Context and Wait steps ---
-    wait_pattern = re.compile(
-        r'(?:When|And|Then)\s+I\s+(?:should be on the|see the|see|wait for)\s+"(.*?)"(?: \s+page)?', re.IGNORECASE
-    )
-    section_pattern = re.compile(r'(?:Given|And|When)\s+I\s+am\s+under\s+the\s+"(.*?)"\s+section', re.IGNORECASE)
+        if stripped.startswith('|'):
+            cells = _parse_table_row(stripped)
+            if in_examples is not None:
+                if in_examples['header'] is None:
+                    in_examples['header'] = cells
+                else:
+                    in_examples['rows'].append((line_no, cells))
+            elif target_steps:
+                # Data table under the previous step
+                number, step_text, doc, table = target_steps[-1]
+                target_steps[-1] = (number, step_text, doc, (table or []) + [cells])
+            continue
 
+        keyword, _ = _split_keyword(stripped)
+        if keyword in STEP_KEYWORDS and target_steps is not None:
+            target_steps.append((line_no, stripped, None, None))
+
+    if scenario:
+        _finish_scenario(feature, scenario, background)
+
+    return feature
+
+
+def compile_feature_file(feature_path):
+    """Compiles a .feature file, reusing the cached result while the file is unchanged."""
+    stat = os.stat(feature_path)
+    cache_key = os.path.abspath(feature_path)
+    signature = (stat.st_mtime_ns, stat.st_size)
+
+    with _compiled_cache_lock:
+        cached = _compiled_cache.get(cache_key)
+        if cached and cached[0] == signature:
+            return cached[1]
 
     with open(feature_path, 'r', encoding='utf-8') as f:
-        for line in f:
-            stripped_line = line.strip()
-
-            if stripped_line.startswith(f"Scenario: {target_scenario}"):
-                in_scenario = True
-                continue
-
-            if in_scenario:
-                if stripped_line.startswith('Scenario:') or (not stripped_line and steps):
-                    break
-
-                if not stripped_line or stripped_line.startswith('#'):
-                    continue
-
-                # Skip any "Given" step that isn't a section step
-                if stripped_line.lower().startswith("given") and not section_pattern.match(stripped_line):
-                    continue
-
-                # --- PARSING LOGIC ---
-
-                # Check for "By Selector" steps FIRST
-                fill_sel_match = fill_by_selector_pattern.match(stripped_line)
-                if fill_sel_match:
-                    value = fill_sel_match.group(1).strip()
-                    selector = fill_sel_match.group(2).strip()
-                    steps.append({'action': 'fill', 'selector': selector, 'value': value})
-                    continue
-
-                click_sel_match = click_by_selector_pattern.match(stripped_line)
-                if click_sel_match:
-                    selector = click_sel_match.group(1).strip()
-                    steps.append({'action': 'click', 'selector': selector})
-                    continue
-
-                # --- Standard AI-driven steps ---
-                section_match = section_pattern.match(stripped_line)
-                if section_match:
-                    current_section = section_match.group(1).strip()
-                    continue
-
-                fill_match_1 = fill_pattern_1.match(stripped_line)
-                if fill_match_1:
-                    target_name = fill_match_1.group(1).strip()
-                    value = fill_match_1.group(2).strip()
-                    steps.append({'action': 'fill', 'target_name': target_name, 'value': value, 'section': current_section})
-                    continue
-
-                fill_match_2 = fill_pattern_2.match(stripped_line)
-                if fill_match_2:
-                    value = fill_match_2.group(1).strip()
-                    target_name = fill_match_2.group(2).strip()
-                    steps.append({'action': 'fill', 'target_name': target_name, 'value': value, 'section': current_section})
-                    continue
-
-                click_match_q = click_pattern_quoted.match(stripped_line)
-                if click_match_q:
-                    target_name = click_match_q.group(1).strip()
-                    steps.append({'action': 'click', 'target_name': target_name, 'section': current_section})
-                    continue
-
-                click_match_u = click_pattern_unquoted.match(stripped_line)
-                if click_match_u:
-                    target_name = click_match_u.group(1).strip().replace('button', '').strip()
-                    if target_name:
-                        steps.append({'action': 'click', 'target_name': target_name, 'section': current_section})
-                        continue
-
-                wait_match = wait_pattern.match(stripped_line)
-                if wait_match:
-                    target_name = wait_match.group(1).strip()
-                    steps.append({'action': 'wait', 'target_name': target_name})
-                    current_section = None # Reset section after a wait
-                    continue
-
-    return steps
\ No newline at end of file
+        compiled = compile_feature_text(f.read(), feature_path)
+
+    with _compiled_cache_lock:
+        _compiled_cache[cache_key] = (signature, compiled)
+    return compiled
+
+
+def find_scenario(feature_path, target_scenario):
+    """Looks up a compiled scenario by exact name, falling back to a name prefix."""
+    scenarios = compile_feature_file(feature_path)['scenarios']
+    exact = next((s for s in scenarios if s['name'] == target_scenario), None)
+    if exact:
+        return exact
+    return next((s for s in scenarios if s['name'].startswith(target_scenario)), None)
+
+
+def parse_feature_file_to_steps(feature_path, target_scenario):
+    """
+    Parses a .feature file for a specific scenario and extracts Gherkin steps,
+    including section context and direct selector steps.
+    """
+    scenario = find_scenario(feature_path, target_scenario)
+    if scenario is None:
+        return []
+    # Copies, so callers can't alter the cached compilation
+    return [dict(step) for step in scenario['steps']]
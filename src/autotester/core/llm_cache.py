@@ -0,0 +1,132 @@
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from autotester.core.llm_client import LLMError
+
+CACHE_MODES = ('record', 'replay', 'passthrough')
+
+
+class LLMCacheMiss(LLMError):
+    """Raised in replay mode when a prompt has no recorded response."""
+
+
+class CachedLLMClient:
+    """
+    Content-addressed prompt -> response cache in front of an LLM client.
+
+    Modes:
+      record      - always calls the model and stores the response
+      replay      - serves stored responses only; a miss raises LLMCacheMiss
+      passthrough - calls the model and leaves the cache alone
+
+    Entries are gzip-compressed JSON files named by the SHA-256 of the
+    namespace (provider and model) and the prompt. The least recently used
+    entries are evicted once the cache grows past `max_bytes`.
+    """
+
+    def __init__(self, client, namespace, cache_dir='.llm_cache', mode='passthrough', max_bytes=100 * 1024 * 1024):
+        if mode not in CACHE_MODES:
+            raise ValueError(f"Unknown LLM cache mode '{mode}'. Use one of {CACHE_MODES}.")
+        if client is None and mode != 'replay':
+            raise ValueError(f"LLM cache mode '{mode}' needs a live client.")
+        self.client = client
+        self.namespace = namespace
+        self.cache_dir = cache_dir
+        self.mode = mode
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._size = None  # bytes on disk, computed on the first write
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def key_for(self, prompt):
+        return hashlib.sha256(f"{self.namespace}\n{prompt}".encode('utf-8')).hexdigest()
+
+    def _path(self, key):
+        # Two-level fan-out keeps directories small
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json.gz")
+
+    def lookup(self, prompt):
+        """Returns the stored response for a prompt, or None."""
+        path = self._path(self.key_for(prompt))
+        try:
+            with gzip.open(path, 'rt', encoding='utf-8') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        # Mark as recently used for eviction
+        os.utime(path)
+        return entry['response']
+
+    def store(self, prompt, response):
+        key = self.key_for(prompt)
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        entry = {"namespace": self.namespace, "prompt": prompt, "response": response, "recorded_at": time.time()}
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with gzip.open(tmp_path, 'wt', encoding='utf-8') as f:
+            json.dump(entry, f, separators=(',', ':'))
+
+        with self._lock:
+            # An overwritten entry no longer counts towards the size
+            replaced = os.path.getsize(path) if os.path.exists(path) else 0
+            os.replace(tmp_path, path)
+            if self._size is None:
+                self._size = sum(size for _, size, _ in self._entries())
+            else:
+                self._size += os.path.getsize(path) - replaced
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _entries(self):
+        """(mtime, size, path) for every entry on disk."""
+        entries = []
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if not name.endswith('.json.gz'):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def _evict(self):
+        """Removes least recently used entries until the cache fits in max_bytes. Caller holds the lock."""
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+        self._size = total
+
+    def _replay(self, prompt):
+        response = self.lookup(prompt)
+        if response is None:
+            raise LLMCacheMiss(f"No recorded response for prompt {self.key_for(prompt)[:12]} (namespace '{self.namespace}').")
+        return response
+
+    def complete(self, prompt, deadline=None):
+        if self.mode == 'replay':
+            return self._replay(prompt)
+        response = self.client.complete(prompt, deadline)
+        if self.mode == 'record':
+            self.store(prompt, response)
+        return response
+
+    async def acomplete(self, prompt, deadline=None):
+        if self.mode == 'replay':
+            return self._replay(prompt)
+        response = await self.client.acomplete(prompt, deadline)
+        if self.mode == 'record':
+            self.store(prompt, response)
+        return response
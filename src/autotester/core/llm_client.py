@@ -0,0 +1,258 @@
+import asyncio
+import os
+import random
+import threading
+import time
+import weakref
+
+# HTTP statuses worth retrying: timeouts, rate limits and server errors.
+RETRYABLE_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+
+
+class LLMError(Exception):
+    """Raised when the model could not produce a response."""
+
+
+class LLMTimeoutError(LLMError):
+    """Raised when a call runs past its deadline."""
+
+
+def is_retryable(error):
+    """Decides whether a provider error is transient (429/5xx, timeouts, dropped connections)."""
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return True
+    for attribute in ('status_code', 'code', 'status'):
+        status = getattr(error, attribute, None)
+        status = status() if callable(status) else status
+        if isinstance(status, int) and status in RETRYABLE_STATUS_CODES:
+            return True
+    return False
+
+
+# --- Providers ---
+
+class LLMProvider:
+    """A model backend. Subclasses implement generate(); agenerate() defaults to a worker thread."""
+
+    name = 'base'
+
+    def generate(self, prompt, timeout):
+        raise NotImplementedError
+
+    async def agenerate(self, prompt, timeout):
+        return await asyncio.to_thread(self.generate, prompt, timeout)
+
+
+class GeminiProvider(LLMProvider):
+    name = 'gemini'
+
+    def __init__(self, model, api_key):
+        import google.generativeai as genai
+        genai.configure(api_key=api_key)
+        # One model object per provider so the underlying transport is reused
+        self.model = genai.GenerativeModel(model)
+
+    def generate(self, prompt, timeout):
+        response = self.model.generate_content(prompt, request_options={"timeout": timeout})
+        return response.text
+
+    async def agenerate(self, prompt, timeout):
+        response = await self.model.generate_content_async(prompt, request_options={"timeout": timeout})
+        return response.text
+
+
+class OpenAIProvider(LLMProvider):
+    """Also wraps an existing OpenAI-style `client` (sync calls only, async ones run in a thread)."""
+
+    name = 'openai'
+
+    def __init__(self, model, api_key=None, client=None):
+        self.model = model
+        if client is not None:
+            self.client, self.async_client = client, None
+            return
+        import openai
+        self.client = openai.OpenAI(api_key=api_key, max_retries=0)
+        self.async_client = openai.AsyncOpenAI(api_key=api_key, max_retries=0)
+
+    def generate(self, prompt, timeout):
+        response = self.client.chat.completions.create(
+            model=self.model, messages=[{"role": "user", "content": prompt}], timeout=timeout)
+        return response.choices[0].message.content
+
+    async def agenerate(self, prompt, timeout):
+        if self.async_client is None:
+            return await super().agenerate(prompt, timeout)
+        response = await self.async_client.chat.completions.create(
+            model=self.model, messages=[{"role": "user", "content": prompt}], timeout=timeout)
+        return response.choices[0].message.content
+
+
+PROVIDERS = {
+    'gemini': GeminiProvider,
+    'openai': OpenAIProvider,
+}
+
+
+# --- Rate limiting ---
+
+class TokenBucket:
+    """
+    A thread-safe token bucket: `rate` tokens per second, up to `capacity`.
+    Usable from threads (acquire) and asyncio (aacquire).
+    """
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _take(self):
+        """Takes a token if one is available; otherwise returns the seconds to wait."""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+            self.updated_at = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0.0
+            return (1 - self.tokens) / self.rate
+
+    def acquire(self, deadline=None):
+        while True:
+            wait = self._take()
+            if wait == 0.0:
+                return
+            if deadline is not None and time.monotonic() + wait > deadline:
+                raise LLMTimeoutError("Deadline reached while waiting for the rate limiter.")
+            time.sleep(wait)
+
+    async def aacquire(self, deadline=None):
+        while True:
+            wait = self._take()
+            if wait == 0.0:
+                return
+            if deadline is not None and time.monotonic() + wait > deadline:
+                raise LLMTimeoutError("Deadline reached while waiting for the rate limiter.")
+            await asyncio.sleep(wait)
+
+
+# --- Client ---
+
+class LLMClient:
+    """
+    Wraps a provider with a rate limiter, a concurrency cap, per-call deadlines
+    and exponential backoff with jitter on transient errors.
+    One instance is meant to be shared by every caller of the same provider.
+    """
+
+    def __init__(self, provider, requests_per_minute=60, burst=5, max_concurrency=4,
+                 max_retries=4, base_delay=1.0, max_delay=20.0, attempt_timeout=30.0, deadline=90.0):
+        self.provider = provider
+        self.bucket = TokenBucket(requests_per_minute / 60.0, burst)
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.attempt_timeout = attempt_timeout
+        self.deadline = deadline
+        self._semaphore = threading.BoundedSemaphore(max_concurrency)
+        self._async_semaphores = weakref.WeakKeyDictionary()
+
+    def _backoff(self, attempt):
+        """Full-jitter exponential backoff."""
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    def _async_semaphore(self):
+        # asyncio primitives belong to one event loop
+        loop = asyncio.get_running_loop()
+        if loop not in self._async_semaphores:
+            self._async_semaphores[loop] = asyncio.Semaphore(self.max_concurrency)
+        return self._async_semaphores[loop]
+
+    def complete(self, prompt, deadline=None):
+        """Sends a prompt and returns the response text, blocking the caller."""
+        deadline_at = time.monotonic() + (deadline or self.deadline)
+        attempt = 0
+        while True:
+            self.bucket.acquire(deadline_at)
+            remaining = deadline_at - time.monotonic()
+            if remaining <= 0:
+                raise LLMTimeoutError(f"{self.provider.name}: deadline exceeded.")
+            if not self._semaphore.acquire(timeout=remaining):
+                raise LLMTimeoutError(f"{self.provider.name}: deadline exceeded waiting for a free slot.")
+            try:
+                timeout = min(self.attempt_timeout, deadline_at - time.monotonic())
+                return self.provider.generate(prompt, timeout)
+            except Exception as e:
+                error = e
+            finally:
+                self._semaphore.release()
+
+            delay = self._retry_delay(error, attempt, deadline_at)
+            attempt += 1
+            time.sleep(delay)
+
+    async def acomplete(self, prompt, deadline=None):
+        """Sends a prompt and returns the response text without blocking the event loop."""
+        deadline_at = time.monotonic() + (deadline or self.deadline)
+        attempt = 0
+        while True:
+            await self.bucket.aacquire(deadline_at)
+            remaining = deadline_at - time.monotonic()
+            if remaining <= 0:
+                raise LLMTimeoutError(f"{self.provider.name}: deadline exceeded.")
+            semaphore = self._async_semaphore()
+            try:
+                await asyncio.wait_for(semaphore.acquire(), remaining)
+            except asyncio.TimeoutError:
+                raise LLMTimeoutError(f"{self.provider.name}: deadline exceeded waiting for a free slot.")
+            try:
+                timeout = min(self.attempt_timeout, deadline_at - time.monotonic())
+                return await asyncio.wait_for(self.provider.agenerate(prompt, timeout), timeout)
+            except asyncio.TimeoutError:
+                error = LLMTimeoutError(f"{self.provider.name}: attempt timed out.")
+            except Exception as e:
+                error = e
+            finally:
+                semaphore.release()
+
+            delay = self._retry_delay(error, attempt, deadline_at)
+            attempt += 1
+            await asyncio.sleep(delay)
+
+    def _retry_delay(self, error, attempt, deadline_at):
+        """Raises if the error is final; otherwise returns how long to wait before the next attempt."""
+        if not (is_retryable(error) or isinstance(error, LLMTimeoutError)) or attempt >= self.max_retries:
+            if isinstance(error, LLMTimeoutError):
+                raise error
+            raise LLMError(f"{self.provider.name}: {error}") from error
+        delay = self._backoff(attempt)
+        if time.monotonic() + delay >= deadline_at:
+            raise LLMTimeoutError(f"{self.provider.name}: deadline exceeded after {attempt + 1} attempts: {error}") from error
+        return delay
+
+
+# --- Shared instances ---
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_llm_client(provider_name, model, api_key, **options):
+    """
+    Returns the process-wide client for a provider/model, creating it once.
+    Under pytest-xdist the request rate and burst are split between workers
+    so that together they stay within the provider quota.
+    """
+    key = (provider_name, model)
+    with _clients_lock:
+        if key not in _clients:
+            workers = max(1, int(os.getenv("PYTEST_XDIST_WORKER_COUNT", "1")))
+            options['requests_per_minute'] = options.get('requests_per_minute', 60) / workers
+            options['burst'] = max(1, options.get('burst', 5) // workers)
+            provider = PROVIDERS[provider_name](model, api_key)
+            _clients[key] = LLMClient(provider, **options)
+        return _clients[key]
@@ -0,0 +1,159 @@
+import re
+from difflib import SequenceMatcher
+
+# Words that describe the *kind* of element rather than the element itself.
+# "the email field" and "email" should resolve to the same input.
+GENERIC_WORDS = {'the', 'a', 'an', 'field', 'button', 'link', 'box', 'input', 'bar', 'textbox', 'menu', 'tab'}
+
+FILLABLE_TAGS = {'input', 'textarea', 'select'}
+
+# Our own selector formats, as produced by get_ui_summary.
+ID_SELECTOR = re.compile(r"^#(.+)$")
+ATTR_SELECTOR = re.compile(r"^\[(automation_id|name)='(.*)'\]$")
+
+
+def normalize_text(text):
+    """Lowercases text, strips quotes/punctuation and collapses whitespace."""
+    text = (text or '').lower()
+    text = re.sub(r"[\"'`:*]", '', text)
+    text = re.sub(r'[_\-]+', ' ', text)
+    return ' '.join(text.split())
+
+
+def _strip_generic_words(text):
+    words = [w for w in text.split() if w not in GENERIC_WORDS]
+    return ' '.join(words) or text
+
+
+def _element_keys(element):
+    """Returns the (kind, normalized value) pairs an element can be matched on."""
+    keys = []
+    selector = element.get('selector', '')
+
+    id_match = ID_SELECTOR.match(selector)
+    if id_match:
+        keys.append(('id', normalize_text(id_match.group(1))))
+
+    attr_match = ATTR_SELECTOR.match(selector)
+    if attr_match:
+        keys.append((attr_match.group(1), normalize_text(attr_match.group(2))))
+
+    for field in ('placeholder', 'text'):
+        if element.get(field):
+            keys.append((field, normalize_text(element[field])))
+
+    # Submit-style inputs carry their label in 'value'
+    if element.get('tag') == 'input' and element.get('value'):
+        keys.append(('value', normalize_text(element['value'])))
+
+    return [(kind, value) for kind, value in keys if value]
+
+
+def _candidates_for_step(elements, action):
+    """Filters the summary down to elements that can receive the step's action."""
+    if action == 'fill':
+        return [el for el in elements if el.get('tag', 'input') in FILLABLE_TAGS]
+    return elements
+
+
+def _unique_selectors(elements):
+    """Selectors that identify exactly one element in the summary."""
+    counts = {}
+    for el in elements:
+        counts[el['selector']] = counts.get(el['selector'], 0) + 1
+    return {selector for selector, count in counts.items() if count == 1}
+
+
+def find_exact_match(elements, target_name, action):
+    """
+    Tier 1: finds the single element whose selector, id, name, placeholder
+    or text equals the step target. Returns None when zero or several match.
+    """
+    unique = _unique_selectors(elements)
+    target_raw = (target_name or '').strip()
+
+    # The step already names one of our selectors, e.g. "[name='email']"
+    if target_raw in unique:
+        return next(el for el in elements if el['selector'] == target_raw)
+
+    target = normalize_text(target_raw)
+    stripped_target = _strip_generic_words(target)
+    if not target:
+        return None
+
+    matches = {}
+    for el in _candidates_for_step(elements, action):
+        if el['selector'] not in unique:
+            continue
+        for _, value in _element_keys(el):
+            if value in (target, stripped_target):
+                matches[el['selector']] = el
+                break
+
+    if len(matches) == 1:
+        return next(iter(matches.values()))
+    return None
+
+
+def text_similarity(target, value):
+    """Scores two normalized strings from 0 to 1."""
+    ratio = SequenceMatcher(None, target, value).ratio()
+    target_words = set(target.split())
+    value_words = set(value.split())
+    if not target_words or not value_words:
+        return ratio
+    # Share of the target's words that appear in the element
+    containment = len(target_words & value_words) / len(target_words)
+    # Penalize long labels that merely contain the target word
+    containment *= min(1.0, len(target_words) / len(value_words)) ** 0.25
+    return max(ratio, containment)
+
+
+def relevance(element, target_name):
+    """Scores how well a single element matches a step target, from 0 to 1."""
+    target = _strip_generic_words(normalize_text(target_name))
+    keys = _element_keys(element)
+    if not target or not keys:
+        return 0.0
+    return max(text_similarity(target, value) for _, value in keys)
+
+
+def score_candidates(elements, target_name, action):
+    """
+    Tier 2: scores every candidate against the step target.
+    Returns a list of (score, element) sorted best first.
+    """
+    unique = _unique_selectors(elements)
+    target = _strip_generic_words(normalize_text(target_name))
+    if not target:
+        return []
+
+    scored = []
+    for el in _candidates_for_step(elements, action):
+        if el['selector'] not in unique:
+            continue
+        keys = _element_keys(el)
+        if not keys:
+            continue
+        score = max(text_similarity(target, value) for _, value in keys)
+        scored.append((score, el))
+
+    scored.sort(key=lambda pair: pair[0], reverse=True)
+    return scored
+
+
+def find_fuzzy_match(elements, target_name, action, threshold, margin=0.1):
+    """
+    Returns (element, score) for the best candidate if it clears the threshold
+    and beats the runner-up by at least `margin`; otherwise (None, best_score).
+    """
+    scored = score_candidates(elements, target_name, action)
+    if not scored:
+        return None, 0.0
+
+    best_score, best = scored[0]
+    runner_up = scored[1][0] if len(scored) > 1 else 0.0
+
+    if best_score >= threshold and best_score - runner_up >= margin:
+        return best, best_score
+    return None, best_score
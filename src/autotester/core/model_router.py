@@ -0,0 +1,166 @@
+import threading
+import time
+from autotester.utils.journal_store import JournalStore
+from autotester.utils.tracing import span
+
+# A model is skipped for an app once it has answered at least MIN_SAMPLES
+# prompts there and fewer than MIN_SUCCESS_RATE of its answers validated.
+MIN_SAMPLES = 10
+MIN_SUCCESS_RATE = 0.5
+
+# Once a model has STATS_WINDOW calls on an app its counts are halved, so the
+# success rate follows recent answers rather than the model's whole history.
+STATS_WINDOW = 50
+
+# Every PROBE_INTERVAL-th prompt on an app also goes to the models skipped
+# there; one that answers it validly starts over with fresh statistics.
+PROBE_INTERVAL = 20
+
+# Weight of the newest call in the smoothed latency.
+LATENCY_SMOOTHING = 0.2
+
+
+class ModelStats:
+    """
+    Per-app, per-model call counts and validated answers (both windowed, see
+    STATS_WINDOW) and smoothed latency, persisted in a JournalStore so that
+    routing improves across runs.
+    Concurrent workers may occasionally overwrite each other's increments;
+    the numbers only need to be roughly right.
+    """
+
+    def __init__(self, filepath='model_stats.json'):
+        self.filepath = filepath
+        self._store = None
+        self._lock = threading.Lock()
+
+    @property
+    def store(self):
+        # Opened on first use so building a router doesn't touch the disk
+        if self._store is None:
+            with self._lock:
+                if self._store is None:
+                    self._store = JournalStore(self.filepath)
+        return self._store
+
+    @staticmethod
+    def make_key(app, model):
+        return f"{app}::{model}"
+
+    def get(self, app, model):
+        """{'calls', 'successes', 'latency_ms'} for a model on an app, or None if never used there."""
+        self.store.refresh()
+        return self.store.data.get(self.make_key(app, model))
+
+    def record(self, app, model, latency_ms, success):
+        store = self.store  # opened first: opening it takes the same lock
+        with self._lock:
+            store.refresh()
+            entry = dict(self.store.data.get(self.make_key(app, model)) or {"calls": 0, "successes": 0, "latency_ms": latency_ms})
+            entry["calls"] += 1
+            entry["successes"] += int(success)
+            if entry["calls"] >= STATS_WINDOW:
+                entry["calls"], entry["successes"] = entry["calls"] / 2, entry["successes"] / 2
+            entry["latency_ms"] = round((1 - LATENCY_SMOOTHING) * entry["latency_ms"] + LATENCY_SMOOTHING * latency_ms, 1)
+            store.put(self.make_key(app, model), entry)
+
+    def forget(self, app, model):
+        self.store.delete(self.make_key(app, model))
+
+    def success_rate(self, app, model):
+        """Share of recent validated answers, or None until the model has MIN_SAMPLES calls on the app."""
+        entry = self.get(app, model)
+        if not entry or entry["calls"] < MIN_SAMPLES:
+            return None
+        return entry["successes"] / entry["calls"]
+
+    def latency_ms(self, app, model):
+        """Smoothed latency, or None until the model has MIN_SAMPLES calls on the app."""
+        entry = self.get(app, model)
+        if not entry or entry["calls"] < MIN_SAMPLES:
+            return None
+        return entry["latency_ms"]
+
+
+class ModelRouter:
+    """
+    Routes prompts across several models, listed fastest (cheapest) first.
+
+    route() asks the first model and checks its answer with a validator; on an
+    error or a rejected answer it escalates to the next model. Models that keep
+    failing on an app are skipped there, except on every PROBE_INTERVAL-th
+    prompt, and once every cheaper model has been measured on an app they are
+    tried in order of observed latency. The last (strongest) model is always
+    tried last. complete() makes the router usable wherever a plain client is
+    expected.
+    """
+
+    def __init__(self, models, stats=None):
+        if not models:
+            raise ValueError("ModelRouter needs at least one model.")
+        self.models = list(models)  # [(name, client)], fastest first
+        self.stats = stats or ModelStats()
+        self._routes = {}  # app -> prompts routed in this process
+        self._lock = threading.Lock()
+
+    @property
+    def model_names(self):
+        return [name for name, _ in self.models]
+
+    def order_for(self, app, probe=False):
+        """The models to try for an app, in order. A probe keeps the skipped models."""
+        *cheaper, strongest = self.models
+        order = []
+        for name, client in cheaper:
+            rate = self.stats.success_rate(app, name)
+            if probe or rate is None or rate >= MIN_SUCCESS_RATE:
+                order.append((name, client))
+        latencies = [self.stats.latency_ms(app, name) for name, _ in order]
+        if None not in latencies:
+            order = [model for _, model in sorted(zip(latencies, order), key=lambda pair: pair[0])]
+        return order + [strongest]
+
+    def _next_is_probe(self, app):
+        with self._lock:
+            self._routes[app] = self._routes.get(app, 0) + 1
+            return self._routes[app] % PROBE_INTERVAL == 0
+
+    def complete(self, prompt, deadline=None):
+        """Sends a prompt to the fastest model, without validation."""
+        return self.models[0][1].complete(prompt, deadline)
+
+    def route(self, ask, validate, logger, app=''):
+        """
+        Calls ask(client) on each model in turn until validate(answer) returns
+        None (no problem). Returns (answer, model_name). When no answer
+        validates, returns the last answer given, or (None, None) if no model
+        produced one at all.
+        """
+        answer, answered_by = None, None
+        probe = self._next_is_probe(app)
+        skipped = set(self.model_names) - {name for name, _ in self.order_for(app)} if probe else set()
+        for name, client in self.order_for(app, probe):
+            with span("model_route", model=name) as attrs:
+                started = time.perf_counter()
+                try:
+                    candidate, problem = ask(client), "no usable answer"
+                except Exception as e:
+                    candidate, problem = None, f"{type(e).__name__}: {e}"
+                latency_ms = (time.perf_counter() - started) * 1000
+                if candidate is not None:
+                    problem = validate(candidate)
+                attrs['valid'] = problem is None
+            self.stats.record(app, name, latency_ms, problem is None)
+
+            if candidate is not None:
+                answer, answered_by = candidate, name
+            if problem is None:
+                if name in skipped:
+                    logger.info(f"Skipped model '{name}' passed a probe on '{app}'; its statistics start over.")
+                    self.stats.forget(app, name)
+                return answer, answered_by
+            logger.warning(f"Model '{name}' answer rejected ({problem}).")
+
+        if answer is not None:
+            logger.warning(f"No model gave a valid answer; using the one from '{answered_by}'.")
+        return answer, answered_by
@@ -0,0 +1,71 @@
+import weakref
+from bs4 import BeautifulSoup
+from autotester.core.section_index import TextIndex
+from autotester.utils.tracing import span
+
+# Prefer the C-backed lxml parser; fall back to the pure-Python one.
+try:
+    import lxml  # noqa: F401
+    HTML_PARSER = 'lxml'
+except ImportError:
+    HTML_PARSER = 'html.parser'
+
+# One live snapshot per Playwright page, dropped when the page is garbage collected.
+_snapshots = weakref.WeakKeyDictionary()
+
+
+class PageSnapshot:
+    """
+    The DOM of a page captured once and parsed once.
+    Shared by UI summary extraction and state hashing until the page changes.
+    """
+
+    def __init__(self, html, url=''):
+        self.html = html
+        self.url = url
+        self._soup = None
+        self._text_index = None
+        self._sections = {}
+
+    @property
+    def soup(self):
+        """The parsed document, built on first access."""
+        if self._soup is None:
+            with span("html_parse", html_bytes=len(self.html)):
+                self._soup = BeautifulSoup(self.html, HTML_PARSER)
+        return self._soup
+
+    def section_container(self, section_context):
+        """(text_element, container) for a section, computed once per snapshot (see TextIndex)."""
+        if section_context not in self._sections:
+            if self._text_index is None:
+                with span("text_index"):
+                    self._text_index = TextIndex(self.soup)
+            self._sections[section_context] = self._text_index.section_container(section_context)
+        return self._sections[section_context]
+
+    @classmethod
+    def for_page(cls, page):
+        """
+        Returns the cached snapshot for a page, capturing a new one if the page
+        has been invalidated or has navigated since the last capture.
+        """
+        snapshot = _snapshots.get(page)
+        if snapshot is None or snapshot.url != page.url:
+            with span("page_content"):
+                html = page.content()
+            snapshot = cls(html, page.url)
+            _snapshots[page] = snapshot
+        return snapshot
+
+
+def invalidate_snapshot(page):
+    """Marks the page's snapshot as stale. Call after any action that may change the DOM."""
+    _snapshots.pop(page, None)
+
+
+def as_soup(html_or_snapshot):
+    """Accepts raw HTML or a PageSnapshot and returns the parsed document."""
+    if isinstance(html_or_snapshot, PageSnapshot):
+        return html_or_snapshot.soup
+    return BeautifulSoup(html_or_snapshot, HTML_PARSER)
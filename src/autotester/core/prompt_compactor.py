@@ -0,0 +1,108 @@
+from autotester.core.local_matcher import relevance
+
+# Columns of the tabular encoding, in order. The selector goes last and is sent
+# verbatim: the other cells never contain '|', so everything after the fourth
+# ' | ' is the selector, even if it contains ' | ' itself.
+COLUMNS = ('tag', 'text', 'placeholder', 'value', 'selector')
+MAX_CELL_CHARS = 80
+
+
+def estimate_tokens(text):
+    """Rough token count (about four characters per token)."""
+    return max(1, len(text) // 4)
+
+
+def dedupe_elements(elements):
+    """Drops repeated rows, e.g. one [name='quantity'] per product card."""
+    seen = set()
+    unique = []
+    for el in elements:
+        key = (el.get('selector'), el.get('text'), el.get('placeholder'))
+        if key in seen:
+            continue
+        seen.add(key)
+        unique.append(el)
+    return unique
+
+
+# Steps that refer to elements by position, so the page order must be kept intact.
+ORDINAL_ACTIONS = ('click_first_in_list',)
+
+
+def rank_elements(elements, steps):
+    """Orders elements by relevance to the steps' targets and sections, best first."""
+    targets = []
+    for step in steps:
+        targets.append(step.get('target_name') or step.get('list_name') or '')
+        if step.get('section'):
+            targets.append(step['section'])
+
+    def score(el):
+        return max(relevance(el, target) for target in targets)
+
+    # sorted() is stable, so ties keep page order
+    return sorted(elements, key=score, reverse=True)
+
+
+def _cell(value):
+    """A descriptive cell (text, placeholder, value): whitespace collapsed and cut to MAX_CELL_CHARS."""
+    value = ' '.join(str(value or '').split()).replace('|', '/')
+    if len(value) > MAX_CELL_CHARS:
+        value = value[:MAX_CELL_CHARS - 3] + '...'
+    return value
+
+
+def _selector_cell(selector):
+    # Only a raw line break would break the row; anything else is kept for the model to copy back
+    return str(selector or '').replace('\r', '\\r').replace('\n', '\\n')
+
+
+def _row(el):
+    cells = [_cell(el.get(column)) for column in COLUMNS[:-1]]
+    return ' | '.join(cells + [_selector_cell(el.get('selector'))])
+
+
+def parse_row(row):
+    """The element dict for one table row (the inverse of the encoding, minus cut text)."""
+    return dict(zip(COLUMNS, row.split(' | ', len(COLUMNS) - 1)))
+
+
+def encode_table(elements):
+    """Terse one-line-per-element encoding; empty fields are left blank."""
+    return '\n'.join([' | '.join(COLUMNS)] + [_row(el) for el in elements])
+
+
+def compact_ui_summary(elements, current_step, logger, token_budget=2000, max_candidates=80):
+    """
+    Turns the extracted elements into a compact table for the prompt.
+    Keeps the most relevant candidates that fit within `token_budget`, listed
+    in page order. Steps that pick an element by position (e.g. the first
+    item in a list) keep the leading elements instead.
+    `current_step` may also be a list of steps planned together.
+    """
+    steps = current_step if isinstance(current_step, list) else [current_step]
+    unique = dedupe_elements(elements)
+    if any(step.get('action') in ORDINAL_ACTIONS for step in steps):
+        ranked = unique
+    else:
+        ranked = rank_elements(unique, steps)
+
+    used = estimate_tokens(' | '.join(COLUMNS))
+    kept = []
+    for el in ranked[:max_candidates]:
+        row_tokens = estimate_tokens(_row(el))
+        if kept and used + row_tokens > token_budget:
+            break
+        kept.append(el)
+        used += row_tokens
+
+    # Back to page order, so "first", "next to" and the like still make sense
+    position = {id(el): index for index, el in enumerate(unique)}
+    kept.sort(key=lambda el: position[id(el)])
+
+    table = encode_table(kept)
+    # Rough size of the input, from its raw fields only (no re-serialisation)
+    original_tokens = estimate_tokens(''.join(str(el.get(column) or '') for el in elements for column in COLUMNS))
+    logger.info(f"Compacted UI summary: {len(elements)} -> {len(kept)} elements, "
+                f"~{original_tokens} -> ~{estimate_tokens(table)} tokens")
+    return table
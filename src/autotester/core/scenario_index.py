@@ -0,0 +1,88 @@
+import fnmatch
+import os
+import threading
+from autotester.core.feature_parser import compile_feature_file
+
+
+class ScenarioIndex:
+    """
+    One index of every scenario under a features directory, shared by all
+    test modules. Files are only recompiled when their mtime or size changes.
+    """
+
+    def __init__(self, features_dir='features'):
+        self.features_dir = features_dir
+        self._signature = None
+        self._entries = []
+        self._lock = threading.Lock()
+
+    def _scan(self):
+        """Returns {path: (mtime_ns, size)} for every .feature file."""
+        files = {}
+        if not os.path.isdir(self.features_dir):
+            return files
+        for root, _, filenames in os.walk(self.features_dir):
+            for filename in sorted(filenames):
+                if filename.endswith('.feature'):
+                    path = os.path.join(root, filename)
+                    stat = os.stat(path)
+                    files[path] = (stat.st_mtime_ns, stat.st_size)
+        return files
+
+    def entries(self):
+        """All scenarios as dicts with 'path', 'file', 'name', 'tags' and 'line'."""
+        with self._lock:
+            files = self._scan()
+            signature = tuple(sorted(files.items()))
+            if signature != self._signature:
+                entries = []
+                for path in sorted(files):
+                    for scenario in compile_feature_file(path)['scenarios']:
+                        entries.append({
+                            'path': path,
+                            # '/'-separated on every OS, so file globs match the same everywhere
+                            'file': os.path.relpath(path, self.features_dir).replace(os.sep, '/'),
+                            'name': scenario['name'],
+                            'tags': scenario['tags'],
+                            'line': scenario['line'],
+                        })
+                self._entries = entries
+                self._signature = signature
+            return list(self._entries)
+
+    def find(self, tags=None, exclude_tags=None, name=None, file=None):
+        """
+        Filters scenarios.
+        tags:         keep scenarios having ANY of these tags ('@' optional)
+        exclude_tags: drop scenarios having any of these tags
+        name:         glob matched against the scenario name
+        file:         glob matched against the '/'-separated path relative to the features directory
+        Both globs are case-sensitive.
+        """
+        def as_tags(values):
+            return {t if t.startswith('@') else f"@{t}" for t in (values or [])}
+
+        wanted, unwanted = as_tags(tags), as_tags(exclude_tags)
+        results = []
+        for entry in self.entries():
+            entry_tags = set(entry['tags'])
+            if wanted and not wanted & entry_tags:
+                continue
+            if unwanted & entry_tags:
+                continue
+            if name and not fnmatch.fnmatchcase(entry['name'], name):
+                continue
+            if file and not fnmatch.fnmatchcase(entry['file'], file):
+                continue
+            results.append(entry)
+        return results
+
+
+_indexes = {}
+
+
+def get_scenario_index(features_dir='features'):
+    """Returns the process-wide index for a features directory."""
+    if features_dir not in _indexes:
+        _indexes[features_dir] = ScenarioIndex(features_dir)
+    return _indexes[features_dir]
@@ -0,0 +1,78 @@
+import bisect
+from itertools import chain
+from bs4.element import CData, Comment, Declaration, Doctype, ProcessingInstruction
+
+# Strings that are never rendered as page text.
+NON_TEXT_STRINGS = (Comment, Declaration, Doctype, ProcessingInstruction, CData)
+SKIPPED_PARENTS = {'script', 'style', 'template'}
+
+# A section name found in one of these is taken over the same text elsewhere (e.g. a button).
+HEADING_TAGS = {'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'legend', 'caption'}
+
+# Elements that can scope a section.
+CONTAINER_TAGS = ['div', 'form', 'fieldset', 'section']
+
+
+class TextIndex:
+    """
+    All of a document's text in one string, built in a single pass, with each
+    character mapped back to the text node it came from. Strings are stripped
+    and joined without a separator, as in tag.get_text(strip=True).
+
+    Looking up a section then costs one substring search plus a walk up the
+    tree, instead of calling get_text() on every tag.
+    """
+
+    def __init__(self, soup):
+        self.starts = []
+        self.nodes = []
+        parts = []
+        offset = 0
+        for string in soup.find_all(string=True):
+            if isinstance(string, NON_TEXT_STRINGS) or string.parent is None or string.parent.name in SKIPPED_PARENTS:
+                continue
+            text = string.strip()
+            if not text:
+                continue
+            self.starts.append(offset)
+            self.nodes.append(string)
+            parts.append(text)
+            offset += len(text)
+        self.text = ''.join(parts)
+
+    def _element_at(self, offset):
+        return self.nodes[bisect.bisect_right(self.starts, offset) - 1].parent
+
+    def element_containing(self, start, end):
+        """The deepest element whose text covers self.text[start:end]."""
+        first, last = self._element_at(start), self._element_at(end - 1)
+        if first is last:
+            return first
+        ancestors = {id(el) for el in chain([first], first.parents)}
+        return next(el for el in chain([last], last.parents) if id(el) in ancestors)
+
+    def find(self, text):
+        """
+        The deepest element containing `text`, preferring a heading when the
+        text occurs more than once. None if the page doesn't contain it.
+        """
+        first_match = None
+        start = self.text.find(text) if text else -1
+        while start != -1:
+            element = self.element_containing(start, start + len(text))
+            if element.name in HEADING_TAGS:
+                return element
+            if first_match is None:
+                first_match = element
+            start = self.text.find(text, start + 1)
+        return first_match
+
+    def section_container(self, section_context):
+        """
+        Returns (text_element, container): the element holding the section's
+        text and its nearest enclosing div/form/fieldset/section. Either may be None.
+        """
+        text_element = self.find(section_context)
+        if text_element is None:
+            return None, None
+        return text_element, text_element.find_parent(CONTAINER_TAGS)
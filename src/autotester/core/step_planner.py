@@ -0,0 +1,77 @@
+from autotester.core.agent import get_actions_for_steps, get_next_action_for_step, selector_is_live
+from autotester.utils.tracing import span
+
+GROUPABLE_CLICKS = ('click', 'click_first_in_list')
+
+
+class StepPlanner:
+    """
+    Hands out actions for a scenario's steps. Consecutive steps on the same
+    form (fills, optionally ending in one click) are planned with a single
+    model call; if the page changes mid-group, the rest falls back to per-step calls.
+    """
+
+    def __init__(self, client, steps, logger, memory=None):
+        self.client = client
+        self.steps = steps
+        self.logger = logger
+        self.memory = memory
+        self.planned = {}      # step index -> (action, page url it was planned on)
+        self.covered_by_group = set()  # step indices already covered by a group plan
+
+    def group_at(self, index):
+        """Indices of the plannable group starting at `index`."""
+        group = []
+        section = self.steps[index].get('section')
+        for i in range(index, len(self.steps)):
+            step = self.steps[i]
+            if step.get('selector') or step.get('section') != section:
+                break
+            if step['action'] == 'fill':
+                group.append(i)
+                continue
+            # A click may navigate, so it can only close a group
+            if step['action'] in GROUPABLE_CLICKS:
+                group.append(i)
+            break
+        return group
+
+    def _abandon_plan(self):
+        self.planned.clear()
+
+    def action_for(self, page, index, last_error=""):
+        """Returns the action for step `index`, planning its group if needed."""
+        with span("resolve_step", step=index, retry=bool(last_error)) as attrs:
+            action = self._action_for(page, index, last_error)
+            attrs['resolved_by'] = action.get('resolved_by') if action else None
+            return action
+
+    def _action_for(self, page, index, last_error):
+        step = self.steps[index]
+
+        if last_error:
+            self._abandon_plan()
+            return get_next_action_for_step(self.client, page, step, self.logger, last_error, memory=self.memory)
+
+        plan = self.planned.pop(index, None)
+        if plan:
+            action, planned_url = plan
+            if page.url == planned_url and selector_is_live(page, action['selector']):
+                return action
+            self.logger.warning("Page changed since the step group was planned. Resolving remaining steps one by one.")
+            self._abandon_plan()
+
+        elif index not in self.covered_by_group:
+            group = self.group_at(index)
+            if len(group) > 1:
+                self.covered_by_group.update(group)
+                actions = get_actions_for_steps(self.client, page, [self.steps[i] for i in group], self.logger, memory=self.memory)
+                for i, action in zip(group, actions):
+                    if action:
+                        self.planned[i] = (action, page.url)
+
+                plan = self.planned.pop(index, None)
+                if plan:
+                    return plan[0]
+
+        return get_next_action_for_step(self.client, page, step, self.logger, memory=self.memory)
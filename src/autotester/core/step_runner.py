@@ -0,0 +1,90 @@
+from autotester.core.agent import remember_successful_action, forget_failed_action
+from autotester.core.step_planner import StepPlanner
+from autotester.core.page_snapshot import invalidate_snapshot
+from autotester.utils.env_loader import load_preflight_settings
+from autotester.utils.page_settle import wait_for_page_settle
+from autotester.utils.tracing import span
+from playwright.sync_api import expect
+
+
+class StepExecutionError(Exception):
+    """A scenario step could not be resolved or executed."""
+
+
+def run_steps(page, client, steps, logger, settle_times_ms=None, before_action=None, after_action=None):
+    """
+    Executes parsed scenario steps on a page, resolving each through the
+    planner (cache, local match or AI) unless the step carries its own
+    selector. A resolved action that fails is re-resolved with the error, up
+    to PREFLIGHT_RETRIES times. Raises StepExecutionError on the first step
+    that still fails.
+    Settle waits are appended to `settle_times_ms` if given.
+    If given, before_action(page) runs before each action attempt and
+    after_action(before, action) after each action that succeeds, where
+    `before` is what before_action returned (used to record workflow edges).
+    """
+    last_error = ""
+    retries, _ = load_preflight_settings()
+    planner = StepPlanner(client, steps, logger)
+    if settle_times_ms is None:
+        settle_times_ms = []
+
+    for index, step in enumerate(steps):
+        logger.info(f"--- Executing Step: {step} ---")
+
+        if step['action'] == 'wait':
+            try:
+                with span("wait_step", step=index):
+                    target_element = page.get_by_text(step['target_name'], exact=False)
+                    expect(target_element.first).to_be_visible(timeout=15000)
+            except Exception as e:
+                raise StepExecutionError(f"Wait action failed. Error: {e}") from e
+            invalidate_snapshot(page)
+            continue
+
+        retries_left = retries
+        while True:
+            # Check if the parser already gave us a selector
+            if step.get('selector'):
+                logger.info("Selector provided in step, skipping AI call.")
+                action_to_perform = step  # Use the step directly
+            else:
+                # No selector provided, ask the planner (cache, local match or AI)
+                action_to_perform = planner.action_for(page, index, last_error)
+                last_error = ""
+
+                if not action_to_perform:
+                    raise StepExecutionError(f"AI failed to provide an action for step: {step}.")
+
+            before = before_action(page) if before_action else None
+            try:
+                action_type = action_to_perform.get('action')
+                selector = action_to_perform.get('selector')
+
+                with span("action", step=index, action=action_type):
+                    if action_type == 'click':
+                        page.click(selector, timeout=5000)
+
+                    elif action_type == 'fill':
+                        page.fill(selector, action_to_perform.get('value', ''), timeout=5000)
+
+                settle_times_ms.append(wait_for_page_settle(page, logger))
+                invalidate_snapshot(page)
+
+                logger.info(f"   Action '{action_type}' on '{selector}' executed successfully (resolved by: {action_to_perform.get('resolved_by', 'step')}).")
+                remember_successful_action(action_to_perform)
+                if after_action:
+                    after_action(before, action_to_perform)
+                break
+
+            except Exception as e:
+                forget_failed_action(action_to_perform)
+                if step.get('selector') or retries_left <= 0:
+                    raise StepExecutionError(f"Action {action_to_perform} failed for step {step}: {e}") from e
+                # Let the model see what went wrong and try again
+                retries_left -= 1
+                last_error = str(e).splitlines()[0]
+                invalidate_snapshot(page)
+                logger.warning(f"Action {action_to_perform} failed ({last_error}). Re-resolving the step, {retries_left} retries left.")
+
+    return settle_times_ms
@@ -1,49 +1,91 @@
-import json
-import os
 import threading
+import time
+from autotester.utils.journal_store import JournalStore
 
 class AIMemory:
     """
-    A thread-safe class to manage the AI's memory of successful selectors.
+    A thread- and process-safe class to manage the AI's memory of successful selectors.
     This helps the AI learn and become faster over time.
+
+    Entries are kept in least-recently-used order and expire after `ttl_seconds`.
+    Storage is a JournalStore: each write, and each recall hit (to keep the
+    LRU order across runs), is a single appended line; lookups are served
+    from memory.
     """
     _instance = None
-    _lock = threading.Lock()
+    _lock = threading.RLock()
 
-    def __new__(cls, filepath='ai_memory.json'):
+    def __new__(cls, filepath='ai_memory.json', max_entries=5000, ttl_seconds=30 * 24 * 3600):
         with cls._lock:
             if cls._instance is None:
                 cls._instance = super(AIMemory, cls).__new__(cls)
                 cls._instance.filepath = filepath
-                cls._instance.memory = cls._instance._load()
+                cls._instance.max_entries = max_entries
+                cls._instance.ttl_seconds = ttl_seconds
+                cls._instance._store = None
         return cls._instance
 
-    def _load(self):
-        """Loads memory from the JSON file."""
-        if os.path.exists(self.filepath):
-            try:
-                with open(self.filepath, 'r') as f:
-                    return json.load(f)
-            except (json.JSONDecodeError, IOError):
-                return {}
-        return {}
-
-    def _save(self):
-        """Saves the current memory to the JSON file."""
-        with open(self.filepath, 'w') as f:
-            json.dump(self.memory, f, indent=4)
-
-    def remember(self, page_url, element_name, selector):
+    @property
+    def store(self):
+        # Opened on first use so importing the agent doesn't touch the disk
+        if self._store is None:
+            with self._lock:
+                if self._store is None:
+                    self._store = JournalStore(self.filepath)
+        return self._store
+
+    @property
+    def memory(self):
+        return self.store.data
+
+    @staticmethod
+    def _entry(value):
+        # Older files stored the bare selector string
+        if isinstance(value, str):
+            return {"selector": value, "saved_at": time.time()}
+        return value
+
+    @staticmethod
+    def make_key(page_url, element_name, fingerprint=None):
+        key = f"{page_url}::{element_name}"
+        return f"{key}::{fingerprint}" if fingerprint else key
+
+    def _evict(self):
+        """Drops expired entries, then the least recently used ones over capacity."""
+        now = time.time()
+        for key in [k for k, v in self.memory.items() if now - self._entry(v).get("saved_at", 0) > self.ttl_seconds]:
+            self.store.delete(key)
+        while len(self.memory) > self.max_entries:
+            self.store.delete(next(iter(self.memory)))
+
+    def remember(self, page_url, element_name, selector, fingerprint=None):
         """Remembers a successful selector for a given page and element."""
         with self._lock:
-            key = f"{page_url}::{element_name}"
-            self.memory[key] = selector
-            self._save()
+            key = self.make_key(page_url, element_name, fingerprint)
+            self.store.put(key, {"selector": selector, "saved_at": time.time()})
+            if len(self.memory) > self.max_entries:
+                self._evict()
 
-    def recall(self, page_url, element_name):
-        """Recalls a selector from memory."""
-        key = f"{page_url}::{element_name}"
-        return self.memory.get(key)
+    def recall(self, page_url, element_name, fingerprint=None):
+        """Recalls a selector from memory, or None if unknown or expired."""
+        key = self.make_key(page_url, element_name, fingerprint)
+        with self._lock:
+            # Pick up selectors learned by other workers
+            self.store.refresh()
+            entry = self.memory.get(key)
+            if entry is None:
+                return None
+            entry = self._entry(entry)
+            if time.time() - entry.get("saved_at", 0) > self.ttl_seconds:
+                self.store.delete(key)
+                return None
+            self.store.touch(key)
+            return entry["selector"]
+
+    def forget(self, page_url, element_name, fingerprint=None):
+        """Invalidates a selector that no longer works."""
+        with self._lock:
+            self.store.delete(self.make_key(page_url, element_name, fingerprint))
 
 # Initialize a singleton instance
-memory_singleton = AIMemory()
\ No newline at end of file
+memory_singleton = AIMemory()
@@ -0,0 +1,67 @@
+import gzip
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+
+class BlobStore:
+    """
+    Write-once, content-addressed storage for JSON payloads.
+
+    Each payload is stored gzip-compressed under the SHA-256 of its canonical
+    JSON, so identical payloads are kept once no matter how many nodes refer
+    to them. Reads go through a small in-memory LRU cache.
+    """
+
+    def __init__(self, root, cache_size=64):
+        self.root = root
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key_for(payload):
+        canonical = json.dumps(payload, sort_keys=True, separators=(',', ':'))
+        return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.root, key[:2], f"{key}.json.gz")
+
+    def _remember(self, key, payload):
+        with self._lock:
+            self._cache[key] = payload
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def put(self, payload):
+        """Stores a payload (if not already stored) and returns its key."""
+        key = self.key_for(payload)
+        path = self._path(key)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with gzip.open(tmp_path, 'wt', encoding='utf-8') as f:
+                json.dump(payload, f, separators=(',', ':'))
+            os.replace(tmp_path, path)
+        self._remember(key, payload)
+        return key
+
+    def get(self, key):
+        """Returns the payload stored under a key, or None."""
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+        try:
+            with gzip.open(self._path(key), 'rt', encoding='utf-8') as f:
+                payload = json.load(f)
+        except (OSError, ValueError):
+            return None
+        self._remember(key, payload)
+        return payload
+
+    def __contains__(self, key):
+        return os.path.exists(self._path(key))
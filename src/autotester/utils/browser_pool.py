@@ -0,0 +1,48 @@
+from playwright.sync_api import sync_playwright
+
+
+class BrowserPool:
+    """
+    Keeps one Chromium process alive for the whole test session and hands out
+    an isolated browser context per scenario.
+
+    Scenarios in one worker run one after another; parallelism comes from
+    running several pool owners side by side (one per pytest-xdist worker).
+    """
+
+    def __init__(self, headless=True, slow_mo=0):
+        self.headless = headless
+        self.slow_mo = slow_mo
+        self._playwright = None
+        self.browser = None
+
+    def _ensure_browser(self):
+        if self._playwright is None:
+            self._playwright = sync_playwright().start()
+        # Relaunch if the browser crashed or was closed by a previous test
+        if self.browser is None or not self.browser.is_connected():
+            try:
+                self.browser = self._playwright.chromium.launch(headless=self.headless, slow_mo=self.slow_mo)
+            except Exception:
+                # Don't leave the driver (and its event loop) running without a browser
+                self.browser = None
+                self._playwright.stop()
+                self._playwright = None
+                raise
+        return self.browser
+
+    def new_context(self, **context_options):
+        """Opens a fresh, isolated context (own cookies, storage and cache)."""
+        return self._ensure_browser().new_context(**context_options)
+
+    def release(self, context):
+        """Closes a context handed out by new_context()."""
+        context.close()
+
+    def close(self):
+        if self.browser is not None:
+            self.browser.close()
+            self.browser = None
+        if self._playwright is not None:
+            self._playwright.stop()
+            self._playwright = None
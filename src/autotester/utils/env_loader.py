@@ -23,3 +23,146 @@ def load_base_url():
     if not url:
         raise ValueError("BASE_URL not found in .env file.")
     return url
+
+def load_extraction_engine():
+    """
+    Loads which engine extracts interactive elements: 'browser' (in-page JS,
+    the default) or 'soup' (BeautifulSoup over the page HTML).
+    """
+    load_dotenv()
+    engine = os.getenv("EXTRACTION_ENGINE", "browser").lower()
+    if engine not in ("browser", "soup"):
+        raise ValueError(f"Unknown EXTRACTION_ENGINE '{engine}'. Use 'browser' or 'soup'.")
+    return engine
+
+def load_prompt_budget():
+    """
+    Loads the prompt size limits for the UI summary:
+    (PROMPT_TOKEN_BUDGET, PROMPT_MAX_CANDIDATES), defaulting to (2000, 80).
+    """
+    load_dotenv()
+    return int(os.getenv("PROMPT_TOKEN_BUDGET", "2000")), int(os.getenv("PROMPT_MAX_CANDIDATES", "80"))
+
+def load_preflight_settings():
+    """
+    Loads how AI-proposed selectors are checked before they are executed:
+    (PREFLIGHT_RETRIES, PREFLIGHT_ALTERNATIVES), defaulting to (2, 5). A rejected
+    selector is sent back to the model up to PREFLIGHT_RETRIES times, together
+    with those of the top PREFLIGHT_ALTERNATIVES candidates that pass.
+    """
+    load_dotenv()
+    return int(os.getenv("PREFLIGHT_RETRIES", "2")), int(os.getenv("PREFLIGHT_ALTERNATIVES", "5"))
+
+def load_candidate_streaming():
+    """
+    Loads whether steps read the page's elements as a priority-ordered stream
+    instead of all at once: (CANDIDATE_STREAMING, STREAM_MAX_CANDIDATES),
+    defaulting to (False, 200).
+    """
+    load_dotenv()
+    enabled = os.getenv("CANDIDATE_STREAMING", "false").lower() in ("1", "true", "yes")
+    return enabled, int(os.getenv("STREAM_MAX_CANDIDATES", "200"))
+
+def load_llm_settings():
+    """
+    Loads the model provider settings. Every value has a default, so only
+    LLM_PROVIDER's API key is required.
+
+    LLM_MODELS optionally lists several models, fastest first, as 'model' or
+    'provider:model' (e.g. 'gemini-flash-lite-latest,gemini-pro-latest').
+    Steps then go to the first model and escalate to later ones. 'models'
+    always holds at least the single (provider, model) pair.
+    """
+    load_dotenv()
+    provider = os.getenv("LLM_PROVIDER", "gemini").lower()
+    default_model = "gemini-flash-latest" if provider == "gemini" else "gpt-4-turbo"
+    model = os.getenv("LLM_MODEL", default_model)
+    models = []
+    for entry in os.getenv("LLM_MODELS", "").split(','):
+        entry = entry.strip()
+        if entry:
+            models.append(tuple(entry.split(':', 1)) if ':' in entry else (provider, entry))
+    return {
+        "provider": provider,
+        "model": model,
+        "models": models or [(provider, model)],
+        "requests_per_minute": float(os.getenv("LLM_REQUESTS_PER_MINUTE", "60")),
+        "max_concurrency": int(os.getenv("LLM_MAX_CONCURRENCY", "4")),
+        "deadline": float(os.getenv("LLM_DEADLINE_SECONDS", "90")),
+    }
+
+def load_llm_cache_settings():
+    """
+    Loads the LLM response cache settings: LLM_CACHE_MODE
+    ('record', 'replay' or 'passthrough'), LLM_CACHE_DIR and LLM_CACHE_MAX_MB.
+    """
+    load_dotenv()
+    return {
+        "mode": os.getenv("LLM_CACHE_MODE", "passthrough").lower(),
+        "cache_dir": os.getenv("LLM_CACHE_DIR", ".llm_cache"),
+        "max_bytes": int(float(os.getenv("LLM_CACHE_MAX_MB", "100")) * 1024 * 1024),
+    }
+
+def load_settle_settings():
+    """
+    Loads page settle detection limits in milliseconds:
+    (SETTLE_QUIET_MS, SETTLE_TIMEOUT_MS), defaulting to (300, 10000).
+    """
+    load_dotenv()
+    return int(os.getenv("SETTLE_QUIET_MS", "300")), int(os.getenv("SETTLE_TIMEOUT_MS", "10000"))
+
+def load_settle_request_settings():
+    """
+    Loads which requests page settling ignores: SETTLE_IGNORE_URLS, comma-separated
+    URL glob patterns (e.g. '*/longpoll*'), and SETTLE_MAX_REQUEST_MS, the age after
+    which an in-flight request is treated as a long poll (default 5000, 0 = no limit).
+    """
+    load_dotenv()
+    patterns = [v.strip() for v in os.getenv("SETTLE_IGNORE_URLS", "").split(',') if v.strip()]
+    return patterns, int(os.getenv("SETTLE_MAX_REQUEST_MS", "5000"))
+
+def load_session_settings():
+    """
+    Loads where saved login sessions live and how long they stay valid:
+    SESSION_DIR (default '.sessions') and SESSION_TTL_MINUTES (default 60).
+    """
+    load_dotenv()
+    return {
+        "root": os.getenv("SESSION_DIR", ".sessions"),
+        "ttl_seconds": float(os.getenv("SESSION_TTL_MINUTES", "60")) * 60,
+    }
+
+def load_network_settings():
+    """
+    Loads request routing rules and HAR settings:
+    BLOCK_RESOURCE_TYPES, BLOCKED_DOMAINS and ALLOWED_DOMAINS (comma-separated),
+    BLOCK_THIRD_PARTY, FIRST_PARTY_DOMAIN (the site's own domain, if the start
+    URL's can't be worked out), HAR_MODE ('off', 'auto', 'record' or 'replay'), HAR_DIR
+    and HAR_OFFLINE. Nothing is blocked or recorded by default.
+    """
+    load_dotenv()
+
+    def csv(name):
+        return [v.strip().lower() for v in os.getenv(name, "").split(',') if v.strip()]
+
+    def flag(name, default):
+        return os.getenv(name, default).lower() in ("1", "true", "yes")
+
+    har_mode = os.getenv("HAR_MODE", "off").lower()
+    if har_mode not in ("off", "auto", "record", "replay"):
+        raise ValueError(f"Unknown HAR_MODE '{har_mode}'. Use 'off', 'auto', 'record' or 'replay'.")
+    return {
+        "block_resource_types": csv("BLOCK_RESOURCE_TYPES"),
+        "blocked_domains": csv("BLOCKED_DOMAINS"),
+        "allowed_domains": csv("ALLOWED_DOMAINS"),
+        "block_third_party": flag("BLOCK_THIRD_PARTY", "false"),
+        "first_party_domain": os.getenv("FIRST_PARTY_DOMAIN", "").strip().lower() or None,
+        "har_mode": har_mode,
+        "har_dir": os.getenv("HAR_DIR", "hars"),
+        "har_offline": flag("HAR_OFFLINE", "true"),
+    }
+
+def load_trace_dir():
+    """Loads TRACE_DIR, where per-run timing traces are written. Empty (the default) disables tracing."""
+    load_dotenv()
+    return os.getenv("TRACE_DIR", "")
@@ -0,0 +1,209 @@
+import json
+import os
+import threading
+import uuid
+from collections import OrderedDict
+
+if os.name == 'nt':
+    import msvcrt
+else:
+    import fcntl
+
+
+class FileLock:
+    """An exclusive inter-process lock held on a side file (works on Windows and POSIX)."""
+
+    def __init__(self, path):
+        self.path = path
+        self._handle = None
+
+    def __enter__(self):
+        self._handle = open(self.path, 'a+')
+        if os.name == 'nt':
+            self._handle.seek(0)
+            # LK_LOCK retries for ~10 s; loop so long compactions don't raise
+            while True:
+                try:
+                    msvcrt.locking(self._handle.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    continue
+        else:
+            fcntl.flock(self._handle.fileno(), fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        try:
+            if os.name == 'nt':
+                self._handle.seek(0)
+                msvcrt.locking(self._handle.fileno(), msvcrt.LK_UNLCK, 1)
+            else:
+                fcntl.flock(self._handle.fileno(), fcntl.LOCK_UN)
+        finally:
+            self._handle.close()
+            self._handle = None
+
+
+class JournalStore:
+    """
+    A key-value store made of a compacted JSON snapshot plus an append-only
+    journal of changes.
+
+    Writes append one line to the journal (O(1)); reads are served from the
+    in-memory `data`. Other processes' writes are picked up by refresh(),
+    which only reads the journal bytes added since the last call. Once the
+    journal outgrows the live data it is folded back into the snapshot.
+    All file access happens under an inter-process FileLock.
+    """
+
+    def __init__(self, snapshot_path, compact_min_records=1000):
+        self.snapshot_path = snapshot_path
+        self.journal_path = f"{snapshot_path}.journal"
+        self.compact_min_records = compact_min_records
+        self.data = OrderedDict()
+        self._generation = None
+        self._offset = 0
+        self._journal_records = 0
+        self._seen_stat = None
+        self._thread_lock = threading.RLock()
+        self._file_lock = FileLock(f"{snapshot_path}.lock")
+        with self._thread_lock, self._file_lock:
+            self._reload()
+            self._seen_stat = self._journal_stat()
+
+    # --- reading ---
+
+    def _read_snapshot(self):
+        if not os.path.exists(self.snapshot_path):
+            return {}
+        try:
+            with open(self.snapshot_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (json.JSONDecodeError, IOError):
+            return {}
+
+    def _journal_generation(self):
+        """The journal's header line identifies which snapshot it belongs to."""
+        try:
+            with open(self.journal_path, 'r', encoding='utf-8') as f:
+                header = f.readline()
+            return json.loads(header).get('generation') if header.endswith('\n') else None
+        except (IOError, ValueError, AttributeError):
+            return None
+
+    def _reload(self):
+        """Rebuilds `data` from the snapshot and the whole journal. Caller holds both locks."""
+        self.data = OrderedDict(self._read_snapshot())
+        self._generation = self._journal_generation()
+        if self._generation is None:
+            self._start_journal()
+        self._offset = 0
+        self._journal_records = 0
+        self._read_new_records()
+
+    def _start_journal(self):
+        self._generation = uuid.uuid4().hex
+        with open(self.journal_path, 'w', encoding='utf-8') as f:
+            f.write(json.dumps({"generation": self._generation}) + '\n')
+
+    def _apply(self, record):
+        key = record['k']
+        if record.get('d'):
+            self.data.pop(key, None)
+        elif record.get('t'):
+            if key in self.data:
+                self.data.move_to_end(key)
+        else:
+            self.data.pop(key, None)
+            self.data[key] = record['v']
+
+    def _read_new_records(self):
+        with open(self.journal_path, 'rb') as f:
+            f.seek(self._offset)
+            chunk = f.read()
+        # Only consume complete lines; a writer may be mid-append
+        end = chunk.rfind(b'\n') + 1
+        for raw in chunk[:end].splitlines():
+            if not raw.strip():
+                continue
+            try:
+                record = json.loads(raw)
+            except ValueError:
+                continue
+            if 'generation' in record:
+                continue
+            self._apply(record)
+            self._journal_records += 1
+        self._offset += end
+
+    def _journal_stat(self):
+        try:
+            stat = os.stat(self.journal_path)
+            return stat.st_size, stat.st_mtime_ns
+        except OSError:
+            return None
+
+    def _refresh_locked(self):
+        if self._journal_generation() != self._generation:
+            # Another process compacted the store
+            self._reload()
+        else:
+            self._read_new_records()
+        self._seen_stat = self._journal_stat()
+
+    def refresh(self):
+        """Picks up changes written by other processes since the last refresh."""
+        with self._thread_lock:
+            # A stat is far cheaper than taking the file lock
+            if self._seen_stat is not None and self._journal_stat() == self._seen_stat:
+                return
+            with self._file_lock:
+                self._refresh_locked()
+
+    # --- writing ---
+
+    def _append_locked(self, record):
+        """Writes one record after the caller has refreshed under both locks."""
+        line = (json.dumps(record, separators=(',', ':')) + '\n').encode('utf-8')
+        with open(self.journal_path, 'ab') as f:
+            f.write(line)
+        self._apply(record)
+        self._offset += len(line)
+        self._journal_records += 1
+        if self._journal_records > max(self.compact_min_records, 2 * len(self.data)):
+            self._compact_locked()
+        self._seen_stat = self._journal_stat()
+
+    def _append_if_present(self, key, record):
+        with self._thread_lock, self._file_lock:
+            self._refresh_locked()
+            if key in self.data:
+                self._append_locked(record)
+
+    def put(self, key, value):
+        with self._thread_lock, self._file_lock:
+            self._refresh_locked()
+            self._append_locked({"k": key, "v": value})
+
+    def delete(self, key):
+        self._append_if_present(key, {"k": key, "d": 1})
+
+    def touch(self, key):
+        """Marks a key as most recently used, so the order survives a restart."""
+        self._append_if_present(key, {"k": key, "t": 1})
+
+    def _compact_locked(self):
+        tmp_path = f"{self.snapshot_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.data, f, separators=(',', ':'))
+        os.replace(tmp_path, self.snapshot_path)
+        self._start_journal()
+        self._offset = os.path.getsize(self.journal_path)
+        self._journal_records = 0
+
+    def compact(self):
+        """Folds the journal into the snapshot."""
+        with self._thread_lock, self._file_lock:
+            self._refresh_locked()
+            self._compact_locked()
+            self._seen_stat = self._journal_stat()
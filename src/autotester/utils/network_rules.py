@@ -0,0 +1,135 @@
+import glob
+import ipaddress
+import os
+import re
+from urllib.parse import urlparse
+
+try:
+    import tldextract
+    # The bundled public suffix list snapshot; never fetched over the network
+    _extract = tldextract.TLDExtract(suffix_list_urls=())
+except ImportError:
+    _extract = None
+
+HAR_MODES = ('off', 'auto', 'record', 'replay')
+
+# Without tldextract: second-level labels that form a public suffix under a
+# country code, as in 'co.uk', 'com.au' or 'ac.jp'.
+COUNTRY_SECOND_LEVEL = {'ac', 'co', 'com', 'edu', 'gov', 'ltd', 'ne', 'net', 'or', 'org', 'plc'}
+
+
+def site_domain(host):
+    """
+    The registrable domain of a host: 'www.amazon.in' -> 'amazon.in',
+    'www.amazon.co.uk' -> 'amazon.co.uk'. IP addresses and single-label hosts
+    like 'localhost' are returned unchanged. Uses the public suffix list when
+    tldextract is installed.
+    """
+    host = (host or '').lower().rstrip('.')
+    try:
+        ipaddress.ip_address(host.strip('[]'))
+        return host
+    except ValueError:
+        pass
+    labels = host.split('.')
+    if len(labels) < 2:
+        return host
+    if _extract is not None:
+        parts = _extract(host)
+        return parts.registered_domain or host
+    keep = 3 if len(labels[-1]) == 2 and labels[-2] in COUNTRY_SECOND_LEVEL else 2
+    return '.'.join(labels[-keep:])
+
+
+def host_matches(host, domain):
+    host, domain = (host or '').lower(), domain.lower().lstrip('.')
+    return host == domain or host.endswith(f".{domain}")
+
+
+class NetworkRules:
+    """
+    Decides which requests a browser context lets through.
+
+    Requests are blocked if their resource type is in `block_resource_types`
+    (e.g. image, font, media), if their host matches `blocked_domains`, or,
+    with `block_third_party`, if their host is neither the start URL's site
+    nor one of `allowed_domains` (CDNs the app needs). `first_party_domain`
+    overrides the site worked out from the start URL.
+    """
+
+    def __init__(self, start_url, block_resource_types=(), block_third_party=False,
+                 allowed_domains=(), blocked_domains=(), first_party_domain=None):
+        self.first_party = first_party_domain or site_domain(urlparse(start_url).hostname)
+        self.block_resource_types = set(block_resource_types)
+        self.block_third_party = block_third_party
+        self.allowed_domains = list(allowed_domains)
+        self.blocked_domains = list(blocked_domains)
+        self.blocked_count = 0
+
+    @property
+    def active(self):
+        return bool(self.block_resource_types or self.block_third_party or self.blocked_domains)
+
+    def should_block(self, url, resource_type):
+        if resource_type == 'document':
+            # Never block a page itself, or navigation would fail outright
+            return False
+        if resource_type in self.block_resource_types:
+            return True
+        host = urlparse(url).hostname
+        if host is None:
+            # data:, blob: and similar URLs never hit the network
+            return False
+        if any(host_matches(host, domain) for domain in self.blocked_domains):
+            return True
+        if self.block_third_party:
+            return not (host_matches(host, self.first_party)
+                        or any(host_matches(host, domain) for domain in self.allowed_domains))
+        return False
+
+    def _handle(self, route):
+        request = route.request
+        if self.should_block(request.url, request.resource_type):
+            self.blocked_count += 1
+            route.abort()
+        else:
+            # Lets earlier routes (e.g. HAR replay or recording) handle the request
+            route.fallback()
+
+    def install(self, context):
+        if self.active:
+            context.route("**/*", self._handle)
+
+
+def har_dir_for(har_root, start_url):
+    host = urlparse(start_url).netloc or 'default_app'
+    return os.path.join(har_root, re.sub(r'[^A-Za-z0-9_.-]', '_', host))
+
+
+def har_name_for(test_id):
+    return f"{re.sub(r'[^A-Za-z0-9_.-]+', '_', test_id).strip('_')[:150]}.har"
+
+
+def record_har(context, har_dir, test_id):
+    """Records the context's traffic to <har_dir>/<test>.har (written when the context closes)."""
+    os.makedirs(har_dir, exist_ok=True)
+    path = os.path.join(har_dir, har_name_for(test_id))
+    context.route_from_har(path, update=True, update_content='embed')
+    return path
+
+
+def replay_hars(context, har_dir, offline=True):
+    """
+    Serves requests from every HAR recorded for the app. With `offline`,
+    requests no HAR answers are aborted instead of going to the network.
+    Returns the number of HAR files used.
+    """
+    har_files = sorted(glob.glob(os.path.join(har_dir, '*.har')))
+    if not har_files:
+        return 0
+    if offline:
+        # Registered first, so it only sees requests every HAR passed on
+        context.route("**/*", lambda route: route.abort())
+    for path in har_files:
+        context.route_from_har(path, not_found='fallback')
+    return len(har_files)
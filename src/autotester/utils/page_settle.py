@@ -0,0 +1,142 @@
+import time
+import weakref
+from fnmatch import fnmatchcase
+from autotester.utils.env_loader import load_settle_request_settings, load_settle_settings
+from autotester.utils.tracing import span
+
+# Long-lived connections never "finish", so they must not hold the page unsettled.
+IGNORED_RESOURCE_TYPES = {'websocket', 'eventsource', 'media'}
+
+# Resolves once the DOM has had no mutations for quietMs, or after maxMs.
+# Returns true if the DOM went quiet, false if it was still changing.
+DOM_QUIET_JS = """
+({quietMs, maxMs}) => new Promise(resolve => {
+    const started = performance.now();
+    let lastMutation = started;
+    const observer = new MutationObserver(() => { lastMutation = performance.now(); });
+    observer.observe(document, {subtree: true, childList: true, attributes: true, characterData: true});
+    const check = () => {
+        const now = performance.now();
+        if (now - lastMutation >= quietMs || now - started >= maxMs) {
+            observer.disconnect();
+            resolve(now - lastMutation >= quietMs);
+        } else {
+            setTimeout(check, Math.min(quietMs, 50));
+        }
+    };
+    setTimeout(check, Math.min(quietMs, 50));
+})
+"""
+
+_trackers = weakref.WeakKeyDictionary()
+
+
+class NetworkActivityTracker:
+    """
+    Counts a page's in-flight requests from Playwright's request events.
+    Requests whose URL matches one of `ignored_urls` (glob patterns) are not
+    counted, and a request in flight for longer than `max_request_ms` is taken
+    for a long poll and stops counting (0 = no limit).
+    """
+
+    def __init__(self, page, ignored_urls=(), max_request_ms=0):
+        self.in_flight = {}  # request -> when it started
+        self.ignored_urls = list(ignored_urls)
+        self.max_request_ms = max_request_ms
+        self.last_activity = time.monotonic()
+        page.on("request", self._on_request)
+        page.on("requestfinished", self._on_done)
+        page.on("requestfailed", self._on_done)
+
+    def _ignored(self, request):
+        if request.resource_type in IGNORED_RESOURCE_TYPES:
+            return True
+        return any(fnmatchcase(request.url, pattern) for pattern in self.ignored_urls)
+
+    def _on_request(self, request):
+        if self._ignored(request):
+            return
+        self.in_flight[request] = time.monotonic()
+        self.last_activity = time.monotonic()
+
+    def _on_done(self, request):
+        if self.in_flight.pop(request, None) is not None:
+            self.last_activity = time.monotonic()
+
+    def pending(self):
+        """In-flight requests that still hold the page busy (long polls excluded)."""
+        if not self.max_request_ms:
+            return list(self.in_flight)
+        cutoff = time.monotonic() - self.max_request_ms / 1000.0
+        return [request for request, started in self.in_flight.items() if started > cutoff]
+
+    def quiet_for(self):
+        """Seconds since the last request started or finished; 0 while requests are pending."""
+        if self.pending():
+            return 0.0
+        return time.monotonic() - self.last_activity
+
+
+def watch_page_activity(page):
+    """
+    Starts tracking network activity for a page. Call right after the page is
+    created. Ignored URLs and the long-poll age come from SETTLE_IGNORE_URLS
+    and SETTLE_MAX_REQUEST_MS.
+    """
+    tracker = _trackers.get(page)
+    if tracker is None:
+        ignored_urls, max_request_ms = load_settle_request_settings()
+        tracker = NetworkActivityTracker(page, ignored_urls, max_request_ms)
+        _trackers[page] = tracker
+    return tracker
+
+
+def wait_for_page_settle(page, logger=None, quiet_ms=None, timeout_ms=None):
+    """
+    Waits until the DOM has stopped mutating and no requests have been in
+    flight for `quiet_ms`, giving up after `timeout_ms` (defaults come from
+    SETTLE_QUIET_MS / SETTLE_TIMEOUT_MS). Returns the time waited in milliseconds.
+    """
+    default_quiet_ms, default_timeout_ms = load_settle_settings()
+    if quiet_ms is None:
+        quiet_ms = default_quiet_ms
+    if timeout_ms is None:
+        timeout_ms = default_timeout_ms
+    with span("settle") as attrs:
+        waited_ms, settled = _wait_until_settled(page, quiet_ms, timeout_ms)
+        attrs['settled'] = settled
+
+    if logger:
+        if settled:
+            logger.info(f"   Page settled in {waited_ms:.0f} ms.")
+        else:
+            logger.warning(f"   Page still busy after {waited_ms:.0f} ms; continuing anyway.")
+    return waited_ms
+
+
+def _wait_until_settled(page, quiet_ms, timeout_ms):
+    """Returns (milliseconds waited, whether the page settled before the timeout)."""
+    tracker = watch_page_activity(page)
+    started = time.monotonic()
+    deadline = started + timeout_ms / 1000.0
+    settled = False
+
+    while time.monotonic() < deadline:
+        remaining_ms = max(1, int((deadline - time.monotonic()) * 1000))
+        try:
+            dom_quiet = page.evaluate(DOM_QUIET_JS, {"quietMs": quiet_ms, "maxMs": remaining_ms})
+        except Exception:
+            # The document was replaced by a navigation; wait for the new one to exist
+            dom_quiet = False
+            try:
+                page.wait_for_load_state('domcontentloaded', timeout=remaining_ms)
+            except Exception:
+                pass
+
+        if dom_quiet and tracker.quiet_for() * 1000 >= quiet_ms:
+            settled = True
+            break
+        # Lets Playwright deliver pending request events before re-checking
+        page.wait_for_timeout(min(quiet_ms, 50))
+
+    return (time.monotonic() - started) * 1000, settled
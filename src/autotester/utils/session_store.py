@@ -0,0 +1,58 @@
+import json
+import os
+import re
+import time
+from autotester.utils.journal_store import FileLock
+
+
+class SessionStore:
+    """
+    Saved Playwright storage states (cookies and localStorage), one file per
+    named login profile. A saved state is stale once it is older than
+    `ttl_seconds` or any of its persistent cookies has expired.
+    """
+
+    def __init__(self, root='.sessions', ttl_seconds=3600):
+        self.root = root
+        self.ttl_seconds = ttl_seconds
+        os.makedirs(root, exist_ok=True)
+
+    def path_for(self, profile):
+        safe_name = re.sub(r'[^A-Za-z0-9_.-]', '_', profile)
+        return os.path.join(self.root, f"{safe_name}.json")
+
+    def lock(self, profile):
+        """An inter-process lock, so parallel workers don't all log in at once."""
+        return FileLock(f"{self.path_for(profile)}.lock")
+
+    def is_fresh(self, profile):
+        path = self.path_for(profile)
+        try:
+            if time.time() - os.path.getmtime(path) > self.ttl_seconds:
+                return False
+            with open(path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return False
+        now = time.time()
+        # Session cookies have expires == -1
+        return not any(0 < cookie.get('expires', -1) < now for cookie in state.get('cookies', []))
+
+    def load(self, profile):
+        """Returns the storage state file for a profile, or None if missing or stale."""
+        return self.path_for(profile) if self.is_fresh(profile) else None
+
+    def save(self, context, profile):
+        """Saves a browser context's storage state under a profile and returns its path."""
+        path = self.path_for(profile)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(context.storage_state(), f)
+        os.replace(tmp_path, path)
+        return path
+
+    def invalidate(self, profile):
+        try:
+            os.remove(self.path_for(profile))
+        except OSError:
+            pass
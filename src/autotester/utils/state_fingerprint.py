@@ -0,0 +1,130 @@
+import hashlib
+import json
+import os
+from collections import defaultdict
+
+# Used when an app has no workflows/<app>_fingerprint.json.
+# The regions are CSS selectors for containers that DO NOT change, like headers
+# or sidebars; they are specific to Amazon and can be adapted per app.
+DEFAULT_FINGERPRINT_CONFIG = {
+    "regions": [
+        "div#nav-belt",      # Top-most navigation bar
+        "div#nav-main",      # Main navigation bar below the top one
+        "div#leftNav",       # The left-hand filter sidebar on search results
+    ],
+    "elements": ["input", "button", "select", "textarea"],
+    # Minimum SimHash similarity (0-1) for a page to count as a known state.
+    # 1.0 = exact matches only; apps opt in to fuzzy matching (e.g. 0.9) in their config file
+    "match_threshold": 1.0,
+    "simhash_bits": 64,
+    "lsh_bands": 8,
+}
+
+
+def load_fingerprint_config(workflow_dir, app_name):
+    """Reads workflows/<app>_fingerprint.json, filling in defaults for missing keys."""
+    config = dict(DEFAULT_FINGERPRINT_CONFIG)
+    path = os.path.join(workflow_dir, f"{app_name}_fingerprint.json")
+    if os.path.exists(path):
+        try:
+            with open(path, 'r') as f:
+                config.update(json.load(f))
+        except (json.JSONDecodeError, IOError, TypeError, ValueError):
+            pass
+    return config
+
+
+def _signature(el):
+    return {"tag": el.name, "id": el.get('id'), "name": el.get('name'), "type": el.get('type'), "value": el.get('value', '')}
+
+
+def element_signatures(soup, config):
+    """
+    Signatures of the form elements inside the configured stable regions, or of
+    the whole page if none of the regions exist.
+    """
+    tags = config["elements"]
+    signatures = []
+    for selector in config["regions"]:
+        region = soup.select_one(selector)
+        if region:
+            for el in region.find_all(tags):
+                if el.name == 'input' and el.get('type') == 'hidden':
+                    continue
+                signatures.append(_signature(el))
+
+    # If no stable regions were found (e.g., on a simple page), fall back to the whole page
+    if not signatures:
+        signatures = [_signature(el) for el in soup.find_all(tags)]
+    return signatures
+
+
+def exact_hash(signatures):
+    """Order-independent MD5 of the signatures (the original state hash)."""
+    sorted_signatures = sorted(signatures, key=lambda x: (x['tag'], x.get('id') or '', x.get('name') or ''))
+    signature_str = json.dumps(sorted_signatures, sort_keys=True)
+    return hashlib.md5(signature_str.encode('utf-8')).hexdigest()
+
+
+def simhash(signatures, bits=64):
+    """
+    A similarity hash: pages that share most of their element signatures get
+    hashes that differ in only a few bits.
+    """
+    weights = [0] * bits
+    for signature in signatures:
+        feature = json.dumps(signature, sort_keys=True).encode('utf-8')
+        value = int.from_bytes(hashlib.blake2b(feature, digest_size=bits // 8).digest(), 'big')
+        for bit in range(bits):
+            weights[bit] += 1 if value >> bit & 1 else -1
+    return sum(1 << bit for bit in range(bits) if weights[bit] > 0)
+
+
+def similarity(a, b, bits=64):
+    """1.0 for identical SimHashes, falling linearly with the Hamming distance."""
+    return 1.0 - bin(a ^ b).count('1') / bits
+
+
+class LSHIndex:
+    """
+    Finds the known state whose SimHash is nearest to a query without
+    comparing against every state.
+
+    The hash is split into `bands` chunks, and a state is a candidate only if
+    at least one chunk matches exactly. Two hashes that differ in fewer bits
+    than there are bands always share a chunk, so any state within
+    `bands - 1` bits is guaranteed to be found.
+    """
+
+    def __init__(self, bits=64, bands=8):
+        self.bits = bits
+        self.bands = bands
+        self.band_bits = bits // bands
+        self._buckets = [defaultdict(set) for _ in range(bands)]
+        self._hashes = {}
+
+    def _bands(self, value):
+        mask = (1 << self.band_bits) - 1
+        return [(value >> (i * self.band_bits)) & mask for i in range(self.bands)]
+
+    def add(self, state_hash, value):
+        if state_hash in self._hashes:
+            return
+        self._hashes[state_hash] = value
+        for bucket, band in zip(self._buckets, self._bands(value)):
+            bucket[band].add(state_hash)
+
+    def __len__(self):
+        return len(self._hashes)
+
+    def nearest(self, value, threshold):
+        """Returns (state_hash, similarity) of the closest state at or above threshold, or (None, 0.0)."""
+        candidates = set()
+        for bucket, band in zip(self._buckets, self._bands(value)):
+            candidates.update(bucket.get(band, ()))
+        best, best_score = None, 0.0
+        for state_hash in sorted(candidates):
+            score = similarity(value, self._hashes[state_hash], self.bits)
+            if score >= threshold and score > best_score:
+                best, best_score = state_hash, score
+        return best, best_score
@@ -0,0 +1,165 @@
+"""
+Timing spans for the phases of a run, written as one JSON object per line.
+
+    with span("llm_call", prompt_tokens=n) as attrs:
+        text = client.complete(prompt)
+        attrs["response_tokens"] = estimate_tokens(text)
+
+Tracing is off until configure_tracing() is given a directory; spans are
+then appended to <dir>/run-<id>-<pid>.jsonl. Summarize one or more trace
+files with:
+
+    python -m autotester.utils.tracing traces/
+"""
+import glob
+import json
+import math
+import os
+import sys
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+
+class Tracer:
+    """Appends span records to a JSONL file; does nothing without a path."""
+
+    def __init__(self, path=None):
+        self.path = path
+        self._file = None
+        self._lock = threading.Lock()
+        if path:
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+            self._file = open(path, 'a', encoding='utf-8', buffering=1)
+
+    @property
+    def enabled(self):
+        return self._file is not None
+
+    def record(self, record):
+        line = json.dumps(record, separators=(',', ':'), default=str) + '\n'
+        with self._lock:
+            if self._file is not None:
+                self._file.write(line)
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+_tracer = Tracer()
+_context = threading.local()
+
+
+def configure_tracing(trace_dir, run_id=None):
+    """Starts writing spans under trace_dir (disables tracing if empty). Returns the trace file path."""
+    global _tracer
+    _tracer.close()
+    if not trace_dir:
+        _tracer = Tracer()
+        return None
+    run_id = run_id or time.strftime('%Y%m%d-%H%M%S')
+    _tracer = Tracer(os.path.join(trace_dir, f"run-{run_id}-{os.getpid()}.jsonl"))
+    return _tracer.path
+
+
+def close_tracing():
+    _tracer.close()
+
+
+def set_trace_scenario(name):
+    """Tags the spans recorded from now on (in this thread) with a scenario name."""
+    _context.scenario = name
+
+
+@contextmanager
+def span(phase, **attrs):
+    """
+    Times the enclosed block as `phase`. The yielded dict is recorded with the
+    span, so counts known only at the end (tokens, elements) can be added to it.
+    """
+    if not _tracer.enabled:
+        yield attrs
+        return
+    stack = getattr(_context, 'stack', None)
+    if stack is None:
+        stack = _context.stack = []
+    parent = stack[-1] if stack else None
+    stack.append(phase)
+    started_at = time.time()
+    started = time.perf_counter()
+    try:
+        yield attrs
+    except BaseException as e:
+        attrs['error'] = type(e).__name__
+        raise
+    finally:
+        duration_ms = (time.perf_counter() - started) * 1000
+        stack.pop()
+        _tracer.record({
+            'ts': round(started_at, 3),
+            'scenario': getattr(_context, 'scenario', None),
+            'phase': phase,
+            'parent': parent,
+            'ms': round(duration_ms, 3),
+            **attrs,
+        })
+
+
+# --- Reporting ---
+
+def read_trace(paths):
+    """Yields span records from trace files or directories of them."""
+    for path in paths:
+        files = sorted(glob.glob(os.path.join(path, '*.jsonl'))) if os.path.isdir(path) else [path]
+        for file_path in files:
+            with open(file_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    if line.strip():
+                        try:
+                            yield json.loads(line)
+                        except ValueError:
+                            continue
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100.0 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def summarize(records):
+    """{scenario: {phase: {'count', 'p50_ms', 'p95_ms', 'total_ms'}}} from span records."""
+    durations = defaultdict(lambda: defaultdict(list))
+    for record in records:
+        durations[record.get('scenario') or '(session)'][record['phase']].append(record['ms'])
+    return {
+        scenario: {
+            phase: {
+                'count': len(values),
+                'p50_ms': round(percentile(values, 50), 1),
+                'p95_ms': round(percentile(values, 95), 1),
+                'total_ms': round(sum(values), 1),
+            }
+            for phase, values in sorted(phases.items(), key=lambda item: -sum(item[1]))
+        }
+        for scenario, phases in durations.items()
+    }
+
+
+def format_summary(summary):
+    lines = []
+    for scenario, phases in summary.items():
+        lines.append(scenario)
+        lines.append(f"  {'phase':<22}{'count':>7}{'p50 ms':>11}{'p95 ms':>11}{'total ms':>12}")
+        for phase, stats in phases.items():
+            lines.append(f"  {phase:<22}{stats['count']:>7}{stats['p50_ms']:>11.1f}{stats['p95_ms']:>11.1f}{stats['total_ms']:>12.1f}")
+    return '\n'.join(lines)
+
+
+if __name__ == '__main__':
+    print(format_summary(summarize(read_trace(sys.argv[1:] or ['traces']))))
@@ -1,32 +1,219 @@
+import atexit
 import os
 import json
 import hashlib
+import threading
+import time
+import weakref
+from collections import OrderedDict, defaultdict
 from urllib.parse import urlparse
-from bs4 import BeautifulSoup
-from autotester.core.agent import get_ui_summary
+from autotester.core.agent import get_ui_summary, replayable_action
+from autotester.core.page_snapshot import PageSnapshot
+from autotester.utils.blob_store import BlobStore
+from autotester.utils.journal_store import FileLock
+from autotester.utils.tracing import span
+from autotester.utils.state_fingerprint import (
+    LSHIndex, element_signatures, exact_hash, load_fingerprint_config, simhash,
+)
+
+# Small fields kept inline on a node; everything else lives in the blob store.
+NODE_INLINE_KEYS = ('description', 'payload', 'simhash')
+
+# SimHashes kept for pages seen but not (yet) recorded as states. A page only
+# becomes a state right after it is seen, so older entries are dropped.
+PENDING_SIMHASH_LIMIT = 256
+
+# Every open WorkflowMemory, so unsaved edges are flushed when the process exits.
+_open_memories = weakref.WeakSet()
+
+
+def edge_key(from_state_hash, to_state_hash, action):
+    """A hashable identity for an edge; equal edges give equal keys regardless of key order."""
+    return json.dumps([from_state_hash, to_state_hash, action], sort_keys=True)
+
 
 class WorkflowMemory:
-    """Manages the learning and saving of application workflows."""
+    """
+    Manages the learning and saving of application workflows.
+
+    Edges are indexed by their 'from' state and by edge_key(), so duplicate
+    checks and next-step lookups don't scan the graph. New edges are written
+    at most once every `save_interval` seconds (and on flush() / exit); each
+    save merges edges other processes saved meanwhile and replaces the file
+    atomically.
+
+    Bulky node data (URL, UI summary) is kept in a content-addressed BlobStore
+    next to the workflow; the graph file only holds each node's payload hash,
+    and payloads are read on demand with node_payload().
 
-    def __init__(self, app_name: str):
+    States are fingerprinted per the app's workflows/<app>_fingerprint.json
+    (see state_fingerprint). States match exactly by default; if the app sets
+    a match threshold below 1.0, a page whose exact hash is new but whose
+    SimHash is within the threshold of a known state is treated as that state.
+    """
+
+    def __init__(self, app_name: str, save_interval: float = 2.0):
         self.app_name = app_name.replace(':', '_')
         self.workflow_dir = 'workflows'
         self.workflow_file = os.path.join(self.workflow_dir, f"{self.app_name}_workflow.json")
+        # Older versions wrote workflows/<app>/workflow_graph.json
+        self.legacy_workflow_file = os.path.join(self.workflow_dir, self.app_name, "workflow_graph.json")
         os.makedirs(self.workflow_dir, exist_ok=True)
+        self.blobs = BlobStore(os.path.join(self.workflow_dir, f"{self.app_name}_blobs"))
+        self.fingerprint_config = load_fingerprint_config(self.workflow_dir, self.app_name)
+        self._state_index = LSHIndex(self.fingerprint_config["simhash_bits"], self.fingerprint_config["lsh_bands"])
+        # SimHashes of pages seen but not yet added as nodes, most recent last
+        self._pending_simhashes = OrderedDict()
+        self.save_interval = save_interval
+        self._lock = threading.RLock()
+        self._file_lock = FileLock(f"{self.workflow_file}.lock")
+        self._dirty = False
+        self._last_save = time.monotonic()
         self.graph = self.load_workflow()
+        self._build_index()
+        for state_hash, node in self.graph["nodes"].items():
+            self._index_state(state_hash, node)
+        _open_memories.add(self)
 
-    def load_workflow(self):
-        if os.path.exists(self.workflow_file):
+    def _read_graph_file(self, path=None):
+        path = path or self.workflow_file
+        if os.path.exists(path):
             try:
-                with open(self.workflow_file, 'r') as f:
-                    return json.load(f)
-            except json.JSONDecodeError:
+                with open(path, 'r') as f:
+                    graph = json.load(f)
+                graph.setdefault("nodes", {})
+                graph.setdefault("edges", [])
+                self._externalize_payloads(graph)
+                return graph
+            except (json.JSONDecodeError, AttributeError):
                 return {"nodes": {}, "edges": []}
         return {"nodes": {}, "edges": []}
 
+    def load_workflow(self):
+        if not os.path.exists(self.workflow_file) and os.path.exists(self.legacy_workflow_file):
+            graph = self._read_graph_file(self.legacy_workflow_file)
+            self._dirty = True  # written out in the new layout on the next save
+            return graph
+        return self._read_graph_file()
+
+    def _externalize_payloads(self, graph):
+        """Moves inline node data (the old format) into the blob store, in place."""
+        for state_hash, node in graph["nodes"].items():
+            payload = {k: v for k, v in node.items() if k not in NODE_INLINE_KEYS}
+            if payload:
+                graph["nodes"][state_hash] = {k: v for k, v in node.items() if k in NODE_INLINE_KEYS}
+                graph["nodes"][state_hash]["payload"] = self.blobs.put(payload)
+                self._dirty = True
+
+    # --- node payloads ---
+
+    def node_payload(self, state_hash):
+        """The stored data for a state (e.g. 'url', 'ui_summary'), or {} if none was kept."""
+        node = self.graph["nodes"].get(state_hash) or {}
+        key = node.get("payload")
+        return (self.blobs.get(key) or {}) if key else {}
+
+    def set_node_payload(self, state_hash, payload):
+        with self._lock:
+            node = self._add_node(state_hash)
+            key = self.blobs.put(payload)
+            if node.get("payload") != key:
+                node["payload"] = key
+                self._dirty = True
+
+    # --- edge index ---
+
+    def _build_index(self):
+        self._edges_by_source = defaultdict(list)
+        self._edge_keys = set()
+        edges = self.graph['edges']
+        self.graph['edges'] = []
+        for edge in edges:
+            self._index_edge(edge)
+
+    def _index_edge(self, edge):
+        """Adds an edge to the graph and the indexes. Returns False if it was already known."""
+        key = edge_key(edge.get('from'), edge.get('to'), edge.get('action'))
+        if key in self._edge_keys:
+            return False
+        self._edge_keys.add(key)
+        self._edges_by_source[edge.get('from')].append(edge)
+        self.graph['edges'].append(edge)
+        return True
+
+    def _index_state(self, state_hash, node):
+        if node.get("simhash"):
+            self._state_index.add(state_hash, int(node["simhash"], 16))
+
+    def _add_node(self, state_hash):
+        """Returns the node for a state, creating (and fingerprint-indexing) it if needed."""
+        node = self.graph["nodes"].get(state_hash)
+        if node is None:
+            node = {"description": "State discovered during learning"}
+            value = self._pending_simhashes.pop(state_hash, None)
+            if value is not None:
+                node["simhash"] = format(value, f"0{self.fingerprint_config['simhash_bits'] // 4}x")
+            self.graph["nodes"][state_hash] = node
+            self._index_state(state_hash, node)
+            self._dirty = True
+        return node
+
+    def resolve_state(self, state_hash_or_prefix):
+        """Finds a known state by its full hash or a unique prefix (as shown in logs). Returns None if unknown or ambiguous."""
+        if state_hash_or_prefix in self.graph["nodes"]:
+            return state_hash_or_prefix
+        matches = [h for h in self.graph["nodes"] if h.startswith(state_hash_or_prefix)]
+        return matches[0] if len(matches) == 1 else None
+
+    def has_edge(self, from_state_hash, to_state_hash, action):
+        return edge_key(from_state_hash, to_state_hash, action) in self._edge_keys
+
+    def edges_from(self, state_hash):
+        """All edges leaving a state, in the order they were learned."""
+        return list(self._edges_by_source.get(state_hash, ()))
+
+    def next_edge(self, state_hash):
+        """The first learned edge leaving a state, or None."""
+        edges = self._edges_by_source.get(state_hash)
+        return edges[0] if edges else None
+
+    def add_edge(self, from_state_hash, to_state_hash, action):
+        """Records an edge (and its target node). Returns False if the edge already existed."""
+        with self._lock:
+            self._add_node(to_state_hash)
+            added = self._index_edge({"from": from_state_hash, "to": to_state_hash, "action": action})
+            if added:
+                self._dirty = True
+            if self._dirty and time.monotonic() - self._last_save >= self.save_interval:
+                self.save_workflow()
+            return added
+
+    # --- persistence ---
+
     def save_workflow(self):
-        with open(self.workflow_file, 'w') as f:
-            json.dump(self.graph, f, indent=4)
+        """Merges in what other processes saved, then atomically replaces the workflow file."""
+        with self._lock, self._file_lock:
+            on_disk = self._read_graph_file()
+            for state_hash, node in on_disk["nodes"].items():
+                ours = self.graph["nodes"].setdefault(state_hash, node)
+                self._index_state(state_hash, ours)
+                if "payload" not in ours and "payload" in node:
+                    ours["payload"] = node["payload"]
+            for edge in on_disk["edges"]:
+                self._index_edge(edge)
+
+            tmp_path = f"{self.workflow_file}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(self.graph, f, indent=4)
+            os.replace(tmp_path, self.workflow_file)
+            self._dirty = False
+            self._last_save = time.monotonic()
+
+    def flush(self):
+        """Writes any edges still waiting for the next debounced save."""
+        with self._lock:
+            if self._dirty:
+                self.save_workflow()
 
     @staticmethod
     def get_app_name_from_url(url: str) -> str:
@@ -44,47 +231,15 @@ class WorkflowMemory:
         """
         if hasattr(page_or_app, 'content'): # Playwright Page
             try:
-                html_content = page_or_app.content()
-                soup = BeautifulSoup(html_content, 'html.parser')
-
-                element_signatures = []
-
-                # --- FINAL FIX: Define stable structural regions to hash ---
-                # These are CSS selectors for containers that DO NOT change, like headers or sidebars.
-                # This makes the hash resilient to dynamic content in the main body.
-                # These selectors are specific to Amazon and can be adapted for other sites.
-                stable_region_selectors = [
-                    'div#nav-belt',      # Top-most navigation bar
-                    'div#nav-main',      # Main navigation bar below the top one
-                    'div#leftNav'        # The left-hand filter sidebar on search results
-                ]
-
-                # We only search for elements within these stable regions.
-                for selector in stable_region_selectors:
-                    region = soup.select_one(selector)
-                    if region:
-                        for el in region.find_all(['input', 'button', 'select', 'textarea']):
-                            if el.name == 'input' and el.get('type') == 'hidden':
-                                continue
-
-                            signature = {
-                                "tag": el.name,
-                                "id": el.get('id'),
-                                "name": el.get('name'),
-                                "type": el.get('type'),
-                                "value": el.get('value', '')
-                            }
-                            element_signatures.append(signature)
-
-                # If no stable regions were found (e.g., on a simple page), fall back to old method
-                if not element_signatures:
-                    for el in soup.find_all(['input', 'button', 'select', 'textarea']):
-                        signature = {"tag": el.name, "id": el.get('id'),"name": el.get('name'),"type": el.get('type'),"value": el.get('value', '')}
-                        element_signatures.append(signature)
-
-                sorted_signatures = sorted(element_signatures, key=lambda x: (x['tag'], x.get('id') or '', x.get('name') or ''))
-                signature_str = json.dumps(sorted_signatures, sort_keys=True)
-                return hashlib.md5(signature_str.encode('utf-8')).hexdigest()
+                with span("state_hash") as attrs:
+                    # Reuses the parse done for the UI summary when the page hasn't changed
+                    soup = PageSnapshot.for_page(page_or_app).soup
+
+                    # Only elements in the app's stable regions count, so dynamic
+                    # content in the main body doesn't create new states
+                    signatures = element_signatures(soup, self.fingerprint_config)
+                    attrs['elements'] = len(signatures)
+                    return self.match_known_state(exact_hash(signatures), signatures)
 
             except Exception as e:
                 return hashlib.md5(f"error_getting_content:{str(e)}".encode()).hexdigest()
@@ -93,6 +248,25 @@ class WorkflowMemory:
             ui_summary = get_ui_summary(page_or_app)
             return hashlib.md5(ui_summary.encode('utf-8')).hexdigest()
 
+    def match_known_state(self, state_hash, signatures):
+        """
+        Returns state_hash if it is already known, otherwise the nearest known
+        state within the fingerprint match threshold, otherwise state_hash.
+        """
+        if state_hash in self.graph["nodes"]:
+            return state_hash
+        value = simhash(signatures, self.fingerprint_config["simhash_bits"])
+        threshold = self.fingerprint_config["match_threshold"]
+        if threshold < 1.0:
+            nearest, _ = self._state_index.nearest(value, threshold)
+            if nearest:
+                return nearest
+        self._pending_simhashes[state_hash] = value
+        self._pending_simhashes.move_to_end(state_hash)
+        while len(self._pending_simhashes) > PENDING_SIMHASH_LIMIT:
+            self._pending_simhashes.popitem(last=False)
+        return state_hash
+
     def remember_state_and_action(self, page, from_state_hash, action, logger):
         to_state_hash = self.get_state_hash(page)
 
@@ -102,14 +276,25 @@ class WorkflowMemory:
 
         logger.info(f"Discovered and remembered new page state: {to_state_hash}")
 
-        new_edge = {"from": from_state_hash, "to": to_state_hash, "action": action}
-
-        if to_state_hash not in self.graph["nodes"]:
-            self.graph["nodes"][to_state_hash] = {"description": "State discovered during learning"}
+        if hasattr(page, 'url') and not self.graph["nodes"].get(to_state_hash, {}).get("payload"):
+            # Kept so validation can describe what changed when this state no longer matches
+            try:
+                ui_summary = get_ui_summary(PageSnapshot.for_page(page), logger)
+                self.set_node_payload(to_state_hash, {"url": page.url, "ui_summary": ui_summary})
+            except Exception as e:
+                logger.warning(f"Could not store a snapshot of state {to_state_hash[:8]}: {e}")
 
-        if new_edge not in self.graph['edges']:
-            self.graph['edges'].append(new_edge)
+        action = replayable_action(action)
+        if self.add_edge(from_state_hash, to_state_hash, action):
             logger.info(f"Remembered new workflow edge from {from_state_hash[:8]} to {to_state_hash[:8]}")
-            self.save_workflow()
         else:
             logger.info("Edge already exists in the workflow graph.")
+
+
+@atexit.register
+def _flush_open_memories():
+    for memory in list(_open_memories):
+        try:
+            memory.flush()
+        except Exception:
+            pass
@@ -0,0 +1,184 @@
+from collections import deque
+from autotester.core.page_snapshot import invalidate_snapshot
+from autotester.utils.page_settle import wait_for_page_settle
+from autotester.utils.tracing import span
+from autotester.utils.workflow_memory import edge_key
+
+
+class ReplayError(Exception):
+    """A learned action could not be replayed."""
+
+
+class StateMismatch(ReplayError):
+    """The page did not reach the state the learned edge leads to."""
+
+    def __init__(self, edge, actual_state_hash):
+        self.edge = edge
+        self.expected = edge['to']
+        self.actual = actual_state_hash
+        super().__init__(f"State mismatch after action {edge['action']}. Expected {self.expected} but got {actual_state_hash}.")
+
+
+# --- Graph search ---
+
+def shortest_path(memory, source, target):
+    """
+    Breadth-first search for the fewest-actions path from source to target.
+    Returns the list of edges to follow ([] if already there), or None if
+    target can't be reached.
+    """
+    if source == target:
+        return []
+    previous = {source: None}
+    queue = deque([source])
+    while queue:
+        state = queue.popleft()
+        for edge in memory.edges_from(state):
+            next_state = edge['to']
+            if next_state in previous:
+                continue
+            previous[next_state] = edge
+            if next_state == target:
+                path = []
+                while edge is not None:
+                    path.append(edge)
+                    edge = previous[edge['from']]
+                return path[::-1]
+            queue.append(next_state)
+    return None
+
+
+def _path_to_uncovered(memory, source, uncovered):
+    """Shortest path from source that ends by taking an edge still in `uncovered` (a set of edge ids)."""
+    previous = {source: None}
+    queue = deque([source])
+    while queue:
+        state = queue.popleft()
+        edges = memory.edges_from(state)
+        for edge in edges:
+            if id(edge) in uncovered:
+                path = [edge]
+                step = previous[state]
+                while step is not None:
+                    path.append(step)
+                    step = previous[step['from']]
+                return path[::-1]
+        for edge in edges:
+            if edge['to'] not in previous:
+                previous[edge['to']] = edge
+                queue.append(edge['to'])
+    return None
+
+
+def edge_cover_walks(memory, start="START"):
+    """
+    Plans runs that together take every edge reachable from `start` at least
+    once. Each run begins at `start` and greedily heads for the nearest edge
+    not yet taken; a new run starts only when none is reachable from where
+    the current one is. Returns a list of runs, each a list of edges.
+    """
+    # Edges are tracked by identity; the memory holds each distinct edge once
+    uncovered = set()
+    seen = {start}
+    queue = deque([start])
+    while queue:
+        for edge in memory.edges_from(queue.popleft()):
+            uncovered.add(id(edge))
+            if edge['to'] not in seen:
+                seen.add(edge['to'])
+                queue.append(edge['to'])
+
+    walks = []
+    while uncovered:
+        walk, state = [], start
+        while True:
+            path = _path_to_uncovered(memory, state, uncovered)
+            if path is None:
+                break
+            for edge in path:
+                uncovered.discard(id(edge))
+            walk.extend(path)
+            state = path[-1]['to']
+        if not walk:
+            break
+        walks.append(walk)
+    return walks
+
+
+# --- Execution ---
+
+class ReplayEngine:
+    """
+    Replays learned workflow edges on a live page without any model calls,
+    checking after each action that the page reached the expected state.
+    The page must be on the app's start URL (the START state) when created.
+    """
+
+    def __init__(self, memory, page, logger, start_url=None):
+        self.memory = memory
+        self.page = page
+        self.logger = logger
+        self.start_url = start_url or page.url
+        self.state = "START"
+        self.actions_taken = 0
+        self.settle_times_ms = []
+
+    def reset(self):
+        """Reloads the start URL, returning to the START state."""
+        self.logger.info(f"Restarting from {self.start_url}")
+        self.page.goto(self.start_url)
+        self.settle_times_ms.append(wait_for_page_settle(self.page, self.logger))
+        invalidate_snapshot(self.page)
+        self.state = "START"
+
+    def perform(self, edge):
+        """Executes one learned edge and verifies the resulting state."""
+        action = edge['action']
+        action_type = action.get('action')
+        if action_type != 'initial_load':
+            self.logger.info(f"--- Executing Step: {action} ---")
+            try:
+                with span("action", action=action_type, replay=True):
+                    if action_type == 'click':
+                        self.page.click(action.get('selector'), timeout=5000)
+                    elif action_type == 'fill':
+                        self.page.fill(action.get('selector'), action.get('value', ''), timeout=5000)
+                # Covers both navigations and in-place DOM updates
+                self.settle_times_ms.append(wait_for_page_settle(self.page, self.logger))
+            except Exception as e:
+                raise ReplayError(f"Could not execute action '{action}'. Error: {e}") from e
+            invalidate_snapshot(self.page)
+            self.actions_taken += 1
+
+        actual = self.memory.get_state_hash(self.page)
+        if actual != edge['to']:
+            raise StateMismatch(edge, actual)
+        self.logger.info(f"   State is correct: {actual[:8]}")
+        self.state = actual
+
+    def follow(self, edges):
+        for edge in edges:
+            if edge['from'] == "START" and self.state != "START":
+                self.reset()
+            self.perform(edge)
+
+    def go_to(self, target_state_hash):
+        """Takes the shortest learned path from the current state to the target."""
+        path = shortest_path(self.memory, self.state, target_state_hash)
+        if path is None and self.state != "START":
+            path = shortest_path(self.memory, "START", target_state_hash)
+            if path is not None:
+                self.reset()
+        if path is None:
+            raise ReplayError(f"No learned path leads to state {target_state_hash}.")
+        self.logger.info(f"Navigating to state {target_state_hash[:8]} in {len(path)} learned steps.")
+        self.follow(path)
+
+    def validate_all_edges(self):
+        """Replays every reachable edge at least once. Returns the number of edges covered."""
+        walks = edge_cover_walks(self.memory)
+        covered = len({edge_key(e['from'], e['to'], e['action']) for walk in walks for e in walk})
+        self.logger.info(f"Covering {covered} edges with {sum(len(w) for w in walks)} steps in {len(walks)} run(s).")
+        for walk in walks:
+            self.follow(walk)
+        return covered
@@ -2,14 +2,29 @@ import pytest
 import os
 import sys
 import logging
-import google.generativeai as genai
-from playwright.sync_api import sync_playwright
+import json
 
 # Add the 'src' directory to the Python path
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+# The benchmarks' local fixture site doubles as a test site
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../benchmarks')))
 
-from autotester.utils.env_loader import load_api_key, load_base_url
+from autotester.core.feature_parser import find_scenario, login_profile_for
+from autotester.core.llm_cache import CachedLLMClient
+from autotester.core.llm_client import get_llm_client
+from autotester.core.model_router import ModelRouter
+from autotester.core.scenario_index import get_scenario_index
+from autotester.utils.browser_pool import BrowserPool
+from autotester.core.step_runner import run_steps, StepExecutionError
+from autotester.utils.env_loader import (
+    load_api_key, load_base_url, load_llm_settings, load_llm_cache_settings, load_network_settings,
+    load_session_settings, load_trace_dir,
+)
 from autotester.utils.logger import get_logger
+from autotester.utils.network_rules import HAR_MODES, NetworkRules, har_dir_for, record_har, replay_hars
+from autotester.utils.page_settle import watch_page_activity
+from autotester.utils.session_store import SessionStore
+from autotester.utils.tracing import close_tracing, configure_tracing, format_summary, read_trace, set_trace_scenario, summarize
 
 # --- Pytest Command-Line Option ---
 def pytest_addoption(parser):
@@ -21,47 +36,282 @@ def pytest_addoption(parser):
         default=default_url,
         help="The starting URL for the application to be tested"
     )
+    parser.addoption(
+        "--headless",
+        action="store_true",
+        default=os.getenv("HEADLESS", "").lower() in ("1", "true", "yes"),
+        help="Run the browser without a window (also settable with HEADLESS=true)"
+    )
+    parser.addoption("--tags", action="store", default="", help="Comma-separated tags; run scenarios having any of them")
+    parser.addoption("--skip-tags", action="store", default="", help="Comma-separated tags; skip scenarios having any of them")
+    parser.addoption("--scenario", action="store", default=None, help="Glob matched against scenario names")
+    parser.addoption("--feature", action="store", default=None, help="Glob matched against feature file paths under features/")
+    parser.addoption("--har", action="store", default=None, choices=HAR_MODES,
+                     help="HAR recording/replay: 'auto' records while learning and replays while validating (default: HAR_MODE)")
+    parser.addoption("--block-resources", action="store", default=None,
+                     help="Comma-separated resource types to block, e.g. image,font,media (default: BLOCK_RESOURCE_TYPES)")
+    parser.addoption("--block-third-party", action="store_true", default=None,
+                     help="Block requests to other sites than --url, except ALLOWED_DOMAINS")
+    parser.addoption("--trace-dir", action="store", default=None,
+                     help="Write per-step timing spans as JSONL under this directory (default: TRACE_DIR)")
+    parser.addoption("--from-state", action="store", default=None,
+                     help="Learned state hash (or prefix) to replay to before running each scenario's steps")
+
+
+# --- Scenario Collection ---
+def pytest_generate_tests(metafunc):
+    """
+    Parametrizes every test taking (feature_path, scenario_name) from the shared
+    scenario index. Test ids are prefixed with the module's SCENARIO_ID_PREFIX.
+    """
+    if not {"feature_path", "scenario_name"} <= set(metafunc.fixturenames):
+        return
+
+    def split(value):
+        return [v.strip() for v in value.split(',') if v.strip()]
+
+    config = metafunc.config
+    entries = get_scenario_index().find(
+        tags=split(config.getoption("--tags")),
+        exclude_tags=split(config.getoption("--skip-tags")),
+        name=config.getoption("--scenario"),
+        file=config.getoption("--feature"),
+    )
+
+    prefix = getattr(metafunc.module, "SCENARIO_ID_PREFIX", "Run")
+    metafunc.parametrize(
+        "feature_path, scenario_name",
+        [pytest.param(e['path'], e['name'], id=f"{prefix}_{e['file']}::{e['name']}") for e in entries],
+    )
 
 # --- Pytest Fixtures ---
 
+def _model_client(provider, model, settings, cache_settings):
+    """The shared client for one model, behind the response cache unless it is off."""
+    live_client = None
+    if cache_settings['mode'] != 'replay':
+        api_key = load_api_key(provider)
+        live_client = get_llm_client(provider, model, api_key,
+                                     requests_per_minute=settings['requests_per_minute'],
+                                     max_concurrency=settings['max_concurrency'],
+                                     deadline=settings['deadline'])
+        if cache_settings['mode'] == 'passthrough':
+            return live_client
+
+    return CachedLLMClient(live_client, f"{provider}:{model}", **cache_settings)
+
 @pytest.fixture(scope="session")
 def client():
-    """Initializes the Gemini AI client once per test session."""
-    api_key = load_api_key('gemini')
-    genai.configure(api_key=api_key)
+    """
+    Initializes the shared, rate-limited AI client once per test session.
+    Defaults to 'gemini-flash-latest', which is optimized for speed.
+    With several LLM_MODELS, returns a ModelRouter that escalates from the fastest.
+    With LLM_CACHE_MODE=replay no API key or network is needed.
+    """
+    settings = load_llm_settings()
+    cache_settings = load_llm_cache_settings()
+    models = [(f"{provider}:{model}", _model_client(provider, model, settings, cache_settings))
+              for provider, model in settings['models']]
+    if len(models) == 1:
+        return models[0][1]
+    return ModelRouter(models)
 
-    # --- SPEED FIX 1 ---
-    # Using 'gemini-flash-latest', which is optimized for speed.
-    return genai.GenerativeModel('gemini-flash-latest')
+@pytest.fixture
+def start_state(request, feature_path, scenario_name):
+    """
+    The learned state a scenario starts from, so it can skip its setup steps:
+    --from-state, or a '@from-state:<hash>' tag on the scenario. None if neither is given.
+    """
+    explicit = request.config.getoption("--from-state")
+    if explicit:
+        return explicit
+    scenario = find_scenario(feature_path, scenario_name) or {}
+    for tag in scenario.get('tags', []):
+        if tag.startswith('@from-state:'):
+            return tag.split(':', 1)[1]
+    return None
 
 @pytest.fixture(scope="session")
 def logger():
     """Initializes the logger once per test session."""
     return get_logger()
 
+@pytest.fixture(scope="session", autouse=True)
+def tracing(request, logger):
+    """
+    Records timing spans for the session when --trace-dir / TRACE_DIR is set,
+    then writes a p50/p95 summary per scenario and phase next to the trace.
+    """
+    trace_dir = request.config.getoption("--trace-dir") or load_trace_dir()
+    path = configure_tracing(trace_dir, run_id=os.getenv("PYTEST_XDIST_TESTRUNUID"))
+    yield path
+    close_tracing()
+    if path and os.path.exists(path):
+        summary = summarize(read_trace([path]))
+        with open(f"{path[:-len('.jsonl')]}.summary.json", 'w', encoding='utf-8') as f:
+            json.dump(summary, f, indent=2)
+        logger.info(f"Timing trace written to {path}\n{format_summary(summary)}")
+
+@pytest.fixture(autouse=True)
+def trace_scenario(request):
+    """Tags every span recorded during a test with the test's id."""
+    set_trace_scenario(request.node.name)
+    yield
+    set_trace_scenario(None)
+
+@pytest.fixture(scope="session")
+def browser_pool(request):
+    """
+    Launches the browser once per test session (once per xdist worker)
+    instead of once per test.
+    """
+    pool = BrowserPool(headless=request.config.getoption("--headless"))
+    yield pool
+    pool.close()
+
+@pytest.fixture(scope="session")
+def fixture_site(browser_pool):
+    """
+    The benchmarks' local fixture site (see benchmarks/fixture_site.py), served
+    for the whole session. Tests using it are skipped if no browser can be launched.
+    """
+    from fixture_site import FixtureSite
+    try:
+        browser_pool.release(browser_pool.new_context())
+    except Exception as e:
+        pytest.skip(f"browser unavailable: {str(e).splitlines()[0]}")
+    with FixtureSite(app_filler=50) as site:
+        yield site
+
+@pytest.fixture
+def site_context(browser_pool, fixture_site):
+    """A fresh context from the shared browser, for tests against the fixture site."""
+    context = browser_pool.new_context(viewport={'width': 1280, 'height': 720})
+    yield context
+    browser_pool.release(context)
+
+@pytest.fixture(scope="session")
+def session_store():
+    """Saved login sessions, shared by all tests (and xdist workers)."""
+    return SessionStore(**load_session_settings())
+
+@pytest.fixture
+def login_profile(feature_path, scenario_name):
+    """The session profile this scenario logs in as (from its @login tag), or None."""
+    scenario = find_scenario(feature_path, scenario_name) or {}
+    return scenario.get('login_profile')
+
+@pytest.fixture(scope="session")
+def network_settings(request):
+    """Routing and HAR settings from the environment, overridden by command-line options."""
+    settings = load_network_settings()
+    if request.config.getoption("--har"):
+        settings["har_mode"] = request.config.getoption("--har")
+    if request.config.getoption("--block-resources") is not None:
+        settings["block_resource_types"] = [t.strip() for t in request.config.getoption("--block-resources").split(',') if t.strip()]
+    if request.config.getoption("--block-third-party"):
+        settings["block_third_party"] = True
+    return settings
+
+def _prepare_context(request, context, start_url, har_mode='off'):
+    """Installs HAR recording/replay and the request blocking rules on a new context."""
+    if not start_url:
+        return
+    settings = request.getfixturevalue("network_settings")
+    har_dir = har_dir_for(settings["har_dir"], start_url)
+    if har_mode == 'record':
+        record_har(context, har_dir, request.node.name)
+    elif har_mode == 'replay':
+        if not replay_hars(context, har_dir, offline=settings["har_offline"]):
+            request.getfixturevalue("logger").warning(f"No recorded HAR files in {har_dir}; using the live network.")
+    NetworkRules(
+        start_url,
+        block_resource_types=settings["block_resource_types"],
+        block_third_party=settings["block_third_party"],
+        allowed_domains=settings["allowed_domains"],
+        blocked_domains=settings["blocked_domains"],
+        first_party_domain=settings["first_party_domain"],
+    ).install(context)
+
+def _har_mode_for(request):
+    mode = request.getfixturevalue("network_settings")["har_mode"]
+    if mode == 'auto':
+        if request.node.get_closest_marker("learning"):
+            return 'record'
+        if request.node.get_closest_marker("validation"):
+            return 'replay'
+        return 'off'
+    return mode
+
+def _login_scenario_for(profile):
+    """The first indexed scenario whose @login tag provides `profile`."""
+    for entry in get_scenario_index().entries():
+        if login_profile_for(entry['tags']) == profile:
+            return find_scenario(entry['path'], entry['name'])
+    return None
+
+@pytest.fixture
+def session_state(request, feature_path, scenario_name, browser_pool, session_store, logger):
+    """
+    For scenarios starting 'Given the user is logged in [as "<profile>"]',
+    the saved storage state to open the page with. A missing or stale session
+    is recreated by running that profile's @login scenario first.
+    """
+    scenario = find_scenario(feature_path, scenario_name) or {}
+    profile = scenario.get('session')
+    if not profile:
+        return None
+
+    with session_store.lock(profile):
+        path = session_store.load(profile)
+        if path:
+            logger.info(f"Reusing saved login session '{profile}'.")
+            return path
+
+        login = _login_scenario_for(profile)
+        if login is None:
+            pytest.fail(f"Scenario needs login session '{profile}', but no scenario is tagged @login for it.")
+        logger.info(f"No fresh login session '{profile}'; logging in with '{login['name']}'.")
+
+        context = browser_pool.new_context()
+        try:
+            _prepare_context(request, context, request.config.getoption("--url"))
+            login_page = context.new_page()
+            watch_page_activity(login_page)
+            login_page.goto(request.config.getoption("--url"))
+            login_page.wait_for_load_state('networkidle')
+            run_steps(login_page, request.getfixturevalue("client"), [dict(s) for s in login['steps']], logger)
+            return session_store.save(context, profile)
+        except StepExecutionError as e:
+            pytest.fail(f"Automatic login for session '{profile}' failed: {e}")
+        finally:
+            browser_pool.release(context)
+
 @pytest.fixture
-def page(request):
+def page(request, browser_pool):
     """
-    Provides a Playwright page object for each test.
+    Provides a Playwright page object for each test, in its own isolated context.
+    Scenarios that need a login start from the saved session. Unneeded
+    requests are blocked and HARs recorded or replayed per the network settings.
     """
     start_url = request.config.getoption("--url")
 
-    with sync_playwright() as p:
-        # --- SPEED FIX 2 ---
-        # Changed headless=True and slow_mo=0 for maximum speed.
-        # Set headless=False if you still want to watch it.
-        browser = p.chromium.launch(headless=False, slow_mo=0)
-        # --- END OF FIX ---
+    context_options = {}
+    if "scenario_name" in request.fixturenames:
+        storage_state = request.getfixturevalue("session_state")
+        if storage_state:
+            context_options["storage_state"] = storage_state
 
-        context = browser.new_context()
-        page = context.new_page()
+    context = browser_pool.new_context(**context_options)
+    _prepare_context(request, context, start_url, _har_mode_for(request))
+    page = context.new_page()
+    watch_page_activity(page)
 
-        if start_url:
-            page.goto(start_url)
-            page.wait_for_load_state('networkidle')
+    if start_url:
+        page.goto(start_url)
+        page.wait_for_load_state('networkidle')
 
-        yield page
+    yield page
 
-        # Clean up
-        context.close()
-        browser.close()
\ No newline at end of file
+    # Clean up
+    browser_pool.release(context)
@@ -0,0 +1,89 @@
+import time
+import pytest
+from autotester.core.agent import forget_failed_action, resolve_without_llm, step_cache_key
+from autotester.utils.ai_memory import AIMemory
+
+
+@pytest.fixture
+def make_memory(tmp_path, monkeypatch):
+    def make(**kwargs):
+        # AIMemory is a singleton; start each one afresh on its own file
+        monkeypatch.setattr(AIMemory, '_instance', None)
+        return AIMemory(filepath=str(tmp_path / 'ai_memory.json'), **kwargs)
+    return make
+
+
+class FakePage:
+    """Only the selectors in `live` are on the page."""
+
+    def __init__(self, live):
+        self.url = 'http://shop/cart'
+        self.live = live
+
+    def evaluate(self, script, selectors):
+        return [{"count": 1, "visible": True, "enabled": True, "editable": True} if s in self.live
+                else {"count": 0, "visible": False, "enabled": False, "editable": False} for s in selectors]
+
+
+def _el(selector, text):
+    return {'tag': 'button', 'selector': selector, 'text': text, 'placeholder': '', 'value': ''}
+
+
+def test_least_recently_used_entries_are_evicted(make_memory):
+    memory = make_memory(max_entries=2)
+    memory.remember('u', 'a', '#a')
+    memory.remember('u', 'b', '#b')
+    assert memory.recall('u', 'a') == '#a'  # 'b' is now the least recently used
+    memory.remember('u', 'c', '#c')
+    assert memory.recall('u', 'b') is None
+    assert (memory.recall('u', 'a'), memory.recall('u', 'c')) == ('#a', '#c')
+
+
+def test_recall_order_survives_a_restart(make_memory):
+    memory = make_memory(max_entries=2)
+    memory.remember('u', 'a', '#a')
+    memory.remember('u', 'b', '#b')
+    memory.recall('u', 'a')
+
+    memory = make_memory(max_entries=2)
+    memory.remember('u', 'c', '#c')
+    assert memory.recall('u', 'b') is None and memory.recall('u', 'a') == '#a'
+
+
+def test_entries_expire_after_the_ttl(make_memory, monkeypatch):
+    memory = make_memory(ttl_seconds=60)
+    memory.remember('u', 'a', '#a')
+    assert memory.recall('u', 'a') == '#a'
+
+    later = time.time() + 61
+    monkeypatch.setattr(time, 'time', lambda: later)
+    assert memory.recall('u', 'a') is None
+    assert memory.make_key('u', 'a') not in memory.memory
+
+
+def test_failed_selectors_are_forgotten(make_memory, logger):
+    memory = make_memory()
+    elements = [_el('#checkout', 'Checkout'), _el('#pay', 'Pay now')]
+    step = {'action': 'click', 'target_name': 'Pay'}
+    key = step_cache_key('http://shop/cart', step, elements)
+
+    # A cached selector that failed to execute is dropped
+    memory.remember(*key[:2], '#pay', fingerprint=key[2])
+    forget_failed_action({'selector': '#pay', 'resolved_by': 'cache', 'cache_key': key}, memory)
+    assert memory.recall(*key[:2], fingerprint=key[2]) is None
+
+    # So is one that is no longer on the page
+    memory.remember(*key[:2], '#old-pay', fingerprint=key[2])
+    action = resolve_without_llm(FakePage({'#pay'}), elements, step, key, logger, memory)
+    assert action['resolved_by'] != 'cache'
+    assert memory.recall(*key[:2], fingerprint=key[2]) is None
+
+
+def test_cache_key_ignores_elements_unrelated_to_the_step():
+    step = {'action': 'click', 'target_name': 'Proceed to checkout'}
+    page = [_el('#checkout', 'Proceed to checkout')] + [_el(f'#nav{i}', f'Menu {i}') for i in range(5)]
+    with_ads = page + [_el(f'#ad-{i}', f'Deal of the day {i}') for i in range(3)]
+    assert step_cache_key('http://shop/cart#top', step, page) == step_cache_key('http://shop/cart', step, with_ads)
+
+    moved = [_el('#checkout-v2', 'Proceed to checkout')] + page[1:]
+    assert step_cache_key('http://shop/cart', step, page) != step_cache_key('http://shop/cart', step, moved)
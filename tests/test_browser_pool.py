@@ -0,0 +1,61 @@
+import pytest
+
+
+@pytest.fixture
+def pool(browser_pool, fixture_site):
+    # fixture_site skips these tests when no browser can be launched
+    return browser_pool
+
+
+def test_browser_is_reused_across_scenarios(pool):
+    first = pool.new_context()
+    browser = pool.browser
+    pool.release(first)
+
+    second = pool.new_context()
+    assert pool.browser is browser
+    assert first not in browser.contexts and second in browser.contexts
+    pool.release(second)
+
+
+def test_each_scenario_starts_with_a_clean_context(pool):
+    context = pool.new_context()
+    context.add_cookies([{"name": "session", "value": "abc", "url": "http://shop.test/"}])
+    assert context.cookies()
+    pool.release(context)
+
+    context = pool.new_context()
+    assert context.cookies() == []
+    pool.release(context)
+
+
+def test_closed_browser_is_relaunched(pool):
+    pool.browser.close()
+    context = pool.new_context()
+    assert pool.browser.is_connected()
+    pool.release(context)
+
+
+def test_failed_launch_stops_the_driver(monkeypatch):
+    from autotester.utils import browser_pool
+
+    class FakePlaywright:
+        stopped = False
+
+        def __init__(self):
+            self.chromium = self
+
+        def start(self):
+            return self
+
+        def launch(self, **options):
+            raise RuntimeError("Executable doesn't exist")
+
+        def stop(self):
+            FakePlaywright.stopped = True
+
+    monkeypatch.setattr(browser_pool, 'sync_playwright', FakePlaywright)
+    pool = browser_pool.BrowserPool()
+    with pytest.raises(RuntimeError):
+        pool.new_context()
+    assert FakePlaywright.stopped and pool._playwright is None
@@ -0,0 +1,36 @@
+from autotester.core.agent import collect_candidates, extract_interactive_elements, iter_interactive_elements
+from autotester.core.dom_extractor import PAGE_TIER, SECTION_TIER
+
+LISTING = """
+<div id="nav"><input name="search"><button id="go">Search</button></div>
+<section id="filters"><h2>Filters</h2><div>
+  <input name="min_price" placeholder="Min price"><button id="apply">Apply</button>
+</div></section>
+<div id="results">
+""" + ''.join(f'<a href="/item/{i}">Item {i}</a>' for i in range(500)) + "</div>"
+
+
+def test_stream_yields_section_first_then_the_rest(logger):
+    streamed = list(iter_interactive_elements(LISTING, logger, 'Filters'))
+    assert [e['selector'] for e in streamed[:2]] == ["[name='min_price']", '#apply']
+    assert {e['tier'] for e in streamed[:2]} == {SECTION_TIER}
+    assert streamed[2]['selector'] == "[name='search']" and streamed[2]['tier'] == PAGE_TIER
+
+    # Same elements as the full extraction, only reordered
+    full = extract_interactive_elements(LISTING, logger)
+    assert sorted(e['selector'] for e in streamed) == sorted(e['selector'] for e in full)
+
+
+def test_collect_stops_at_a_confident_local_match(logger):
+    stream = iter_interactive_elements(LISTING, logger, 'Filters')
+    step = {'action': 'fill', 'target_name': 'min price', 'value': '10'}
+    elements = collect_candidates(stream, [step], max_candidates=200)
+    assert [e['selector'] for e in elements] == ["[name='min_price']", '#apply']
+    assert stream.gi_frame is None  # closed, the listing was never read
+
+
+def test_collect_stops_at_the_budget(logger):
+    step = {'action': 'click', 'target_name': 'the shiny thing'}
+    elements = collect_candidates(iter_interactive_elements(LISTING, logger), [step], max_candidates=30)
+    assert len(elements) == 30
+    assert elements[0]['selector'] == "[name='search']"
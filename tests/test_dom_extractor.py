@@ -0,0 +1,91 @@
+import pytest
+from autotester.core.agent import extract_interactive_elements, step_cache_key
+from autotester.core.dom_extractor import (PAGE_TIER, extract_interactive_elements_in_page,
+                                           stream_interactive_elements_in_page)
+
+FIELDS = ('tag', 'selector', 'text', 'placeholder', 'value')
+
+FORM = """
+<form>
+  <button type="button">Add <b>to</b>
+      cart</button>
+  <input type="hidden" name="token" value="x">
+  <input name="qty" value="1" disabled>
+  <a href="#more" disabled>More  details</a>
+</form>
+"""
+
+
+# A button mentioning the section comes first; the heading should still win
+SECTIONS = """
+<section id="promo"><div><button id="promo-billing">Billing</button><input name="promo_code"></div></section>
+<section id="billing"><h2>Billing</h2><form><input name="card"><button id="pay">Pay</button></form></section>
+<fieldset id="shipping"><div><span>Ship</span><b>ping address</b></div><input name="street"></fieldset>
+"""
+
+SECTION_CASES = [("Billing", ["[name='card']", '#pay']), ("Shipping address", ["[name='street']"])]
+
+
+def _rows(elements):
+    return [tuple(el[f] for f in FIELDS) for el in elements]
+
+
+def test_soup_text_is_whitespace_collapsed_like_the_browser(logger):
+    elements = extract_interactive_elements(FORM, logger)
+    assert [(el['selector'], el['text']) for el in elements] == [
+        ('text="Add to cart"', 'Add to cart'),
+        ('text="More details"', 'More details'),
+    ]
+
+
+@pytest.mark.parametrize("section, selectors", SECTION_CASES)
+def test_soup_scopes_sections_by_heading_and_split_text(logger, section, selectors):
+    assert [el['selector'] for el in extract_interactive_elements(SECTIONS, logger, section_context=section)] == selectors
+
+
+@pytest.fixture
+def site(site_context, fixture_site):
+    return site_context.new_page(), fixture_site.base_url
+
+
+@pytest.mark.parametrize("path, section", [
+    ("/elements/300", None),
+    ("/elements/300", "Billing address"),
+    ("/app/results?q=phone", None),
+])
+def test_browser_engine_matches_soup(site, logger, path, section):
+    page, base_url = site
+    page.goto(base_url + path)
+
+    in_page = extract_interactive_elements_in_page(page, logger, section_context=section)
+    parsed = extract_interactive_elements(page.content(), logger, section_context=section)
+    assert in_page and _rows(in_page) == _rows(parsed)
+
+    step = {'action': 'click', 'target_name': 'Add to cart'}
+    assert step_cache_key(page.url, step, in_page) == step_cache_key(page.url, step, parsed)
+
+
+def test_browser_engine_skips_hidden_and_disabled_controls(site, logger):
+    page, _ = site
+    page.set_content(FORM + '<button id="gone" style="display:none">Gone</button>')
+    assert _rows(extract_interactive_elements_in_page(page, logger)) == _rows(extract_interactive_elements(FORM, logger))
+
+
+def test_stream_lists_the_section_first(site, logger):
+    page, base_url = site
+    page.goto(base_url + "/elements/300")
+    streamed = list(stream_interactive_elements_in_page(page, logger, section_context="Payment", chunk_size=40))
+    section = extract_interactive_elements_in_page(page, logger, section_context="Payment")
+
+    assert sorted(_rows(streamed[:len(section)])) == sorted(_rows(section))
+    assert {el['tier'] for el in streamed[len(section):]} <= {2, PAGE_TIER}
+    assert sorted(_rows(streamed)) == sorted(_rows(extract_interactive_elements_in_page(page, logger)))
+
+
+@pytest.mark.parametrize("section, selectors", SECTION_CASES)
+def test_both_engines_pick_the_same_section_root(site, logger, section, selectors):
+    page, _ = site
+    page.set_content(SECTIONS)
+    in_page = extract_interactive_elements_in_page(page, logger, section_context=section)
+    assert [el['selector'] for el in in_page] == selectors
+    assert _rows(in_page) == _rows(extract_interactive_elements(SECTIONS, logger, section_context=section))
@@ -0,0 +1,106 @@
+from autotester.core.feature_parser import compile_feature_file, compile_feature_text, login_profile_for, parse_feature_file_to_steps
+from autotester.core.scenario_index import ScenarioIndex
+
+FEATURE = '''@web
+Feature: Shop
+
+  Background:
+    Given I am under the "Login" section
+
+  @smoke
+  Scenario: Sign in
+    When I enter username as "bob"
+    And I click on "Sign In" button
+    Then I see "Welcome"
+    And I enter "x" into field with selector "#q"
+
+  Scenario Outline: Search for <term>
+    When I enter search as "<term>"
+    And I click on "Go"
+      """
+      note about <term>
+      """
+    Then I see "<result>"
+
+    @fast
+    Examples:
+      | term | result |
+      | cats | Cats!  |
+      | dogs | Dogs!  |
+'''
+
+
+def test_compiles_background_tags_and_outline_rows(tmp_path):
+    path = tmp_path / "shop.feature"
+    path.write_text(FEATURE, encoding='utf-8')
+
+    feature = compile_feature_file(str(path))
+    names = [s['name'] for s in feature['scenarios']]
+    assert names == ['Sign in', 'Search for cats', 'Search for dogs']
+
+    sign_in, cats, _ = feature['scenarios']
+    assert sign_in['tags'] == ['@web', '@smoke'] and sign_in['line'] == 8
+    assert [step['action'] for step in sign_in['steps']] == ['fill', 'click', 'wait', 'fill']
+    # Background section applies until the first wait
+    assert sign_in['steps'][0]['section'] == 'Login'
+    assert sign_in['steps'][3] == {'action': 'fill', 'selector': '#q', 'value': 'x', 'line': 12}
+
+    assert cats['tags'] == ['@web', '@fast'] and cats['example'] == {'term': 'cats', 'result': 'Cats!'}
+    assert cats['steps'][0]['value'] == 'cats'
+    assert cats['steps'][1]['doc_string'] == 'note about cats'
+    assert cats['steps'][2]['target_name'] == 'Cats!'
+
+
+def test_compiled_file_is_cached_until_it_changes(tmp_path):
+    path = tmp_path / "shop.feature"
+    path.write_text(FEATURE, encoding='utf-8')
+
+    first = compile_feature_file(str(path))
+    assert compile_feature_file(str(path)) is first
+    assert parse_feature_file_to_steps(str(path), 'Search for dogs')[0]['value'] == 'dogs'
+
+    path.write_text(FEATURE.replace('bob', 'alice') + '\n', encoding='utf-8')
+    assert parse_feature_file_to_steps(str(path), 'Sign in')[0]['value'] == 'alice'
+
+
+def test_scenario_index_filters_by_tag_name_and_file(tmp_path):
+    (tmp_path / "shop.feature").write_text(FEATURE, encoding='utf-8')
+    (tmp_path / "admin").mkdir()
+    (tmp_path / "admin" / "users.feature").write_text("Feature: Users\n  @admin\n  Scenario: Add user\n", encoding='utf-8')
+    index = ScenarioIndex(str(tmp_path))
+
+    assert len(index.entries()) == 4
+    assert [e['name'] for e in index.find(tags=['fast'])] == ['Search for cats', 'Search for dogs']
+    assert [e['name'] for e in index.find(exclude_tags=['@web'])] == ['Add user']
+    assert [e['name'] for e in index.find(name='Search for d*')] == ['Search for dogs']
+    assert [e['name'] for e in index.find(file='admin/*')] == ['Add user']
+    # Both globs are case-sensitive
+    assert index.find(file='Admin/*') == [] and index.find(name='search for d*') == []
+
+
+def test_session_preconditions_and_login_profiles():
+    feature = compile_feature_text('''Feature: Account
+  @login
+  Scenario: Log in
+    When I enter email as "a@b.c"
+
+  @login:admin
+  Scenario: Admin log in
+    When I enter email as "admin@b.c"
+
+  Scenario: Orders
+    Given the user is logged in
+    When I click on "Orders"
+
+  Scenario: Reports
+    Given the user is logged in as "admin"
+    When I click on "Reports"
+''')
+    log_in, admin, orders, reports = feature['scenarios']
+    assert (log_in['login_profile'], log_in['session']) == ('default', None)
+    assert admin['login_profile'] == 'admin'
+    assert (orders['session'], orders['login_profile']) == ('default', None)
+    assert reports['session'] == 'admin'
+    # The precondition is not an action step
+    assert [step['action'] for step in orders['steps']] == ['click']
+    assert login_profile_for(['@smoke']) is None
@@ -0,0 +1,64 @@
+import json
+from autotester.utils.journal_store import JournalStore
+
+
+def test_writes_are_appended_and_visible_to_other_writers(tmp_path):
+    path = str(tmp_path / "memory.json")
+    first = JournalStore(path)
+    second = JournalStore(path)
+
+    first.put("a", {"selector": "#a"})
+    second.put("b", {"selector": "#b"})
+    first.delete("a")
+    second.refresh()
+
+    assert dict(second.data) == {"b": {"selector": "#b"}}
+    # One header line plus one line per change; the snapshot is untouched
+    with open(first.journal_path) as f:
+        assert len(f.readlines()) == 4
+    assert not (tmp_path / "memory.json").exists()
+
+
+def test_compaction_folds_journal_into_snapshot(tmp_path):
+    path = str(tmp_path / "memory.json")
+    writer = JournalStore(path, compact_min_records=10)
+    reader = JournalStore(path)
+
+    for i in range(25):
+        writer.put(f"key{i % 5}", i)
+
+    with open(path) as f:
+        assert json.load(f)["key0"] in (10, 15, 20)
+    reader.refresh()
+    assert dict(reader.data) == {f"key{i}": 20 + i for i in range(5)}
+    assert dict(JournalStore(path).data) == dict(reader.data)
+
+
+def test_reads_legacy_json_file(tmp_path):
+    path = tmp_path / "memory.json"
+    path.write_text(json.dumps({"http://x::login": "#login"}, indent=4))
+    assert JournalStore(str(path)).data["http://x::login"] == "#login"
+
+
+def test_delete_sees_keys_other_writers_added(tmp_path):
+    path = str(tmp_path / "memory.json")
+    first = JournalStore(path)
+    second = JournalStore(path)
+
+    second.put("a", 1)
+    first.delete("a")  # no refresh() in between
+    second.refresh()
+    assert dict(second.data) == {}
+
+
+def test_touch_order_survives_reopening(tmp_path):
+    path = str(tmp_path / "memory.json")
+    store = JournalStore(path)
+    for key in ("a", "b", "c"):
+        store.put(key, 1)
+    store.touch("a")
+    store.touch("missing")
+    assert list(JournalStore(path).data) == ["b", "c", "a"]
+
+    store.compact()
+    assert list(JournalStore(path).data) == ["b", "c", "a"]
@@ -0,0 +1,48 @@
+import pytest
+from autotester.core.llm_cache import CachedLLMClient, LLMCacheMiss
+
+
+class EchoClient:
+    def __init__(self):
+        self.calls = 0
+
+    def complete(self, prompt, deadline=None):
+        self.calls += 1
+        return f"response {self.calls} to {prompt}"
+
+
+def test_record_then_replay_offline(tmp_path):
+    live = EchoClient()
+    recorder = CachedLLMClient(live, 'stub:model', cache_dir=str(tmp_path), mode='record')
+    recorded = recorder.complete("click Sign In")
+
+    replayer = CachedLLMClient(None, 'stub:model', cache_dir=str(tmp_path), mode='replay')
+    assert replayer.complete("click Sign In") == recorded
+    assert live.calls == 1
+
+    with pytest.raises(LLMCacheMiss):
+        replayer.complete("a prompt that was never recorded")
+    # Responses are namespaced per provider/model
+    with pytest.raises(LLMCacheMiss):
+        CachedLLMClient(None, 'other:model', cache_dir=str(tmp_path), mode='replay').complete("click Sign In")
+
+
+def test_passthrough_skips_cache_and_eviction_bounds_size(tmp_path):
+    live = EchoClient()
+    CachedLLMClient(live, 'stub:model', cache_dir=str(tmp_path), mode='passthrough').complete("hello")
+    assert not list(tmp_path.rglob('*.json.gz'))
+
+    recorder = CachedLLMClient(live, 'stub:model', cache_dir=str(tmp_path), mode='record', max_bytes=2000)
+    for i in range(50):
+        recorder.complete(f"prompt {i} " + "x" * 200)
+    assert sum(p.stat().st_size for p in tmp_path.rglob('*.json.gz')) <= 2000
+
+
+def test_overwriting_an_entry_does_not_grow_the_tracked_size(tmp_path):
+    cache = CachedLLMClient(EchoClient(), 'stub:model', cache_dir=str(tmp_path), mode='record')
+    cache.store("prompt", "first")
+    cache.store("other", "answer")
+    for _ in range(5):
+        cache.store("prompt", "second")
+    assert cache._size == sum(p.stat().st_size for p in tmp_path.rglob('*.json.gz'))
+    assert cache.lookup("prompt") == "second"
@@ -0,0 +1,185 @@
+import asyncio
+import threading
+import time
+import pytest
+from types import SimpleNamespace
+from autotester.core import llm_client
+from autotester.core.agent import get_llm_response_text
+from autotester.core.llm_client import LLMClient, LLMError, LLMProvider, LLMTimeoutError, TokenBucket, get_llm_client
+
+
+class RateLimited(Exception):
+    status_code = 429
+
+
+class StubProvider(LLMProvider):
+    """A local provider that fails a set number of times, then echoes the prompt."""
+
+    name = 'stub'
+
+    def __init__(self, failures=0, error=RateLimited, latency=0.0):
+        self.failures = failures
+        self.error = error
+        self.latency = latency
+        self.calls = 0
+        self.active = 0
+        self.peak_active = 0
+        self._lock = threading.Lock()
+
+    def _enter(self):
+        with self._lock:
+            self.calls += 1
+            self.active += 1
+            self.peak_active = max(self.peak_active, self.active)
+            return self.calls <= self.failures
+
+    def _exit(self):
+        with self._lock:
+            self.active -= 1
+
+    def generate(self, prompt, timeout):
+        should_fail = self._enter()
+        try:
+            time.sleep(self.latency)
+            if should_fail:
+                raise self.error("stub failure")
+            return f"echo: {prompt}"
+        finally:
+            self._exit()
+
+    async def agenerate(self, prompt, timeout):
+        should_fail = self._enter()
+        try:
+            await asyncio.sleep(self.latency)
+            if should_fail:
+                raise self.error("stub failure")
+            return f"echo: {prompt}"
+        finally:
+            self._exit()
+
+
+def run_async(coroutine):
+    """
+    Runs a coroutine on a fresh event loop in a worker thread, so it works even
+    while a Playwright sync loop is running on the main thread.
+    """
+    outcome = {}
+
+    def target():
+        try:
+            outcome['result'] = asyncio.run(coroutine)
+        except BaseException as e:
+            outcome['error'] = e
+
+    thread = threading.Thread(target=target)
+    thread.start()
+    thread.join()
+    if 'error' in outcome:
+        raise outcome['error']
+    return outcome['result']
+
+
+def _client(provider, **options):
+    options.setdefault('requests_per_minute', 60000)
+    options.setdefault('burst', 100)
+    options.setdefault('base_delay', 0.001)
+    options.setdefault('max_delay', 0.01)
+    return LLMClient(provider, **options)
+
+
+def test_retries_transient_errors_then_succeeds():
+    provider = StubProvider(failures=2)
+    assert _client(provider).complete("hi") == "echo: hi"
+    assert provider.calls == 3
+
+    provider = StubProvider(failures=2)
+    assert run_async(_client(provider).acomplete("hi")) == "echo: hi"
+    assert provider.calls == 3
+
+
+def test_does_not_retry_permanent_errors_or_exhausted_budget():
+    provider = StubProvider(failures=1, error=ValueError)
+    with pytest.raises(LLMError):
+        _client(provider).complete("hi")
+    assert provider.calls == 1
+
+    provider = StubProvider(failures=10)
+    with pytest.raises(LLMError):
+        _client(provider, max_retries=2).complete("hi")
+    assert provider.calls == 3
+
+
+def test_deadline_bounds_slow_calls():
+    provider = StubProvider(latency=1.0)
+    started = time.monotonic()
+    with pytest.raises(LLMTimeoutError):
+        run_async(_client(provider, attempt_timeout=0.05, max_retries=0).acomplete("hi", deadline=0.2))
+    assert time.monotonic() - started < 0.5
+
+
+def test_concurrency_cap_is_respected():
+    provider = StubProvider(latency=0.02)
+    client = _client(provider, max_concurrency=2)
+
+    async def run_all():
+        return await asyncio.gather(*(client.acomplete(str(i)) for i in range(8)))
+
+    assert len(run_async(run_all())) == 8
+    assert provider.peak_active == 2
+
+    provider = StubProvider(latency=0.02)
+    client = _client(provider, max_concurrency=2)
+    threads = [threading.Thread(target=client.complete, args=(str(i),)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert provider.peak_active == 2
+
+
+def test_token_bucket_limits_rate():
+    bucket = TokenBucket(rate=50, capacity=1)
+    started = time.monotonic()
+    for _ in range(6):
+        bucket.acquire()
+    # First token is free, the other five arrive at 50/s
+    assert time.monotonic() - started >= 0.09
+
+    with pytest.raises(LLMTimeoutError):
+        TokenBucket(rate=0.1, capacity=0).acquire(deadline=time.monotonic() + 0.01)
+
+
+def test_rate_and_burst_are_split_between_workers(monkeypatch):
+    monkeypatch.setattr(llm_client, '_clients', {})
+    monkeypatch.setitem(llm_client.PROVIDERS, 'stub', lambda model, api_key: StubProvider())
+    monkeypatch.setenv("PYTEST_XDIST_WORKER_COUNT", "4")
+    client = get_llm_client('stub', 'm1', None, requests_per_minute=120, burst=10)
+    assert (client.bucket.rate, client.bucket.capacity) == (0.5, 2)
+
+    # Never below one token, or no worker could ever call
+    monkeypatch.setenv("PYTEST_XDIST_WORKER_COUNT", "8")
+    assert get_llm_client('stub', 'm2', None).bucket.capacity == 1
+
+
+class FakeCompletions:
+    def __init__(self):
+        self.models = []
+
+    def create(self, model, messages, timeout=None):
+        self.models.append(model)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content="ok"))])
+
+
+def test_bare_openai_client_uses_the_configured_model(monkeypatch):
+    completions = FakeCompletions()
+    bare_client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    monkeypatch.setenv("LLM_PROVIDER", "openai")
+    monkeypatch.setenv("LLM_MODEL", "gpt-4o-mini")
+    monkeypatch.delenv("LLM_MODELS", raising=False)
+    assert get_llm_response_text(bare_client, "hi") == "ok"
+    assert completions.models == ["gpt-4o-mini"]
+
+    monkeypatch.setenv("LLM_PROVIDER", "gemini")
+    with pytest.raises(LLMError):
+        get_llm_response_text(bare_client, "hi")
+
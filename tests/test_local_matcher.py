@@ -0,0 +1,34 @@
+from autotester.core.agent import extract_interactive_elements, resolve_step_locally
+
+LOGIN_FORM = """
+<form>
+  <input name="email" placeholder="Email address">
+  <input id="password" type="password">
+  <a href="/search">Search</a>
+  <a href="/tips">Search tips and tricks</a>
+  <button>Sign In</button>
+  <input name="quantity"><input name="quantity">
+</form>
+"""
+
+
+def _resolve(step, logger):
+    elements = extract_interactive_elements(LOGIN_FORM, logger)
+    return resolve_step_locally(elements, step)
+
+
+def test_exact_match_on_name_placeholder_and_text(logger):
+    assert _resolve({'action': 'fill', 'target_name': 'email field', 'value': 'a@b.c'}, logger) == \
+        ({'action': 'fill', 'selector': "[name='email']", 'value': 'a@b.c'}, 'exact')
+    assert _resolve({'action': 'fill', 'target_name': "[name='email']", 'value': 'x'}, logger)[1] == 'exact'
+    assert _resolve({'action': 'click', 'target_name': 'Search'}, logger)[0]['selector'] == 'text="Search"'
+
+
+def test_fuzzy_match_and_llm_fallback(logger):
+    action, tier = _resolve({'action': 'click', 'target_name': 'Signin'}, logger)
+    assert (action['selector'], tier) == ('text="Sign In"', 'fuzzy')
+
+    # Ambiguous or duplicated targets must be left to the LLM
+    assert _resolve({'action': 'click', 'target_name': 'tips'}, logger) == (None, None)
+    assert _resolve({'action': 'fill', 'target_name': 'quantity', 'value': '1'}, logger) == (None, None)
+    assert _resolve({'action': 'click_first_in_list', 'list_name': 'results'}, logger) == (None, None)
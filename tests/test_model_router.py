@@ -0,0 +1,102 @@
+import pytest
+from autotester.core.agent import get_action_from_llm, parse_json_response
+from autotester.core.model_router import MIN_SAMPLES, PROBE_INTERVAL, STATS_WINDOW, ModelRouter, ModelStats
+
+
+class ScriptedClient:
+    """Answers every prompt with the same text (or raises it, if it is an exception)."""
+
+    def __init__(self, answer):
+        self.answer = answer
+        self.calls = 0
+
+    def complete(self, prompt, deadline=None):
+        self.calls += 1
+        if isinstance(self.answer, Exception):
+            raise self.answer
+        return self.answer
+
+
+def _action(selector):
+    return f'```json\n{{"action": "click", "selector": "{selector}"}}\n```'
+
+
+@pytest.fixture
+def stats(tmp_path):
+    return ModelStats(str(tmp_path / 'model_stats.json'))
+
+
+def _validate(action):
+    return None if action['selector'] == '#ok' else "wrong element"
+
+
+def test_escalates_until_an_answer_validates(stats, logger):
+    fast, broken, strong = ScriptedClient(_action('#bad')), ScriptedClient(TimeoutError("slow")), ScriptedClient(_action('#ok'))
+    router = ModelRouter([('fast', fast), ('broken', broken), ('strong', strong)], stats)
+
+    action = get_action_from_llm(router, 'prompt', logger, validate=_validate, app='shop')
+    assert (action['selector'], action['model']) == ('#ok', 'strong')
+    assert (fast.calls, broken.calls, strong.calls) == (1, 1, 1)
+    assert stats.get('shop', 'fast')['successes'] == 0 and stats.get('shop', 'strong')['successes'] == 1
+
+    # The first valid answer stops the escalation
+    router.models[0] = ('fast', ScriptedClient(_action('#ok')))
+    assert get_action_from_llm(router, 'prompt', logger, validate=_validate, app='shop')['model'] == 'fast'
+    assert strong.calls == 1
+
+
+def test_falls_back_to_the_last_answer(stats, logger):
+    router = ModelRouter([('fast', ScriptedClient(_action('#bad'))), ('strong', ScriptedClient(_action('#worse')))], stats)
+    action, model = router.route(lambda c: parse_json_response(c.complete('p'), logger), _validate, logger)
+    assert (action['selector'], model) == ('#worse', 'strong')
+    assert router.route(lambda c: None, _validate, logger) == (None, None)
+
+
+def test_skips_unreliable_models_per_app(stats, logger):
+    fast, strong = ScriptedClient(_action('#bad')), ScriptedClient(_action('#ok'))
+    router = ModelRouter([('fast', fast), ('strong', strong)], stats)
+    for _ in range(MIN_SAMPLES):
+        get_action_from_llm(router, 'prompt', logger, validate=_validate, app='shop')
+    assert fast.calls == MIN_SAMPLES
+
+    assert [name for name, _ in router.order_for('shop')] == ['strong']
+    assert [name for name, _ in router.order_for('blog')] == ['fast', 'strong']
+
+    # Routing decisions survive a restart
+    assert ModelStats(stats.filepath).success_rate('shop', 'fast') == 0.0
+
+
+def test_skipped_models_are_probed_and_can_recover(stats, logger):
+    fast, strong = ScriptedClient(_action('#bad')), ScriptedClient(_action('#ok'))
+    router = ModelRouter([('fast', fast), ('strong', strong)], stats)
+    for _ in range(PROBE_INTERVAL):
+        get_action_from_llm(router, 'prompt', logger, validate=_validate, app='shop')
+    assert fast.calls == MIN_SAMPLES + 1  # skipped after MIN_SAMPLES, probed on the PROBE_INTERVAL-th prompt
+
+    # A model that passes a probe gets its place back
+    fast.answer = _action('#ok')
+    for _ in range(PROBE_INTERVAL):
+        get_action_from_llm(router, 'prompt', logger, validate=_validate, app='shop')
+    assert [name for name, _ in router.order_for('shop')] == ['fast', 'strong']
+    assert stats.get('shop', 'fast') is None
+
+
+def test_success_rate_follows_recent_answers(stats):
+    for _ in range(STATS_WINDOW - 1):
+        stats.record('shop', 'fast', 100, False)
+    stats.record('shop', 'fast', 100, True)
+    for _ in range(STATS_WINDOW // 2):
+        stats.record('shop', 'fast', 100, True)
+    assert stats.success_rate('shop', 'fast') > 0.5
+
+
+def test_measured_models_are_tried_fastest_first(stats):
+    router = ModelRouter([('lite', ScriptedClient('')), ('flash', ScriptedClient('')), ('pro', ScriptedClient(''))], stats)
+    for _ in range(MIN_SAMPLES):
+        stats.record('shop', 'lite', 900, True)
+    assert [name for name, _ in router.order_for('shop')] == ['lite', 'flash', 'pro']  # 'flash' not measured yet
+
+    for _ in range(MIN_SAMPLES):
+        stats.record('shop', 'flash', 300, True)
+        stats.record('shop', 'pro', 100, True)
+    assert [name for name, _ in router.order_for('shop')] == ['flash', 'lite', 'pro']
@@ -0,0 +1,60 @@
+from autotester.utils.network_rules import NetworkRules, har_dir_for, har_name_for, replay_hars, site_domain
+
+
+def test_blocks_configured_resource_types_but_never_documents():
+    rules = NetworkRules("https://www.amazon.in/", block_resource_types=["image", "font"])
+    assert rules.should_block("https://www.amazon.in/logo.png", "image")
+    assert not rules.should_block("https://www.amazon.in/app.js", "script")
+    assert not rules.should_block("https://www.amazon.in/", "document")
+
+
+def test_third_party_blocking_keeps_site_and_allowed_domains():
+    rules = NetworkRules("https://www.amazon.in/", block_third_party=True, allowed_domains=["media-amazon.com"])
+    assert not rules.should_block("https://fls-eu.amazon.in/beacon", "xhr")
+    assert not rules.should_block("https://m.media-amazon.com/app.js", "script")
+    assert rules.should_block("https://www.google-analytics.com/collect", "xhr")
+    assert not rules.should_block("data:image/png;base64,xyz", "script")
+
+
+def test_blocked_domains_match_subdomains():
+    rules = NetworkRules("http://localhost:8080/", blocked_domains=["doubleclick.net"])
+    assert rules.should_block("https://ad.doubleclick.net/x", "script")
+    assert not rules.should_block("https://notdoubleclick.net/x", "script")
+    assert rules.active
+    assert not NetworkRules("http://localhost:8080/").active
+
+
+def test_har_paths_are_per_site_and_per_test(tmp_path):
+    assert har_dir_for("hars", "http://localhost:8080/shop").endswith("localhost_8080")
+    assert har_name_for("test_learn[Learn_a.feature::Log in]") == "test_learn_Learn_a.feature_Log_in.har"
+
+
+def test_replay_without_recordings_leaves_the_network_alone(tmp_path):
+    class Context:
+        routes = []
+
+        def route(self, *args):
+            self.routes.append(args)
+
+    context = Context()
+    assert replay_hars(context, str(tmp_path), offline=True) == 0
+    assert context.routes == []
+
+
+def test_site_domain_keeps_multi_part_suffixes_and_addresses():
+    assert site_domain("www.amazon.in") == "amazon.in"
+    assert site_domain("www.amazon.co.uk") == "amazon.co.uk"
+    assert site_domain("shop.example.com.au") == "example.com.au"
+    assert site_domain("192.168.0.10") == "192.168.0.10"
+    assert site_domain("[::1]") == "[::1]"
+    assert site_domain("localhost") == "localhost"
+
+
+def test_first_party_domain_can_be_configured():
+    rules = NetworkRules("http://192.168.0.10:8080/", block_third_party=True)
+    assert not rules.should_block("http://192.168.0.10:8080/api", "xhr")
+    assert rules.should_block("http://10.0.0.10/api", "xhr")
+
+    rules = NetworkRules("https://shop.internal.corp/", block_third_party=True, first_party_domain="corp")
+    assert not rules.should_block("https://static.corp/app.js", "script")
+    assert rules.should_block("https://cdn.example.com/app.js", "script")
@@ -0,0 +1,104 @@
+import time
+import pytest
+from autotester.utils.page_settle import DOM_QUIET_JS, NetworkActivityTracker, wait_for_page_settle, watch_page_activity
+
+
+class FakeRequest:
+    def __init__(self, url, resource_type='fetch'):
+        self.url = url
+        self.resource_type = resource_type
+
+
+class FakePage:
+    """Collects event handlers; the DOM is always quiet."""
+
+    def __init__(self):
+        self.handlers = {}
+        self.evaluations = []
+
+    def on(self, event, handler):
+        self.handlers[event] = handler
+
+    def emit(self, event, request):
+        self.handlers[event](request)
+
+    def evaluate(self, script, arg):
+        self.evaluations.append(arg)
+        return True
+
+    def wait_for_timeout(self, ms):
+        time.sleep(ms / 1000.0)
+
+
+def test_tracker_counts_in_flight_requests():
+    page = FakePage()
+    tracker = NetworkActivityTracker(page, ignored_urls=['*/longpoll*'])
+    api = FakeRequest('http://shop/api/cart')
+    page.emit('request', api)
+    page.emit('request', FakeRequest('http://shop/longpoll?id=1'))
+    page.emit('request', FakeRequest('ws://shop/live', 'websocket'))
+    assert tracker.pending() == [api] and tracker.quiet_for() == 0.0
+
+    page.emit('requestfinished', api)
+    assert tracker.pending() == []
+    assert tracker.quiet_for() >= 0.0
+
+
+def test_long_running_requests_stop_counting():
+    page = FakePage()
+    tracker = NetworkActivityTracker(page, max_request_ms=50)
+    page.emit('request', FakeRequest('http://shop/poll'))
+    assert tracker.quiet_for() == 0.0
+    time.sleep(0.06)
+    assert tracker.pending() == [] and tracker.quiet_for() > 0.0
+
+    # Without a limit the request holds the page busy
+    tracker = NetworkActivityTracker(page)
+    page.emit('request', FakeRequest('http://shop/poll'))
+    time.sleep(0.06)
+    assert tracker.quiet_for() == 0.0
+
+
+def test_zero_quiet_time_is_honoured(monkeypatch):
+    monkeypatch.setenv("SETTLE_QUIET_MS", "300")
+    page = FakePage()
+    assert wait_for_page_settle(page, quiet_ms=0) < 300
+    assert page.evaluations[0]['quietMs'] == 0
+    assert wait_for_page_settle(FakePage(), quiet_ms=0, timeout_ms=0) == pytest.approx(0, abs=5)
+
+
+def _open(site_context, fixture_site):
+    page = site_context.new_page()
+    watch_page_activity(page)
+    page.goto(f"{fixture_site.base_url}/elements/50")
+    return page
+
+
+def test_dom_quiet_script_waits_for_mutations_to_stop(site_context, fixture_site):
+    page = _open(site_context, fixture_site)
+    assert page.evaluate(DOM_QUIET_JS, {"quietMs": 100, "maxMs": 2000}) is True
+
+    page.evaluate("() => { window.ticker = setInterval(() => document.body.append('.'), 20); }")
+    assert page.evaluate(DOM_QUIET_JS, {"quietMs": 100, "maxMs": 500}) is False
+    page.evaluate("() => clearInterval(window.ticker)")
+    page.close()
+
+
+def test_long_poll_does_not_hold_the_page(site_context, fixture_site, monkeypatch):
+    monkeypatch.setenv("SETTLE_MAX_REQUEST_MS", "300")
+    page = _open(site_context, fixture_site)
+    page.evaluate("() => { fetch('/slow/5000'); }")
+    started = time.monotonic()
+    wait_for_page_settle(page, quiet_ms=100, timeout_ms=4000)
+    assert time.monotonic() - started < 2
+    page.close()
+
+    # Listed URLs never count, however young
+    monkeypatch.setenv("SETTLE_MAX_REQUEST_MS", "0")
+    monkeypatch.setenv("SETTLE_IGNORE_URLS", "*/slow/*")
+    page = _open(site_context, fixture_site)
+    page.evaluate("() => { fetch('/slow/5000'); }")
+    started = time.monotonic()
+    wait_for_page_settle(page, quiet_ms=100, timeout_ms=4000)
+    assert time.monotonic() - started < 1
+    page.close()
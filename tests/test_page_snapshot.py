@@ -0,0 +1,66 @@
+from autotester.core import page_snapshot
+from autotester.core.page_snapshot import PageSnapshot, as_soup, invalidate_snapshot
+
+
+class FakePage:
+    """Counts content() calls; the HTML can be swapped to simulate DOM changes."""
+
+    def __init__(self, html, url='http://shop/home'):
+        self.html = html
+        self.url = url
+        self.content_calls = 0
+
+    def content(self):
+        self.content_calls += 1
+        return self.html
+
+
+def test_snapshot_is_reused_while_the_url_is_unchanged():
+    page = FakePage("<button id='a'>A</button>")
+    first = PageSnapshot.for_page(page)
+    assert PageSnapshot.for_page(page) is first
+    assert page.content_calls == 1
+
+    # Pages are tracked separately
+    other = FakePage("<button id='b'>B</button>")
+    assert PageSnapshot.for_page(other) is not first
+
+
+def test_navigation_and_invalidation_recapture_the_page():
+    page = FakePage("<button id='a'>A</button>")
+    first = PageSnapshot.for_page(page)
+
+    page.url = 'http://shop/cart'
+    page.html = "<button id='b'>B</button>"
+    second = PageSnapshot.for_page(page)
+    assert second is not first and second.url == 'http://shop/cart'
+    assert second.soup.find(id='b') is not None
+
+    # Same URL, but the DOM changed after an action
+    page.html = "<button id='c'>C</button>"
+    invalidate_snapshot(page)
+    third = PageSnapshot.for_page(page)
+    assert third is not second and third.soup.find(id='c') is not None
+    assert page.content_calls == 3
+
+    invalidate_snapshot(FakePage(""))  # never captured: nothing to drop
+
+
+def test_soup_is_parsed_once_and_only_when_needed(monkeypatch):
+    parses = []
+    real = page_snapshot.BeautifulSoup
+
+    def counting_soup(*args, **kwargs):
+        parses.append(args[0])
+        return real(*args, **kwargs)
+
+    monkeypatch.setattr(page_snapshot, 'BeautifulSoup', counting_soup)
+    snapshot = PageSnapshot.for_page(FakePage("<section><h2>Billing</h2><input name='zip'></section>"))
+    assert parses == []
+
+    soup = snapshot.soup
+    assert snapshot.soup is soup and as_soup(snapshot) is soup
+    text_tag, container = snapshot.section_container('Billing')
+    assert (text_tag.name, container.name) == ('h2', 'section')
+    assert snapshot.section_container('Billing')[1] is container
+    assert len(parses) == 1
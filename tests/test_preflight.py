@@ -0,0 +1,109 @@
+from autotester.core.agent import get_next_action_for_step, preflight_actions
+from autotester.core.model_router import ModelRouter, ModelStats
+
+PAGE = """
+<form>
+  <input name="first_name" placeholder="First name">
+  <input name="last_name" placeholder="Last name">
+  <button id="save">Save</button>
+</form>
+"""
+
+
+class FakePage:
+    """Serves fixed HTML and answers preflight evaluations from a table of selector results."""
+
+    def __init__(self, results):
+        self.url = 'http://shop/profile'
+        self.results = results
+        self.evaluations = []
+
+    def content(self):
+        return PAGE
+
+    def evaluate(self, script, selectors):
+        self.evaluations.append(list(selectors))
+        missing = {"count": 0, "visible": False, "enabled": False, "editable": False}
+        return [dict(self.results.get(s, missing)) for s in selectors]
+
+
+class ScriptedClient:
+    def __init__(self, *selectors):
+        self.selectors = list(selectors)
+        self.prompts = []
+
+    def complete(self, prompt, deadline=None):
+        self.prompts.append(prompt)
+        return f'```json\n{{"action": "fill", "selector": "{self.selectors.pop(0)}", "value": "Ada"}}\n```'
+
+
+class NoMemory:
+    def recall(self, *args, **kwargs):
+        return None
+
+    def forget(self, *args, **kwargs):
+        pass
+
+
+USABLE = {"count": 1, "visible": True, "enabled": True, "editable": True}
+
+
+def test_problems_are_reported_per_action():
+    page = FakePage({
+        "#save": dict(USABLE, editable=False),
+        "[name='first_name']": USABLE,
+        ".field": dict(USABLE, count=2),
+        "#hidden": dict(USABLE, visible=False),
+    })
+    actions = [{"action": "click", "selector": "#save"}, {"action": "fill", "selector": "#save"},
+               {"action": "fill", "selector": "[name='first_name']"}, {"action": "click", "selector": ".field"},
+               {"action": "click", "selector": "#hidden"}, {"action": "click", "selector": "#gone"}]
+    assert preflight_actions(page, actions) == [
+        None, "selector '#save' cannot be filled", None, "selector '.field' matches 2 elements",
+        "selector '#hidden' is not visible", "selector '#gone' matches 0 elements",
+    ]
+    assert len(page.evaluations) == 1  # one round trip for all of them
+
+
+def test_list_clicks_accept_several_matches_and_check_the_first():
+    page = FakePage({".result a": dict(USABLE, count=3), ".disabled a": dict(USABLE, count=2, enabled=False)})
+    list_step = {"action": "click_first_in_list", "list_name": "results"}
+    click_step = {"action": "click", "target_name": "result"}
+    actions = [{"action": "click", "selector": ".result a"}, {"action": "click", "selector": ".disabled a"},
+               {"action": "click", "selector": ".result a"}, {"action": "click", "selector": "#gone"}]
+    assert preflight_actions(page, actions, [list_step, list_step, click_step, list_step]) == [
+        None, "selector '.disabled a' is disabled", "selector '.result a' matches 3 elements",
+        "selector '#gone' matches 0 elements",
+    ]
+
+
+def test_rejected_selector_is_sent_back_to_the_model(logger, monkeypatch):
+    monkeypatch.setenv("EXTRACTION_ENGINE", "soup")
+    page = FakePage({"[name='first_name']": USABLE, "[name='last_name']": USABLE})
+    client = ScriptedClient("#first-name", "[name='first_name']")
+    step = {'action': 'fill', 'target_name': 'name', 'value': 'Ada'}
+
+    action = get_next_action_for_step(client, page, step, logger, memory=NoMemory())
+    assert action['selector'] == "[name='first_name']" and action['resolved_by'] == 'llm'
+    assert len(client.prompts) == 2
+    assert "selector '#first-name' matches 0 elements" in client.prompts[1]
+    assert "[name='first_name']" in client.prompts[1].split("matches 0 elements", 1)[1]
+
+    # The retry budget is bounded
+    monkeypatch.setenv("PREFLIGHT_RETRIES", "1")
+    client = ScriptedClient("#nope", "#still-nope", "[name='first_name']")
+    assert get_next_action_for_step(client, page, step, logger, memory=NoMemory()) is None
+    assert len(client.prompts) == 2
+
+
+def test_router_validated_answer_is_not_preflighted_again(logger, monkeypatch, tmp_path):
+    monkeypatch.setenv("EXTRACTION_ENGINE", "soup")
+    page = FakePage({"[name='first_name']": USABLE})
+    router = ModelRouter([('fast', ScriptedClient("#first-name")), ('strong', ScriptedClient("[name='first_name']"))],
+                         ModelStats(str(tmp_path / 'model_stats.json')))
+    step = {'action': 'fill', 'target_name': 'name', 'value': 'Ada'}
+
+    action = get_next_action_for_step(router, page, step, logger, memory=NoMemory())
+    assert (action['selector'], action['model']) == ("[name='first_name']", 'strong')
+    # One check per model answer, none repeated afterwards
+    assert page.evaluations == [["#first-name"], ["[name='first_name']"]]
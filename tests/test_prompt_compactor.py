@@ -0,0 +1,65 @@
+import json
+from autotester.core.prompt_compactor import (COLUMNS, MAX_CELL_CHARS, compact_ui_summary, estimate_tokens, parse_row,
+                                              rank_elements)
+
+
+def _el(selector, text='', tag='a'):
+    return {'tag': tag, 'selector': selector, 'text': text, 'placeholder': '', 'value': ''}
+
+
+ELEMENTS = [_el(f'#item{i}', f'Product {i}') for i in range(20)] + [
+    _el('#search', 'Search', 'button'),
+    _el('#checkout', 'Proceed to checkout', 'button'),
+]
+
+
+def _selectors(table):
+    return [parse_row(row)['selector'] for row in table.splitlines()[1:]]
+
+
+def test_rank_elements_puts_the_best_match_first():
+    ranked = rank_elements(ELEMENTS, [{'action': 'click', 'target_name': 'checkout button'}])
+    assert ranked[0]['selector'] == '#checkout'
+    # Ties keep page order
+    assert [el['selector'] for el in ranked[-3:]] == ['#item17', '#item18', '#item19']
+
+
+def test_survivors_are_listed_in_page_order(logger):
+    step = {'action': 'click', 'target_name': 'Search'}
+    table = compact_ui_summary(ELEMENTS, step, logger, max_candidates=3)
+    assert table.splitlines()[0] == ' | '.join(COLUMNS)
+    selectors = _selectors(table)
+    assert '#search' in selectors and len(selectors) == 3
+    assert selectors == sorted(selectors, key=[el['selector'] for el in ELEMENTS].index)
+
+
+def test_ordinal_steps_keep_the_leading_elements(logger):
+    step = {'action': 'click_first_in_list', 'list_name': 'checkout'}
+    assert _selectors(compact_ui_summary(ELEMENTS, step, logger, max_candidates=2)) == ['#item0', '#item1']
+
+
+def test_token_budget_and_candidate_cap(logger):
+    step = {'action': 'click', 'target_name': 'Product 7'}
+    header_tokens = estimate_tokens(' | '.join(COLUMNS))
+    best_two = estimate_tokens('a | Product 7 |  |  | #item7') + estimate_tokens('a | Product 17 |  |  | #item17')
+
+    table = compact_ui_summary(ELEMENTS, step, logger, token_budget=header_tokens + best_two)
+    assert _selectors(table) == ['#item7', '#item17']
+
+    # At least one candidate is always kept, however small the budget
+    assert _selectors(compact_ui_summary(ELEMENTS, step, logger, token_budget=1)) == ['#item7']
+
+    assert len(_selectors(compact_ui_summary(ELEMENTS, step, logger, max_candidates=5))) == 5
+    assert len(_selectors(compact_ui_summary(ELEMENTS + ELEMENTS, step, logger, token_budget=10**6))) == len(ELEMENTS)
+
+
+def test_selectors_are_sent_verbatim(logger):
+    long_text = 'Apple iPhone 15 (128 GB) - Black | 6.1 inch Super Retina XDR display with Dynamic Island'
+    selector = 'text=' + json.dumps(long_text)
+    elements = [_el(selector, long_text, 'a'), _el("#pipe|", '', 'button')]
+    table = compact_ui_summary(elements, {'action': 'click', 'target_name': 'iPhone 15'}, logger)
+    assert _selectors(table) == [selector, '#pipe|']
+
+    # Descriptive cells are still collapsed and cut
+    text_cell = parse_row(table.splitlines()[1])['text']
+    assert len(text_cell) == MAX_CELL_CHARS and text_cell.endswith('...')
@@ -0,0 +1,47 @@
+from bs4 import BeautifulSoup
+from autotester.core.agent import extract_interactive_elements
+from autotester.core.page_snapshot import PageSnapshot
+from autotester.core.section_index import TextIndex
+
+CHECKOUT = """
+<html><body>
+<div id="nav"><a href="/login">Login</a><input name="search"></div>
+<div class="wrap"><section id="login">
+  <h2>Login</h2>
+  <form><input name="email"><button>Login</button></form>
+</section></div>
+<div id="shipping"><fieldset><legend>Shipping <b>address</b></legend><input name="street"></fieldset></div>
+<script>var heading = "Payment";</script>
+</body></html>
+"""
+
+
+def _index():
+    return TextIndex(BeautifulSoup(CHECKOUT, 'html.parser'))
+
+
+def test_finds_deepest_element_preferring_headings():
+    index = _index()
+    assert index.find('Login').name == 'h2'
+    assert index.find('Login').find_parent(['div', 'form', 'fieldset', 'section'])['id'] == 'login'
+    # Text split across several nodes resolves to their closest common element
+    assert index.find('Shippingaddress').name == 'legend'
+    assert index.find('Payment') is None  # script text is not page text
+    assert index.section_container('Nowhere') == (None, None)
+
+
+def test_section_scoping_uses_the_nearest_container(logger):
+    selectors = [e['selector'] for e in extract_interactive_elements(CHECKOUT, logger, 'Shippingaddress')]
+    assert selectors == ["[name='street']"]
+
+    selectors = {e['selector'] for e in extract_interactive_elements(CHECKOUT, logger, 'Login')}
+    assert "[name='email']" in selectors and "[name='search']" not in selectors
+
+
+def test_section_lookup_is_cached_per_snapshot(logger):
+    snapshot = PageSnapshot(CHECKOUT, 'http://shop/checkout')
+    first = snapshot.section_container('Login')
+    assert snapshot.section_container('Login') is first
+    assert first[1]['id'] == 'login'
+    extract_interactive_elements(snapshot, logger, 'Login')
+    assert list(snapshot._sections) == ['Login']
@@ -0,0 +1,39 @@
+import os
+import time
+from autotester.utils.session_store import SessionStore
+
+
+class FakeContext:
+    def __init__(self, cookies):
+        self.cookies = cookies
+
+    def storage_state(self):
+        return {"cookies": self.cookies, "origins": []}
+
+
+def test_saved_session_is_reused_until_ttl(tmp_path):
+    store = SessionStore(str(tmp_path), ttl_seconds=60)
+    assert store.load("default") is None
+
+    path = store.save(FakeContext([{"name": "sid", "expires": -1}]), "default")
+    assert store.load("default") == path
+
+    old = time.time() - 120
+    os.utime(path, (old, old))
+    assert store.load("default") is None
+
+
+def test_expired_cookie_makes_session_stale(tmp_path):
+    store = SessionStore(str(tmp_path), ttl_seconds=3600)
+    store.save(FakeContext([{"name": "sid", "expires": time.time() - 5}]), "admin")
+    assert store.load("admin") is None
+
+    store.save(FakeContext([{"name": "sid", "expires": time.time() + 600}]), "admin")
+    assert store.load("admin")
+    store.invalidate("admin")
+    assert store.load("admin") is None
+
+
+def test_profile_names_are_safe_file_names(tmp_path):
+    store = SessionStore(str(tmp_path))
+    assert os.path.dirname(store.path_for("../evil user")) == str(tmp_path)
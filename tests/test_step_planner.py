@@ -0,0 +1,141 @@
+import json
+import pytest
+from autotester.core.step_planner import StepPlanner
+
+PAGE = """
+<form>
+  <input id="user" placeholder="Account">
+  <input id="pass" type="password">
+  <button id="go">Continue</button>
+</form>
+"""
+
+# Targets the local matcher can't resolve, so they go to the model
+STEPS = [
+    {'action': 'fill', 'target_name': 'login id', 'value': 'ada'},
+    {'action': 'fill', 'target_name': 'secret', 'value': 'pw'},
+    {'action': 'click', 'target_name': 'next'},
+    {'action': 'wait', 'target_name': 'Welcome'},
+]
+
+PLAN = [{"action": "fill", "selector": "#user", "value": "ada"},
+        {"action": "fill", "selector": "#pass", "value": "pw"},
+        {"action": "click", "selector": "#go"}]
+
+
+class FakePage:
+    """Serves fixed HTML; every selector in it passes the preflight."""
+
+    def __init__(self, url='http://shop/login'):
+        self.url = url
+
+    def content(self):
+        return PAGE
+
+    def evaluate(self, script, selectors):
+        known = {'#user', '#pass', '#go'}
+        return [{"count": 1, "visible": True, "enabled": True, "editable": True} if s in known
+                else {"count": 0, "visible": False, "enabled": False, "editable": False} for s in selectors]
+
+
+class ScriptedClient:
+    """Returns the queued responses in order."""
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.prompts = []
+
+    def complete(self, prompt, deadline=None):
+        self.prompts.append(prompt)
+        return f"```json\n{json.dumps(self.responses.pop(0))}\n```"
+
+
+class NoMemory:
+    def recall(self, *args, **kwargs):
+        return None
+
+    def forget(self, *args, **kwargs):
+        pass
+
+
+@pytest.fixture(autouse=True)
+def soup_engine(monkeypatch):
+    monkeypatch.setenv("EXTRACTION_ENGINE", "soup")
+
+
+def _planner(client, logger, steps=STEPS):
+    return StepPlanner(client, [dict(s) for s in steps], logger, memory=NoMemory())
+
+
+def test_groups_fills_ending_in_one_click(logger):
+    planner = _planner(None, logger)
+    assert planner.group_at(0) == [0, 1, 2]
+    assert planner.group_at(2) == [2]
+    assert planner.group_at(3) == []
+
+    steps = [dict(STEPS[0]), dict(STEPS[1], section='Billing'), dict(STEPS[2], selector='#go')]
+    planner = _planner(None, logger, steps)
+    assert planner.group_at(0) == [0]
+    assert planner.group_at(1) == [1]  # the next step has its own selector
+    assert planner.group_at(2) == []
+
+
+def test_group_is_planned_with_one_call_and_reused(logger):
+    client = ScriptedClient(PLAN)
+    planner = _planner(client, logger)
+    page = FakePage()
+
+    actions = [planner.action_for(page, i) for i in range(3)]
+    assert [a['selector'] for a in actions] == ['#user', '#pass', '#go']
+    assert all(a['resolved_by'] == 'llm' for a in actions)
+    assert len(client.prompts) == 1
+    assert "A JSON array with exactly 3 objects" in client.prompts[0]
+
+
+def test_invalid_group_answer_falls_back_to_per_step_calls(logger):
+    # Wrong number of actions: the whole plan is discarded
+    client = ScriptedClient(PLAN[:2], PLAN[0], PLAN[1])
+    planner = _planner(client, logger)
+    page = FakePage()
+    assert planner.action_for(page, 0)['selector'] == '#user'
+    assert planner.action_for(page, 1)['selector'] == '#pass'
+    assert len(client.prompts) == 3
+    assert "A JSON array" not in client.prompts[1]
+
+    # One planned selector is not on the page: only that step is asked again
+    client = ScriptedClient([PLAN[0], dict(PLAN[1], selector='#missing'), PLAN[2]], PLAN[1])
+    planner = _planner(client, logger)
+    assert [planner.action_for(page, i)['selector'] for i in range(3)] == ['#user', '#pass', '#go']
+    assert len(client.prompts) == 2
+
+
+def test_page_change_mid_group_abandons_the_plan(logger):
+    client = ScriptedClient(PLAN, PLAN[1], PLAN[2])
+    planner = _planner(client, logger)
+    page = FakePage()
+    assert planner.action_for(page, 0)['selector'] == '#user'
+
+    page.url = 'http://shop/login?step=2'
+    assert planner.action_for(page, 1)['selector'] == '#pass'
+    assert planner.action_for(page, 2)['selector'] == '#go'
+    assert len(client.prompts) == 3
+
+    # A retry skips any plan and goes straight to the model with the error
+    client.responses.append(PLAN[2])
+    planner.action_for(page, 2, last_error="Timeout")
+    assert "Timeout" in client.prompts[-1]
+
+
+@pytest.mark.parametrize("plan", [
+    [dict(PLAN[0], value='pw'), dict(PLAN[1], value='ada'), PLAN[2]],  # values swapped between fields
+    [PLAN[0], PLAN[1], dict(PLAN[2], action='fill', value='')],  # a fill planned for the click
+])
+def test_plan_that_misreads_a_step_is_dropped(logger, plan):
+    client = ScriptedClient(plan, PLAN[0], PLAN[1], PLAN[2])
+    planner = _planner(client, logger)
+    page = FakePage()
+    actions = [planner.action_for(page, i) for i in range(3)]
+    assert [(a['action'], a['selector'], a.get('value')) for a in actions] == \
+        [(p['action'], p['selector'], p.get('value')) for p in PLAN]
+    assert len(client.prompts) == 4
+    assert all("A JSON array" not in prompt for prompt in client.prompts[1:])
@@ -0,0 +1,56 @@
+import pytest
+from autotester.core.step_runner import StepExecutionError, run_steps
+
+
+class FakePage:
+    """Records clicks and fills; the DOM is always quiet and '#broken' can't be clicked."""
+
+    def __init__(self):
+        self.url = 'http://shop/login'
+        self.done = []
+
+    def on(self, event, handler):
+        pass
+
+    def evaluate(self, script, arg):
+        return True
+
+    def wait_for_timeout(self, ms):
+        pass
+
+    def click(self, selector, timeout=None):
+        if selector == '#broken':
+            raise TimeoutError(f"Timeout waiting for {selector}")
+        self.done.append(('click', selector))
+
+    def fill(self, selector, value, timeout=None):
+        self.done.append(('fill', selector, value))
+
+
+@pytest.fixture(autouse=True)
+def fast_settle(monkeypatch):
+    monkeypatch.setenv("SETTLE_QUIET_MS", "0")
+
+
+def test_callbacks_wrap_each_successful_action(logger):
+    page = FakePage()
+    steps = [{'action': 'fill', 'selector': '#user', 'value': 'ada'},
+             {'action': 'click', 'selector': '#go'}]
+    recorded = []
+
+    settle_times = run_steps(page, None, steps, logger,
+                             before_action=lambda p: len(p.done),
+                             after_action=lambda before, action: recorded.append((before, action['selector'])))
+    assert page.done == [('fill', '#user', 'ada'), ('click', '#go')]
+    assert recorded == [(0, '#user'), (1, '#go')]
+    assert len(settle_times) == 2
+
+
+def test_failed_action_is_not_recorded(logger):
+    recorded = []
+    steps = [{'action': 'click', 'selector': '#go'}, {'action': 'click', 'selector': '#broken'}]
+    with pytest.raises(StepExecutionError, match="#broken"):
+        run_steps(FakePage(), None, steps, logger,
+                  before_action=lambda p: None,
+                  after_action=lambda before, action: recorded.append(action['selector']))
+    assert recorded == ['#go']
@@ -0,0 +1,48 @@
+import json
+import pytest
+from autotester.utils import tracing
+from autotester.utils.tracing import percentile, read_trace, span, summarize
+
+
+@pytest.fixture
+def trace_file(tmp_path):
+    path = tracing.configure_tracing(str(tmp_path), run_id="test")
+    yield path
+    tracing.configure_tracing(None)
+
+
+def test_spans_are_written_with_attributes_and_parents(trace_file):
+    tracing.set_trace_scenario("Checkout")
+    with span("resolve_step", step=0) as attrs:
+        with span("llm_call", prompt_tokens=120) as inner:
+            inner['response_tokens'] = 8
+        attrs['resolved_by'] = 'llm'
+    with pytest.raises(ValueError):
+        with span("action"):
+            raise ValueError("boom")
+    tracing.set_trace_scenario(None)
+    tracing.close_tracing()
+
+    records = list(read_trace([trace_file]))
+    llm, step, action = records
+    assert (llm['phase'], llm['parent'], llm['prompt_tokens'], llm['response_tokens']) == ('llm_call', 'resolve_step', 120, 8)
+    assert step['scenario'] == 'Checkout' and step['resolved_by'] == 'llm' and step['parent'] is None
+    assert action['error'] == 'ValueError'
+    assert all(r['ms'] >= 0 for r in records)
+
+
+def test_spans_are_free_when_tracing_is_off(tmp_path):
+    tracing.configure_tracing(None)
+    with span("llm_call", prompt_tokens=1) as attrs:
+        attrs['response_tokens'] = 2
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_summary_reports_percentiles_per_scenario_and_phase():
+    records = [{'scenario': 'A', 'phase': 'llm_call', 'ms': ms} for ms in range(1, 101)]
+    records.append({'scenario': None, 'phase': 'settle', 'ms': 5.0})
+    summary = summarize(records)
+    assert summary['A']['llm_call'] == {'count': 100, 'p50_ms': 50, 'p95_ms': 95, 'total_ms': 5050}
+    assert summary['(session)']['settle']['count'] == 1
+    assert percentile([3.0], 95) == 3.0
+    json.dumps(summary)
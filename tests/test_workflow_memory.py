@@ -0,0 +1,225 @@
+import json
+import logging
+from autotester.utils.blob_store import BlobStore
+from autotester.utils.state_fingerprint import LSHIndex, similarity, simhash
+from autotester.utils.workflow_memory import PENDING_SIMHASH_LIMIT, WorkflowMemory
+from autotester.utils.workflow_replay import edge_cover_walks, shortest_path
+
+
+def make_memory(tmp_path, monkeypatch, save_interval=3600):
+    monkeypatch.chdir(tmp_path)
+    return WorkflowMemory("example.com", save_interval=save_interval)
+
+
+def read_file(memory):
+    with open(memory.workflow_file) as f:
+        return json.load(f)
+
+
+def test_duplicate_edges_are_ignored_regardless_of_key_order(tmp_path, monkeypatch):
+    memory = make_memory(tmp_path, monkeypatch)
+    assert memory.add_edge("a", "b", {"action": "click", "selector": "#go"})
+    assert not memory.add_edge("a", "b", {"selector": "#go", "action": "click"})
+    assert len(memory.graph['edges']) == 1
+    assert memory.has_edge("a", "b", {"action": "click", "selector": "#go"})
+
+
+def test_edges_are_indexed_by_source_state(tmp_path, monkeypatch):
+    memory = make_memory(tmp_path, monkeypatch)
+    memory.add_edge("START", "a", {"action": "initial_load"})
+    memory.add_edge("a", "b", {"action": "click", "selector": "#one"})
+    memory.add_edge("a", "c", {"action": "click", "selector": "#two"})
+
+    assert memory.next_edge("START")['to'] == "a"
+    assert [e['to'] for e in memory.edges_from("a")] == ["b", "c"]
+    assert memory.next_edge("c") is None
+
+
+def test_saves_are_debounced_until_flush(tmp_path, monkeypatch):
+    memory = make_memory(tmp_path, monkeypatch)
+    memory.add_edge("START", "a", {"action": "initial_load"})
+    assert not tmp_path.joinpath(memory.workflow_file).exists()
+
+    memory.flush()
+    saved = read_file(memory)
+    assert saved['edges'] == [{"from": "START", "to": "a", "action": {"action": "initial_load"}}]
+    assert "a" in saved['nodes']
+
+
+def test_save_merges_edges_written_by_another_process(tmp_path, monkeypatch):
+    first = make_memory(tmp_path, monkeypatch)
+    second = WorkflowMemory("example.com", save_interval=3600)
+    first.add_edge("START", "a", {"action": "initial_load"})
+    second.add_edge("a", "b", {"action": "click", "selector": "#go"})
+    first.flush()
+    second.flush()
+
+    reloaded = WorkflowMemory("example.com")
+    assert reloaded.next_edge("START")['to'] == "a"
+    assert reloaded.next_edge("a")['to'] == "b"
+    assert len(read_file(reloaded)['edges']) == 2
+
+
+def test_remember_state_and_action_records_new_states(tmp_path, monkeypatch):
+    memory = make_memory(tmp_path, monkeypatch)
+    states = iter(["s1", "s1"])
+    monkeypatch.setattr(memory, "get_state_hash", lambda page: next(states))
+    logger = logging.getLogger("test")
+
+    memory.remember_state_and_action(None, "START", {"action": "initial_load"}, logger)
+    # Same state as before: no self-loop is recorded
+    memory.remember_state_and_action(None, "s1", {"action": "click", "selector": "#noop"}, logger)
+
+    assert [(e['from'], e['to']) for e in memory.graph['edges']] == [("START", "s1")]
+
+
+def test_blob_store_dedupes_identical_payloads(tmp_path):
+    store = BlobStore(str(tmp_path / "blobs"))
+    first = store.put({"url": "u", "ui_summary": "[]"})
+    second = store.put({"ui_summary": "[]", "url": "u"})
+    assert first == second
+    assert len(list((tmp_path / "blobs").rglob("*.json.gz"))) == 1
+    assert BlobStore(str(tmp_path / "blobs")).get(first) == {"url": "u", "ui_summary": "[]"}
+    assert store.get("0" * 64) is None
+
+
+def test_inline_node_payloads_are_migrated_to_blobs(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    legacy_dir = tmp_path / "workflows" / "example.com"
+    legacy_dir.mkdir(parents=True)
+    legacy_dir.joinpath("workflow_graph.json").write_text(json.dumps({
+        "nodes": {"a": {"url": "http://example.com/", "ui_summary": "[{\"selector\": \"#q\"}]"}},
+        "edges": [{"from": "START", "to": "a", "action": {"action": "initial_load"}}],
+    }))
+
+    memory = WorkflowMemory("example.com", save_interval=3600)
+    assert memory.node_payload("a") == {"url": "http://example.com/", "ui_summary": "[{\"selector\": \"#q\"}]"}
+    memory.flush()
+
+    saved = read_file(memory)
+    assert set(saved['nodes']['a']) == {"payload"}
+    assert saved['edges'][0]['to'] == "a"
+    assert WorkflowMemory("example.com").node_payload("a")['url'] == "http://example.com/"
+    assert memory.node_payload("unknown") == {}
+
+
+class FakePage:
+    def __init__(self, html, url="http://example.com/"):
+        self.html = html
+        self.url = url
+
+    def content(self):
+        return self.html
+
+
+def form_page(values, extra=""):
+    inputs = "".join(f'<input name="field{i}" value="{v}">' for i, v in enumerate(values))
+    return FakePage(f"<html><body><form>{inputs}{extra}</form></body></html>")
+
+
+def test_simhash_is_close_for_near_duplicate_pages():
+    signatures = [{"tag": "input", "id": None, "name": f"f{i}", "type": None, "value": ""} for i in range(60)]
+    changed = signatures[:-1] + [{"tag": "input", "id": None, "name": "f59", "type": None, "value": "x"}]
+    unrelated = [{"tag": "button", "id": f"b{i}", "name": None, "type": None, "value": ""} for i in range(60)]
+
+    assert similarity(simhash(signatures), simhash(changed)) >= 0.9
+    assert similarity(simhash(signatures), simhash(unrelated)) < 0.9
+
+
+def test_lsh_index_finds_nearest_state_within_threshold():
+    index = LSHIndex(bits=64, bands=8)
+    index.add("a", 0)
+    index.add("b", (1 << 64) - 1)
+
+    assert index.nearest(0b101, 0.9) == ("a", 1 - 2 / 64)
+    assert index.nearest(0xFFFF, 0.9) == (None, 0.0)
+
+
+def test_near_duplicate_page_resolves_to_known_state(tmp_path, monkeypatch):
+    memory = make_memory(tmp_path, monkeypatch)
+    memory.fingerprint_config["match_threshold"] = 0.9
+    baseline = form_page([""] * 60)
+    known = memory.get_state_hash(baseline)
+    memory.add_edge("START", known, {"action": "initial_load"})
+    assert memory.graph['nodes'][known]['simhash']
+
+    assert memory.get_state_hash(form_page([""] * 59 + ["typed"])) == known
+    assert memory.get_state_hash(FakePage("<button id='other'>Go</button>")) != known
+
+
+def test_states_match_exactly_unless_the_app_opts_in(tmp_path, monkeypatch):
+    memory = make_memory(tmp_path, monkeypatch)
+    assert memory.fingerprint_config["match_threshold"] == 1.0
+    known = memory.get_state_hash(form_page([""] * 60))
+    memory.add_edge("START", known, {"action": "initial_load"})
+    assert memory.get_state_hash(form_page([""] * 59 + ["typed"])) != known
+
+
+def test_pending_simhashes_are_bounded(tmp_path, monkeypatch):
+    memory = make_memory(tmp_path, monkeypatch)
+    for i in range(PENDING_SIMHASH_LIMIT + 10):
+        memory.match_known_state(f"state{i}", [{"tag": "input", "id": None, "name": f"f{i}", "type": None, "value": ""}])
+    assert len(memory._pending_simhashes) == PENDING_SIMHASH_LIMIT
+    assert "state0" not in memory._pending_simhashes
+
+    # The most recently seen page keeps its SimHash when it becomes a state
+    last = f"state{PENDING_SIMHASH_LIMIT + 9}"
+    memory.add_edge("START", last, {"action": "initial_load"})
+    assert memory.graph['nodes'][last]['simhash']
+
+
+def test_fingerprint_config_is_read_next_to_the_workflow(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "workflows").mkdir()
+    (tmp_path / "workflows" / "example.com_fingerprint.json").write_text(
+        json.dumps({"regions": ["header"], "match_threshold": 1.0}))
+    memory = WorkflowMemory("example.com", save_interval=3600)
+    assert memory.fingerprint_config["regions"] == ["header"]
+    assert memory.fingerprint_config["simhash_bits"] == 64
+
+    page = FakePage("<header><input name='q'></header><main><input name='a'></main>")
+    same_header = FakePage("<header><input name='q'></header><main><input name='b'></main>")
+    assert memory.get_state_hash(page) == memory.get_state_hash(same_header)
+
+
+def branching_memory(tmp_path, monkeypatch):
+    memory = make_memory(tmp_path, monkeypatch)
+    memory.add_edge("START", "home", {"action": "initial_load"})
+    memory.add_edge("home", "search", {"action": "click", "selector": "#search"})
+    memory.add_edge("search", "results", {"action": "fill", "selector": "#q", "value": "x"})
+    memory.add_edge("home", "cart", {"action": "click", "selector": "#cart"})
+    memory.add_edge("cart", "home", {"action": "click", "selector": "#logo"})
+    memory.add_edge("cart", "checkout", {"action": "click", "selector": "#pay"})
+    return memory
+
+
+def test_shortest_path_finds_fewest_actions(tmp_path, monkeypatch):
+    memory = branching_memory(tmp_path, monkeypatch)
+    path = shortest_path(memory, "START", "checkout")
+    assert [e['to'] for e in path] == ["home", "cart", "checkout"]
+    assert [e['to'] for e in shortest_path(memory, "cart", "results")] == ["home", "search", "results"]
+    assert shortest_path(memory, "home", "home") == []
+    assert shortest_path(memory, "checkout", "home") is None
+
+
+def test_edge_cover_takes_every_edge(tmp_path, monkeypatch):
+    memory = branching_memory(tmp_path, monkeypatch)
+    walks = edge_cover_walks(memory)
+
+    taken = {(e['from'], e['to']) for walk in walks for e in walk}
+    assert taken == {(e['from'], e['to']) for e in memory.graph['edges']}
+    for walk in walks:
+        assert walk[0]['from'] == "START"
+        assert all(a['to'] == b['from'] for a, b in zip(walk, walk[1:]))
+    # Two dead ends need two runs; 8 steps is the minimum for this graph
+    assert len(walks) == 2
+    assert sum(len(walk) for walk in walks) == 8
+
+
+def test_resolve_state_accepts_unique_prefixes(tmp_path, monkeypatch):
+    memory = make_memory(tmp_path, monkeypatch)
+    memory.add_edge("START", "abc123", {"action": "initial_load"})
+    memory.add_edge("abc123", "abd456", {"action": "click", "selector": "#go"})
+    assert memory.resolve_state("abc") == "abc123"
+    assert memory.resolve_state("ab") is None
+    assert memory.resolve_state("zzz") is None